@@ -3,21 +3,53 @@ Base agent class that all agents inherit from.
 """
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional
-from loguru import logger
+from utils.logger import logger
+from utils.llm_client import LLMClient, parse_llm_json
+from utils.executor import get_executor
+from utils.tracing import span
+from utils.metrics import STEPS, STEP_SECONDS
+import functools
+import time
 
 class BaseAgent(ABC):
     """Base class for all agents in the system."""
     
+    def __init_subclass__(cls, **kwargs):
+        """Run every subclass's execute() inside a tracing span and record it in the step metrics."""
+        super().__init_subclass__(**kwargs)
+        execute = cls.__dict__.get("execute")
+        if execute is None or getattr(execute, "__traced__", False):
+            return
+        
+        @functools.wraps(execute)
+        async def traced_execute(self, task: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+            action = (task or {}).get("action")
+            started = time.perf_counter()
+            status = "exception"
+            try:
+                with span(f"{cls.__name__}.execute", agent=self.name, action=action) as current:
+                    result = await execute(self, task, context)
+                    if isinstance(result, dict):
+                        status = result.get("status") or "unknown"
+                        current.set_attribute("status", status)
+                    return result
+            finally:
+                self.record_step(action or "execute", status, time.perf_counter() - started)
+        
+        traced_execute.__traced__ = True
+        cls.execute = traced_execute
+    
     def __init__(self, name: str, openai_client):
         """
         Initialize the base agent.
         
         Args:
             name: Name of the agent
-            openai_client: OpenAI client instance
+            openai_client: OpenAI client instance (wrapped with the shared response cache)
         """
         self.name = name
-        self.openai_client = openai_client
+        self.openai_client = LLMClient.wrap(openai_client)
+        self.executor = get_executor()
         self.logger = logger.bind(agent=name)
     
     @abstractmethod
@@ -34,6 +66,16 @@ class BaseAgent(ABC):
         """
         pass
     
+    def record_step(self, action: str, status: str, seconds: float):
+        """Count one execute() call and its duration in the process metrics."""
+        STEPS.inc(agent=self.name, action=action, status=status)
+        STEP_SECONDS.observe(seconds, agent=self.name, action=action)
+    
+    async def parse_json_response(self, response) -> Any:
+        """Parse a chat completion's content as JSON, off the event loop when it is large."""
+        content = response.choices[0].message.content or ""
+        return await self.executor.run(parse_llm_json, content, size_hint=len(content))
+    
     def log(self, message: str, level: str = "info"):
         """Log a message with the agent's context."""
         log_func = getattr(self.logger, level.lower(), self.logger.info)
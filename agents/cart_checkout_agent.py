@@ -4,8 +4,8 @@ Cart and Checkout Agent - Handles adding to cart and checkout process.
 from typing import Dict, Any, Optional
 from agents.base_agent import BaseAgent
 from agents.web_navigator import WebNavigatorAgent
+from utils.stage_timer import timed_stage
 from config import Config
-import asyncio
 
 class CartCheckoutAgent(BaseAgent):
     """Agent responsible for cart operations and checkout process."""
@@ -17,18 +17,18 @@ class CartCheckoutAgent(BaseAgent):
     async def find_add_to_cart_strategy(self, current_url: str) -> Dict[str, Any]:
         """Determine how to add product to cart using OpenAI."""
         try:
-            page_content = await self.web_navigator.get_page_content()
-            content_preview = page_content[:5000] if len(page_content) > 5000 else page_content
+            page_outline = await self.web_navigator.get_condensed_page(1200, focus="cart")
             
             prompt = f"""
-            Analyze the HTML content and determine how to add a product to cart.
+            Analyze the page outline and determine how to add a product to cart.
             Return a JSON object with:
             - add_to_cart_selector: CSS selector for the "Add to Cart" button
             - cart_button_selector: CSS selector for the cart icon/button (if needed to view cart)
             - checkout_button_selector: CSS selector for the checkout button (if visible)
             
             Current URL: {current_url}
-            HTML Content (preview): {content_preview}
+            Page outline (controls, headings, forms with CSS selectors after "->"):
+            {page_outline}
             
             Return only valid JSON. If elements are not found, use common selectors like:
             - button:contains("Add to Cart"), button:contains("Add to Bag"), [data-testid*="add-to-cart"]
@@ -45,8 +45,7 @@ class CartCheckoutAgent(BaseAgent):
                 temperature=0.3
             )
             
-            import json
-            strategy = json.loads(response.choices[0].message.content)
+            strategy = await self.parse_json_response(response)
             self.log(f"Add to cart strategy determined: {strategy}")
             return strategy
         
@@ -59,34 +58,53 @@ class CartCheckoutAgent(BaseAgent):
                 "checkout_button_selector": "button:has-text('Checkout'), button:has-text('Buy Now')"
             }
     
+    async def _click_learned_selector(self, page_type: str) -> bool:
+        """Click the selector learned for this page type on a previous visit, if it still works."""
+        url = await self.web_navigator.get_page_url()
+        selector = await self.web_navigator.find_cached_selector(page_type)
+        if not selector:
+            return False
+        if await self.web_navigator.click(selector):
+            await self.web_navigator.remember_selector(page_type, selector, url)
+            return True
+        await self.web_navigator.forget_selector(page_type, selector, url)
+        return False
+    
+    @timed_stage("add_to_cart")
     async def add_to_cart(self, product_selector: Optional[str] = None) -> Dict[str, Any]:
         """Add product to cart."""
         try:
             current_url = await self.web_navigator.get_page_url()
             
-            # Find add to cart strategy
-            strategy = await self.find_add_to_cart_strategy(current_url)
-            
-            # Try to click add to cart button
-            add_to_cart_selector = strategy.get("add_to_cart_selector", "")
-            
-            # Try multiple common selectors
-            selectors_to_try = [
-                add_to_cart_selector,
-                "button:has-text('Add to Cart')",
-                "button:has-text('Add to Bag')",
-                "[data-testid*='add-to-cart']",
-                "button[aria-label*='Add to Cart']",
-                ".add-to-cart",
-                "#add-to-cart"
-            ]
+            # Learned selector first - skips the LLM call on repeat visits
+            clicked = await self._click_learned_selector("add_to_cart")
             
-            clicked = False
-            for selector in selectors_to_try:
-                if selector and await self.web_navigator.click(selector):
-                    clicked = True
-                    await asyncio.sleep(2)  # Wait for cart to update
-                    break
+            if not clicked:
+                # Find add to cart strategy
+                strategy = await self.find_add_to_cart_strategy(current_url)
+                
+                # Try to click add to cart button
+                add_to_cart_selector = strategy.get("add_to_cart_selector", "")
+                
+                # Try multiple common selectors
+                selectors_to_try = [
+                    add_to_cart_selector,
+                    "button:has-text('Add to Cart')",
+                    "button:has-text('Add to Bag')",
+                    "[data-testid*='add-to-cart']",
+                    "button[aria-label*='Add to Cart']",
+                    ".add-to-cart",
+                    "#add-to-cart"
+                ]
+                
+                for selector in selectors_to_try:
+                    if selector and await self.web_navigator.click(selector):
+                        clicked = True
+                        await self.web_navigator.remember_selector("add_to_cart", selector, current_url)
+                        break
+            
+            if clicked:
+                await self.web_navigator.settle("network", demo_seconds=2)  # Wait for cart to update
             
             if not clicked:
                 return {
@@ -110,9 +128,12 @@ class CartCheckoutAgent(BaseAgent):
                 "message": str(e)
             }
     
+    @timed_stage("cart")
     async def navigate_to_cart(self) -> Dict[str, Any]:
         """Navigate to the cart page."""
         try:
+            current_url = await self.web_navigator.get_page_url()
+            
             # Try to find and click cart button
             cart_selectors = [
                 "a:has-text('Cart')",
@@ -122,15 +143,21 @@ class CartCheckoutAgent(BaseAgent):
                 "a[href*='cart']"
             ]
             
-            for selector in cart_selectors:
+            clicked = await self._click_learned_selector("cart_link")
+            for selector in ([] if clicked else cart_selectors):
                 if await self.web_navigator.click(selector):
-                    await asyncio.sleep(2)
-                    self.log("Navigated to cart")
-                    return {
-                        "status": "success",
-                        "data": {"action": "navigate_to_cart"},
-                        "message": "Navigated to cart"
-                    }
+                    await self.web_navigator.remember_selector("cart_link", selector, current_url)
+                    clicked = True
+                    break
+            
+            if clicked:
+                await self.web_navigator.settle("load", demo_seconds=2)
+                self.log("Navigated to cart")
+                return {
+                    "status": "success",
+                    "data": {"action": "navigate_to_cart"},
+                    "message": "Navigated to cart"
+                }
             
             return {
                 "status": "error",
@@ -146,9 +173,12 @@ class CartCheckoutAgent(BaseAgent):
                 "message": str(e)
             }
     
+    @timed_stage("checkout")
     async def proceed_to_checkout(self) -> Dict[str, Any]:
         """Proceed to checkout."""
         try:
+            current_url = await self.web_navigator.get_page_url()
+            
             # Try to find checkout button
             checkout_selectors = [
                 "button:has-text('Checkout')",
@@ -158,15 +188,21 @@ class CartCheckoutAgent(BaseAgent):
                 "button[aria-label*='checkout']"
             ]
             
-            for selector in checkout_selectors:
+            clicked = await self._click_learned_selector("checkout_button")
+            for selector in ([] if clicked else checkout_selectors):
                 if await self.web_navigator.click(selector):
-                    await asyncio.sleep(3)  # Wait for checkout page to load
-                    self.log("Proceeded to checkout")
-                    return {
-                        "status": "success",
-                        "data": {"action": "proceed_to_checkout"},
-                        "message": "Proceeded to checkout"
-                    }
+                    await self.web_navigator.remember_selector("checkout_button", selector, current_url)
+                    clicked = True
+                    break
+            
+            if clicked:
+                await self.web_navigator.settle("load", demo_seconds=3)  # Wait for checkout page to load
+                self.log("Proceeded to checkout")
+                return {
+                    "status": "success",
+                    "data": {"action": "proceed_to_checkout"},
+                    "message": "Proceeded to checkout"
+                }
             
             return {
                 "status": "error",
@@ -182,6 +218,7 @@ class CartCheckoutAgent(BaseAgent):
                 "message": str(e)
             }
     
+    @timed_stage("checkout_form")
     async def fill_checkout_form(self, user_info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Fill checkout form with user information."""
         try:
@@ -197,38 +234,53 @@ class CartCheckoutAgent(BaseAgent):
                     "phone": "1234567890"
                 }
             
-            # Use OpenAI to determine form field selectors
-            page_content = await self.web_navigator.get_page_content()
-            content_preview = page_content[:3000] if len(page_content) > 3000 else page_content
-            
-            prompt = f"""
-            Analyze the HTML content and determine CSS selectors for checkout form fields.
-            Return a JSON object with selectors for:
-            - email: Email input field
-            - first_name: First name input field
-            - last_name: Last name input field
-            - address: Address input field
-            - city: City input field
-            - zip: ZIP/Postal code input field
-            - phone: Phone input field
-            - continue_button: Continue/Next button
-            
-            HTML Content (preview): {content_preview}
-            
-            Return only valid JSON.
-            """
+            current_url = await self.web_navigator.get_page_url()
             
-            response = await self.openai_client.chat.completions.create(
-                model=Config.OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": "You are an expert at analyzing forms. Return only valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3
-            )
+            # Learned selectors first - skips the LLM call on repeat visits
+            form_selectors = {}
+            for field in list(user_info.keys()) + ["continue_button"]:
+                selector = await self.web_navigator.find_cached_selector(f"checkout_form:{field}")
+                if selector:
+                    form_selectors[field] = selector
             
-            import json
-            form_selectors = json.loads(response.choices[0].message.content)
+            missing = [field for field in user_info if field not in form_selectors]
+            if not missing:
+                self.log(f"Using {len(form_selectors)} cached checkout form selectors")
+            else:
+                if form_selectors:
+                    self.log(f"Cached selectors for {len(form_selectors)} checkout fields, detecting {', '.join(missing)}")
+                # Use OpenAI to determine form field selectors
+                page_outline = await self.web_navigator.get_condensed_page(1000, focus="checkout")
+            
+                prompt = f"""
+                Analyze the page outline and determine CSS selectors for checkout form fields.
+                Return a JSON object with selectors for:
+                - email: Email input field
+                - first_name: First name input field
+                - last_name: Last name input field
+                - address: Address input field
+                - city: City input field
+                - zip: ZIP/Postal code input field
+                - phone: Phone input field
+                - continue_button: Continue/Next button
+            
+                Page outline (forms, controls with CSS selectors after "->"):
+                {page_outline}
+            
+                Return only valid JSON.
+                """
+            
+                response = await self.openai_client.chat.completions.create(
+                    model=Config.OPENAI_MODEL,
+                    messages=[
+                        {"role": "system", "content": "You are an expert at analyzing forms. Return only valid JSON."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.3
+                )
+            
+                # Learned selectors are verified visible on this page; they win over detected ones
+                form_selectors = {**await self.parse_json_response(response), **form_selectors}
             
             # Fill form fields
             filled_fields = []
@@ -237,14 +289,16 @@ class CartCheckoutAgent(BaseAgent):
                     value = user_info[field]
                     if await self.web_navigator.fill_input(selector, value):
                         filled_fields.append(field)
-                        await asyncio.sleep(0.5)
+                        await self.web_navigator.remember_selector(f"checkout_form:{field}", selector, current_url)
+                        await self.web_navigator.settle("none", demo_seconds=0.5)
             
             self.log(f"Filled {len(filled_fields)} form fields")
             
             # Click continue button if available
             if form_selectors.get("continue_button"):
-                await self.web_navigator.click(form_selectors["continue_button"])
-                await asyncio.sleep(2)
+                if await self.web_navigator.click(form_selectors["continue_button"]):
+                    await self.web_navigator.remember_selector("checkout_form:continue_button", form_selectors["continue_button"], current_url)
+                await self.web_navigator.settle("load", demo_seconds=2)
             
             return {
                 "status": "success",
@@ -260,9 +314,12 @@ class CartCheckoutAgent(BaseAgent):
                 "message": str(e)
             }
     
+    @timed_stage("place_order")
     async def place_order(self) -> Dict[str, Any]:
         """Place the final order."""
         try:
+            current_url = await self.web_navigator.get_page_url()
+            
             # Look for place order button
             order_selectors = [
                 "button:has-text('Place Order')",
@@ -272,15 +329,21 @@ class CartCheckoutAgent(BaseAgent):
                 "button[type='submit']:has-text('Order')"
             ]
             
-            for selector in order_selectors:
+            clicked = await self._click_learned_selector("place_order")
+            for selector in ([] if clicked else order_selectors):
                 if await self.web_navigator.click(selector):
-                    await asyncio.sleep(3)
-                    self.log("Order placed successfully")
-                    return {
-                        "status": "success",
-                        "data": {"action": "place_order"},
-                        "message": "Order placed successfully"
-                    }
+                    await self.web_navigator.remember_selector("place_order", selector, current_url)
+                    clicked = True
+                    break
+            
+            if clicked:
+                await self.web_navigator.settle("load", demo_seconds=3)
+                self.log("Order placed successfully")
+                return {
+                    "status": "success",
+                    "data": {"action": "place_order"},
+                    "message": "Order placed successfully"
+                }
             
             return {
                 "status": "error",
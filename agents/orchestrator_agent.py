@@ -1,7 +1,7 @@
 """
 Orchestrator Agent (Agent1) - Coordinates all other agents.
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Iterable, AsyncIterable, AsyncIterator, Union, List, Tuple
 import asyncio
 from agents.base_agent import BaseAgent
 from agents.web_navigator import WebNavigatorAgent
@@ -9,28 +9,81 @@ from agents.product_search_agent import ProductSearchAgent
 from agents.cart_checkout_agent import CartCheckoutAgent
 from config import Config
 from utils.action_tracker import ActionTracker
+from utils.browser_pool import BrowserPool
+from utils.selector_cache import get_selector_cache
+from utils.llm_client import get_response_cache
 from utils.script_generator import PlaywrightScriptGenerator
+from utils.llm_scheduler import is_rate_limit_error
+from utils.query_planner import heuristic_plan, DEFAULT_PLAN_STEPS
+from utils.stage_timer import timed_stage
+from utils.metrics import QUERIES
+from utils.product_ranking import make_offer, rank_offers, is_confident
+from utils.tracing import span
+from utils.deadline import DeadlineExceeded, run_with_deadline, current_deadline, parse_budget
+from utils.plan_graph import PlanGraph, PlanNode
 import os
+import uuid
 from datetime import datetime
 
+class TaskSession:
+    """Per-task state: its own action tracker, sub-agents, browser context and page."""
+    
+    def __init__(self, openai_client, browser_pool: BrowserPool, web_navigator: Optional[WebNavigatorAgent] = None):
+        self.id = uuid.uuid4().hex[:8]
+        self.openai_client = openai_client
+        self.action_tracker = web_navigator.action_tracker if web_navigator else ActionTracker()
+        self.web_navigator = web_navigator or WebNavigatorAgent(openai_client, self.action_tracker, browser_pool)
+        self.product_search = ProductSearchAgent(openai_client, self.web_navigator)
+        self.cart_checkout = CartCheckoutAgent(openai_client, self.web_navigator)
+    
+    async def fork(self) -> "TaskSession":
+        """
+        A session on a new page of this session's browser context, for a plan step that
+        runs alongside another one. Its actions are tracked separately and are not part
+        of the generated test script.
+        """
+        navigator = await self.web_navigator.open_branch(ActionTracker())
+        return TaskSession(self.openai_client, self.web_navigator.browser_pool, navigator)
+    
+    async def close(self):
+        """Return the session's browser context to the pool (a forked session closes its page)."""
+        await self.web_navigator.close()
+
 class OrchestratorAgent(BaseAgent):
     """Main orchestrator agent that coordinates all other agents."""
     
-    def __init__(self, openai_client):
+    def __init__(self, openai_client, browser_pool: Optional[BrowserPool] = None):
         super().__init__("Orchestrator", openai_client)
         
-        # Initialize action tracker
-        self.action_tracker = ActionTracker()
-        
-        # Initialize sub-agents with action tracker
-        self.web_navigator = WebNavigatorAgent(openai_client, self.action_tracker)
-        self.product_search = ProductSearchAgent(openai_client, self.web_navigator)
-        self.cart_checkout = CartCheckoutAgent(openai_client, self.web_navigator)
+        # Long-lived browser shared by every task this orchestrator runs
+        self.browser_pool = browser_pool or BrowserPool(headless=Config.BROWSER_HEADLESS)
         
-        self.log("Orchestrator agent initialized with all sub-agents")
+        self.log("Orchestrator agent initialized")
+    
+    def create_session(self) -> TaskSession:
+        """Create isolated sub-agents for one task; they share the browser pool and caches."""
+        return TaskSession(self.openai_client, self.browser_pool)
     
+    @timed_stage("planning")
     async def plan_task(self, user_query: str) -> Dict[str, Any]:
-        """Create a task plan using OpenAI."""
+        """
+        Create a task plan, locally when the query is routine and with OpenAI otherwise.
+        
+        Config.PLANNER_MODE "auto" uses the rule-based plan when its confidence reaches
+        Config.PLANNER_MIN_CONFIDENCE; "heuristic" always uses it, "llm" never does.
+        The plan's "planner" field records which path produced it: "heuristic", "llm"
+        or "fallback" (the default plan after an LLM failure).
+        """
+        mode = Config.PLANNER_MODE
+        if mode != "llm":
+            plan, confidence = heuristic_plan(user_query)
+            plan["confidence"] = confidence
+            if mode == "heuristic" or confidence >= Config.PLANNER_MIN_CONFIDENCE:
+                plan["planner"] = "heuristic"
+                self.log(f"Task plan created locally (confidence {confidence}): {plan}")
+                return plan
+            self.log(f"Heuristic plan confidence {confidence} too low ({', '.join(plan['reasons'])}), asking the LLM")
+        
         try:
             prompt = f"""
             Given a user query for web scraping and e-commerce tasks, create a step-by-step plan.
@@ -48,6 +101,8 @@ class OrchestratorAgent(BaseAgent):
               - agent: "ProductSearch", "WebNavigator", or "CartCheckout"
               - action: Description of the action
               - expected_result: What should happen
+              - depends_on: (optional) step_numbers that must finish first; omit it to run after
+                the previous step, or use [] for a step that can run alongside the others
             
             Return only valid JSON.
             """
@@ -59,123 +114,357 @@ class OrchestratorAgent(BaseAgent):
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.3,
-                timeout=30.0
+                timeout=30.0,
+                priority="planning"
             )
             
-            import json
-            plan = json.loads(response.choices[0].message.content)
+            plan = await self.parse_json_response(response)
+            plan["planner"] = "llm"
             self.log(f"Task plan created: {plan}")
             return plan
         
         except Exception as e:
-            error_msg = str(e)
-            if "429" in error_msg or "quota" in error_msg.lower():
-                self.log("API quota exceeded, using default plan", "warning")
+            if is_rate_limit_error(e):
+                self.log("API rate-limited or out of quota, using default plan", "warning")
             else:
-                self.log(f"Error creating task plan: {error_msg}, using default plan", "warning")
+                self.log(f"Error creating task plan: {str(e)}, using default plan", "warning")
             # Return default plan
             return {
-                "steps": [
-                    {"step_number": 1, "agent": "ProductSearch", "action": "search_product", "expected_result": "Find product"},
-                    {"step_number": 2, "agent": "CartCheckout", "action": "add_to_cart", "expected_result": "Add product to cart"},
-                    {"step_number": 3, "agent": "CartCheckout", "action": "full_checkout", "expected_result": "Complete checkout"}
-                ]
+                "steps": [dict(step) for step in DEFAULT_PLAN_STEPS],
+                "planner": "fallback"
             }
     
-    async def execute_plan(self, plan: Dict[str, Any], user_query: str) -> Dict[str, Any]:
-        """Execute the planned task step by step."""
-        results = []
-        context = {}
+    async def execute_plan(self, plan: Dict[str, Any], user_query: str,
+                           product_specs: Optional[Dict[str, Any]] = None,
+                           session: Optional[TaskSession] = None,
+                           website: Optional[str] = None,
+                           context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Execute the plan as a dependency graph (website overrides the product's store).
+        
+        A step runs once the steps in its "depends_on" (by default the step before it)
+        have succeeded; independent steps run concurrently, each on its own page of the
+        session's browser context. A step continues on the page its first dependency
+        finished on when that page is free. Failed steps are retried (step "retries",
+        default Config.PLAN_STEP_RETRIES for Config.PLAN_RETRY_AGENTS) and the steps
+        that name them in "depends_on" are skipped; a step that only implicitly follows a
+        failed step still runs unless the failed step is one of the first two (the old
+        sequential rule). Each step's outcome is recorded in context["steps"][step_number].
+        The result is "success", "partial" or "error" and lists every step's outcome.
+        """
+        session = session or self.create_session()
+        context = context if context is not None else {}
+        steps = plan.get("steps", [])
+        
+        def default_retries(step: Dict[str, Any]) -> int:
+            return Config.PLAN_STEP_RETRIES if step.get("agent") in Config.PLAN_RETRY_AGENTS else 0
         
         try:
-            steps = plan.get("steps", [])
+            graph = PlanGraph(steps, default_retries)
+        except ValueError as e:
+            self.log(f"Unusable step dependencies ({str(e)}), running the steps in order", "warning")
+            graph = PlanGraph.sequential(steps, default_retries)
+        
+        # Which session each step ran in, and the sessions a step is using right now
+        step_sessions: Dict[int, TaskSession] = {}
+        busy = set()
+        branches: List[TaskSession] = []
+        
+        async def run_step(node: PlanNode) -> Dict[str, Any]:
+            target = step_sessions.get(node.depends_on[0], session) if node.depends_on else session
+            if target.id in busy:
+                target = await target.fork()
+                branches.append(target)
+                self.log(f"Step {node.id} runs on a new page alongside the others")
+            busy.add(target.id)
+            step_sessions[node.id] = target
+            try:
+                self.log(f"Executing step {node.id}: {node.step.get('agent', '')} - {node.step.get('action', '')}"
+                         + (f" (attempt {node.attempts})" if node.attempts > 1 else ""))
+                return await self.execute_step(node.step, user_query, product_specs, target, website, context)
+            finally:
+                busy.discard(target.id)
+        
+        try:
+            await graph.run(run_step)
+        finally:
+            for branch in branches:
+                await branch.close()
+        
+        results = graph.results()
+        summary = graph.summary()
+        status = graph.status()
+        if status != "success":
+            self.log(f"Plan finished with status {status}: {summary}", "warning")
+        return {
+            "status": status,
+            "data": {
+                "steps_completed": len(summary["succeeded"]),
+                "results": results,
+                "summary": summary,
+                "context": context
+            },
+            "message": (f"Completed {len(summary['succeeded'])} of {len(results)} steps"
+                        + (f" ({len(summary['failed'])} failed, {len(summary['skipped'])} skipped)" if status != "success" else ""))
+        }
+    
+    async def execute_step(self, step: Dict[str, Any], user_query: str,
+                           product_specs: Optional[Dict[str, Any]], session: TaskSession,
+                           website: Optional[str], context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Route one plan step to its agent and record its outcome in context.
+        
+        Outcomes go to context["steps"][step_number], which concurrent steps cannot
+        overwrite; the top-level keys ("product_search_result", ...) hold the latest one.
+        """
+        agent_name = step.get("agent", "")
+        action = step.get("action", "")
+        step_context: Dict[str, Any] = {}
+        context.setdefault("steps", {})[step.get("step_number", 0)] = step_context
+        
+        def record(key: str, value: Dict[str, Any]):
+            step_context[key] = value
+            context[key] = value
+        
+        # Route to appropriate agent
+        if agent_name == "ProductSearch":
+            result = await session.product_search.execute({
+                "query": user_query,
+                "action": action,
+                "product_specs": product_specs,
+                "website": website
+            }, context)
+            record("product_search_result", result)
             
-            for step in steps:
-                step_num = step.get("step_number", 0)
-                agent_name = step.get("agent", "")
-                action = step.get("action", "")
-                
-                self.log(f"Executing step {step_num}: {agent_name} - {action}")
-                
-                # Route to appropriate agent
-                if agent_name == "ProductSearch":
-                    result = await self.product_search.execute({
-                        "query": user_query,
-                        "action": action
-                    }, context)
-                    context["product_search_result"] = result
-                    
-                    # If product found, navigate to product page
-                    if result.get("status") == "success" and result.get("data", {}).get("products"):
-                        products = result["data"]["products"]
-                        if products and len(products) > 0:
-                            # Use first matching product
-                            product = products[0]
-                            if product.get("link"):
-                                nav_result = await self.web_navigator.execute({
-                                    "action": "navigate",
-                                    "url": product["link"]
-                                })
-                                context["product_page"] = nav_result
-                
-                elif agent_name == "WebNavigator":
-                    result = await self.web_navigator.execute({
-                        "action": action,
-                        **step  # Include other step parameters
-                    }, context)
-                    context["navigation_result"] = result
-                
-                elif agent_name == "CartCheckout":
-                    if action == "full_checkout":
-                        result = await self.cart_checkout.execute({
-                            "action": "full_checkout"
-                        }, context)
-                    else:
-                        result = await self.cart_checkout.execute({
-                            "action": action,
-                            **step
-                        }, context)
-                    context["checkout_result"] = result
-                
-                else:
-                    result = {
-                        "status": "error",
-                        "data": {},
-                        "message": f"Unknown agent: {agent_name}"
-                    }
-                
-                results.append({
-                    "step": step_num,
-                    "agent": agent_name,
+            # If product found, navigate to product page
+            if result.get("status") == "success" and result.get("data", {}).get("products"):
+                products = result["data"]["products"]
+                if products and len(products) > 0:
+                    # Use first matching product
+                    product = products[0]
+                    if product.get("link"):
+                        nav_result = await session.web_navigator.execute({
+                            "action": "navigate",
+                            "url": product["link"]
+                        })
+                        record("product_page", nav_result)
+        
+        elif agent_name == "WebNavigator":
+            result = await session.web_navigator.execute({
+                "action": action,
+                **step  # Include other step parameters
+            }, context)
+            record("navigation_result", result)
+        
+        elif agent_name == "CartCheckout":
+            if action == "full_checkout":
+                result = await session.cart_checkout.execute({
+                    "action": "full_checkout"
+                }, context)
+            else:
+                result = await session.cart_checkout.execute({
                     "action": action,
-                    "result": result
-                })
-                
-                # Stop if critical step fails
-                if result.get("status") == "error" and step_num <= 2:
-                    self.log(f"Critical step {step_num} failed, stopping execution", "warning")
-                    break
+                    **step
+                }, context)
+            record("checkout_result", result)
+        
+        else:
+            result = {
+                "status": "error",
+                "data": {},
+                "message": f"Unknown agent: {agent_name}"
+            }
+        
+        
+        return result
+    
+    async def _search_site(self, session: TaskSession, website: str, user_query: str,
+                           product_specs: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Search one store in its own session and return its ranked offers and a short report."""
+        with span("fanout.site", website=website):
+            result = await run_with_deadline(session.product_search.execute({
+                "query": user_query,
+                "action": "search_listing",
+                "product_specs": product_specs,
+                "website": website,
+                "listing_only": True
+            }), Config.FANOUT_SITE_TIMEOUT, website)
+        products = result.get("data", {}).get("products") or []
+        offers = rank_offers([make_offer(product, website, product_specs) for product in products])
+        return offers, {"status": result.get("status"), "message": result.get("message"), "offers": len(offers)}
+    
+    async def fanout_search(self, user_query: str, product_specs: Dict[str, Any], websites: List[str],
+                            session: Optional[TaskSession] = None,
+                            merge: bool = False) -> Tuple[Dict[str, Any], Optional[TaskSession]]:
+        """
+        Search several stores concurrently, one page each in the task's browser context,
+        and rank the listings. The extra pages don't lease contexts from the pool, so a
+        fan-out never waits on other jobs for a context.
+        
+        Without merge the first confident match (Config.FANOUT_CONFIDENT_SCORE) wins and the
+        searches still running are cancelled; with merge every store is searched and all
+        offers are ranked together (price comparison).
+        
+        Args:
+            session: Session used for the first store (others get forks of it)
             
+        Returns:
+            (result, session of the best offer) - the winning session is left open on the
+            store's results page; every other session except `session` is closed
+        """
+        session = session or self.create_session()
+        if session.web_navigator.page is None:
+            await session.web_navigator.initialize_browser(headless=Config.BROWSER_HEADLESS)
+        reports: Dict[str, Dict[str, Any]] = {}
+        forks = await asyncio.gather(*(session.fork() for _ in websites[1:]), return_exceptions=True)
+        sessions = [session]
+        searches = {}
+        for site, site_session in zip(websites, [session] + list(forks)):
+            if isinstance(site_session, BaseException):
+                reports[site] = {"status": "error", "message": f"Could not open a page: {site_session}", "offers": 0}
+                continue
+            if site_session is not session:
+                site_session.action_tracker.start()
+                sessions.append(site_session)
+            searches[asyncio.create_task(self._search_site(site_session, site, user_query, product_specs))] = (site, site_session)
+        self.log(f"Fan-out search across {len(websites)} stores: {', '.join(websites)}")
+        
+        offers: List[Dict[str, Any]] = []
+        session_by_site = {site: site_session for site, site_session in searches.values()}
+        pending = set(searches)
+        winner = None
+        try:
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for search in done:
+                        site, _ = searches[search]
+                        try:
+                            site_offers, reports[site] = search.result()
+                        except asyncio.TimeoutError:
+                            site_offers, reports[site] = [], {"status": "error", "message": "Timed out", "offers": 0}
+                        except Exception as e:
+                            site_offers, reports[site] = [], {"status": "error", "message": str(e), "offers": 0}
+                        offers.extend(site_offers)
+                        self.log(f"{site}: {reports[site]['offers']} offers"
+                                 + (f", best score {site_offers[0]['score']}" if site_offers else ""))
+                    if not merge and is_confident(next(iter(rank_offers(offers)), None)):
+                        break
+            finally:
+                for search in pending:
+                    search.cancel()
+                    reports[searches[search][0]] = {"status": "cancelled", "message": "Cancelled after a confident match", "offers": 0}
+                await asyncio.gather(*pending, return_exceptions=True)
+            
+            ranked = rank_offers(offers)
+            best = ranked[0] if ranked else None
+            winner = None if merge or best is None else session_by_site[best["website"]]
+        finally:
+            # Close the other stores' pages, even when cancelled
+            for site_session in sessions[1:]:
+                if site_session is not winner:
+                    await site_session.close()
+        
+        status = "success" if ranked else "error"
+        return {
+            "status": status,
+            "data": {
+                "product_specs": product_specs,
+                "websites": websites,
+                "offers": ranked,
+                "best": best,
+                "sites": reports,
+                "merged": merge
+            },
+            "message": (f"Best offer from {best['website']} (score {best['score']}) among {len(ranked)} offers"
+                        if best else "No offers found on any store")
+        }, winner
+    
+    def wants_fanout(self, task: Dict[str, Any]) -> bool:
+        """Whether a task asks for a multi-store search (task "fanout"/"websites" or Config.SEARCH_MODE)."""
+        if "fanout" in task:
+            return bool(task["fanout"])
+        return Config.SEARCH_MODE == "fanout" or len(task.get("websites") or []) > 1
+    
+    async def execute_fanout(self, plan: Dict[str, Any], user_query: str, product_specs: Dict[str, Any],
+                             session: TaskSession, task: Dict[str, Any]) -> Tuple[Dict[str, Any], TaskSession]:
+        """
+        Run the plan with a fan-out product search. The remaining steps (cart, checkout)
+        continue in the winning store's session; with task "merge" the ranked offers are
+        the result and no purchase steps run.
+        
+        Returns:
+            (plan result, session the plan finished in)
+        """
+        websites = await session.product_search.candidate_websites(
+            product_specs, task.get("websites") or ([task["website"]] if task.get("website") else None))
+        merge = bool(task.get("merge", False))
+        search, winner = await self.fanout_search(user_query, product_specs, websites, session, merge)
+        results = [{"step": 1, "agent": "ProductSearch", "action": "fanout_search", "result": search}]
+        context = {"product_search_result": search}
+        
+        if merge or winner is None:
             return {
-                "status": "success",
-                "data": {
-                    "steps_completed": len(results),
-                    "results": results,
-                    "context": context
-                },
-                "message": f"Completed {len(results)} steps"
-            }
+                "status": search["status"],
+                "data": {"steps_completed": 1, "results": results, "context": context},
+                "message": search["message"]
+            }, session
         
-        except Exception as e:
-            self.log(f"Error executing plan: {str(e)}", "error")
+        best = search["data"]["best"]
+        try:
+            if best.get("link"):
+                context["product_page"] = await winner.web_navigator.execute({"action": "navigate", "url": best["link"]})
+            # The fan-out already did the search steps; drop them from the plan and its dependencies
+            searched = {step.get("step_number") for step in plan.get("steps", []) if step.get("agent") == "ProductSearch"}
+            steps = []
+            for step in plan.get("steps", []):
+                if step.get("agent") == "ProductSearch":
+                    continue
+                if isinstance(step.get("depends_on"), list):
+                    step = {**step, "depends_on": [number for number in step["depends_on"] if number not in searched]}
+                steps.append(step)
+            remaining = {**plan, "steps": steps}
+            result = await self.execute_plan(remaining, user_query, product_specs, winner, best["website"], context)
+        except BaseException:
+            if winner is not session:
+                await winner.close()
+            raise
+        result.setdefault("data", {})["results"] = results + result["data"].get("results", [])
+        return result, winner
+    
+    async def execute(self, task: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Execute the main orchestration task within its deadline.
+        
+        The budget is task "deadline_s" or Config.TASK_DEADLINE seconds (0 = unlimited).
+        When it runs out the task is cancelled, its browser contexts go back to the pool
+        and an error result is returned, as it is for a "deadline_s" that isn't a number.
+        """
+        try:
+            deadline_s = parse_budget(task.get("deadline_s", Config.TASK_DEADLINE))
+        except ValueError as e:
+            self.log(f"Rejected task: {str(e)}", "error")
             return {
                 "status": "error",
-                "data": {"results": results},
+                "data": {"query": task.get("query", "")},
+                "message": str(e)
+            }
+        try:
+            return await run_with_deadline(self.run_task(task), deadline_s, "Task")
+        except DeadlineExceeded as e:
+            self.log(f"Orchestration cancelled: {str(e)}", "warning")
+            return {
+                "status": "error",
+                "data": {"query": task.get("query", ""), "timed_out": True},
                 "message": str(e)
             }
     
-    async def execute(self, task: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Execute the main orchestration task."""
+    async def run_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Plan and run one task in its own session (no deadline of its own; see execute)."""
+        llm_futures = []
+        session = self.create_session()
+        # Session the plan finished in (another store's session after a fan-out search)
+        active = session
         try:
             user_query = task.get("query", "")
             
@@ -189,14 +478,20 @@ class OrchestratorAgent(BaseAgent):
             self.log(f"Starting orchestration for query: {user_query}")
             
             # Start action tracking
-            self.action_tracker.start()
+            session.action_tracker.start()
+            
+            # Planning and spec extraction don't need the browser - start them while it launches
+            self.log("Creating task plan and extracting product specs while the browser starts...")
+            plan_future = asyncio.create_task(self.plan_task(user_query))
+            specs_future = asyncio.create_task(session.product_search.extract_product_specs(user_query))
+            llm_futures = [plan_future, specs_future]
             
             # Step 1: Initialize browser (with retry)
             max_retries = 3
             browser_initialized = False
             for attempt in range(max_retries):
                 try:
-                    success = await self.web_navigator.initialize_browser(headless=Config.BROWSER_HEADLESS)
+                    success = await session.web_navigator.initialize_browser(headless=Config.BROWSER_HEADLESS)
                     if success:
                         browser_initialized = True
                         break
@@ -209,38 +504,45 @@ class OrchestratorAgent(BaseAgent):
                         await asyncio.sleep(2)
             
             if not browser_initialized:
+                for future in llm_futures:
+                    future.cancel()
                 return {
                     "status": "error",
                     "data": {},
                     "message": "Failed to initialize browser after multiple attempts. Please ensure Playwright is properly installed."
                 }
             
-            # Step 2: Plan the task
-            self.log("Creating task plan...")
-            plan = await self.plan_task(user_query)
+            # Step 2: Join the plan and product specs started above
+            plan, product_specs = await asyncio.gather(plan_future, specs_future)
             
             # Step 3: Execute the plan
             self.log("Executing task plan...")
-            result = await self.execute_plan(plan, user_query)
-            
-            # Step 4: Take final screenshot and get video
-            await self.web_navigator.take_screenshot("final_state.png")
-            
-            # Get video path if available
-            video_path = await self.web_navigator.get_video_path()
-            if video_path:
-                self.log(f"Video recording saved to: {video_path}")
-            
-            # Step 5: Stop tracking and generate test script
-            self.action_tracker.stop()
-            self.log("Generating Playwright test script from execution...")
-            script_generator = PlaywrightScriptGenerator(self.action_tracker.get_actions(), user_query)
+            if self.wants_fanout(task):
+                result, active = await self.execute_fanout(plan, user_query, product_specs, session, task)
+            else:
+                result = await self.execute_plan(plan, user_query, product_specs, session, task.get("website"))
+            active.action_tracker.stop()
             
-            # Generate script filename with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            script_filename = f"test_generated_{timestamp}.py"
-            script_path = script_generator.save(script_filename)
-            self.log(f"Test script generated and saved to: {script_path}")
+            script_path = None
+            deadline = current_deadline()
+            # Artifacts are skipped once the deadline has passed, so the partial result is still returned
+            if task.get("save_artifacts", True) and not (deadline and deadline.expired):
+                # Step 4: Take final screenshot and get video (timestamp and session id keep concurrent runs apart)
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                await active.web_navigator.take_screenshot(f"final_state_{timestamp}_{active.id}.png")
+                
+                # Get video path if available
+                video_path = await active.web_navigator.get_video_path()
+                if video_path:
+                    self.log(f"Video recording saved to: {video_path}")
+                
+                # Step 5: Generate test script
+                self.log("Generating Playwright test script from execution...")
+                script_generator = PlaywrightScriptGenerator(active.action_tracker.get_actions(), user_query)
+                
+                script_filename = f"test_generated_{timestamp}_{active.id}.py"
+                script_path = script_generator.save(script_filename)
+                self.log(f"Test script generated and saved to: {script_path}")
             
             return {
                 "status": result["status"],
@@ -250,7 +552,7 @@ class OrchestratorAgent(BaseAgent):
                     "execution": result,
                     "test_script": script_path
                 },
-                "message": f"Orchestration completed with status: {result['status']}. Test script saved to {script_path}"
+                "message": f"Orchestration completed with status: {result['status']}." + (f" Test script saved to {script_path}" if script_path else "")
             }
         
         except Exception as e:
@@ -261,10 +563,84 @@ class OrchestratorAgent(BaseAgent):
                 "message": str(e)
             }
         finally:
-            # Cleanup
-            await self.web_navigator.close()
+            for future in llm_futures:
+                if not future.done():
+                    future.cancel()
+            # Return the browser context to the pool; the browser stays warm
+            if active is not session:
+                await active.close()
+            await session.close()
+    
+    def record_step(self, action: str, status: str, seconds: float):
+        """Count one execute() call, which for the orchestrator is one whole query."""
+        super().record_step(action, status, seconds)
+        QUERIES.inc(status=status)
+    
+    async def execute_batch(self, tasks: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+                            concurrency: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run many tasks concurrently, each in its own browser context.
+        
+        Args:
+            tasks: Task dicts (each with at least a "query"), sync or async iterable
+            concurrency: Maximum number of tasks in flight
+            
+        Yields:
+            One result per task, in completion order, tagged with the task's "id"
+        """
+        concurrency = concurrency or Config.BATCH_CONCURRENCY
+        pending: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+        finished: asyncio.Queue = asyncio.Queue()
+        
+        async def feed():
+            try:
+                if hasattr(tasks, "__aiter__"):
+                    async for task in tasks:
+                        await pending.put(task)
+                else:
+                    for task in tasks:
+                        await pending.put(task)
+            finally:
+                for _ in range(concurrency):
+                    await pending.put(None)
+        
+        async def worker():
+            try:
+                while True:
+                    task = await pending.get()
+                    if task is None:
+                        break
+                    task_id = task.get("id") if isinstance(task, dict) else None
+                    try:
+                        if not isinstance(task, dict):
+                            raise TypeError(f"Task must be an object, got {type(task).__name__}")
+                        result = {"id": task_id, "query": task.get("query"), **await self.execute(task)}
+                    except Exception as e:
+                        # One broken task must not take the worker, and the tasks it would run, with it
+                        self.log(f"Batch task {task_id} crashed: {str(e)}", "error")
+                        result = {"id": task_id, "status": "error", "data": {}, "message": str(e)}
+                    await finished.put(result)
+            finally:
+                await finished.put(None)
+        
+        feeder = asyncio.create_task(feed())
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            running = len(workers)
+            while running:
+                item = await finished.get()
+                if item is None:
+                    running -= 1
+                    continue
+                yield item
+        finally:
+            for job in [feeder, *workers]:
+                job.cancel()
+            await asyncio.gather(feeder, *workers, return_exceptions=True)
     
     async def cleanup(self):
         """Cleanup resources."""
-        await self.web_navigator.close()
+        await self.browser_pool.close()
+        get_selector_cache().flush()
+        get_response_cache().flush()
 
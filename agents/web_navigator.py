@@ -1,24 +1,46 @@
 """
 Web Navigator Agent - Handles browser automation and navigation.
 """
-from typing import Dict, Any, Optional
-from playwright.async_api import async_playwright, Browser, Page, BrowserContext
+from typing import Dict, Any, Optional, Callable, Awaitable, Tuple, TYPE_CHECKING
 from agents.base_agent import BaseAgent
+from utils.browser_pool import BrowserPool
+from utils.waits import wait_for_condition, wait_for_page_loaded, track_network
+from utils.selector_cache import SelectorCache, get_selector_cache
+from utils.page_snapshot import DOM_VERSION_INIT_JS, DOM_VERSION_JS, LIGHT_SNAPSHOT_JS
+from utils.dom_condenser import extract_page_outline, condense
+from utils.stage_timer import timed_stage
+from utils.tracing import traced, current_span
+from utils.metrics import PAGE_LOAD_SECONDS, SLEEP_SECONDS, SNAPSHOT_CACHE
+from utils.deadline import clamp_ms, clamp_seconds
+from config import Config
 import asyncio
+import time
+
+if TYPE_CHECKING:
+    from playwright.async_api import Page, BrowserContext, Frame
 
 class WebNavigatorAgent(BaseAgent):
     """Agent responsible for web navigation and browser automation."""
     
-    def __init__(self, openai_client, action_tracker=None):
+    def __init__(self, openai_client, action_tracker=None, browser_pool: Optional[BrowserPool] = None,
+                 selector_cache: Optional[SelectorCache] = None):
         super().__init__("WebNavigator", openai_client)
-        self.browser: Optional[Browser] = None
-        self.context: Optional[BrowserContext] = None
-        self.page: Optional[Page] = None
-        self.playwright = None
+        self.context: Optional["BrowserContext"] = None
+        self.page: Optional["Page"] = None
         self.action_tracker = action_tracker
+        self.browser_pool = browser_pool
+        self._owns_pool = browser_pool is None
+        # Branch navigators borrow another navigator's context and only close their page
+        self._borrowed_context = False
+        self.selector_cache = selector_cache or get_selector_cache()
+        # Snapshot cache: kind -> ((navigation count, DOM version, url), snapshot)
+        self._snapshots: Dict[str, Tuple[Tuple, Any]] = {}
+        self._navigations = 0
+        self.snapshot_hits = 0
+        self.snapshot_misses = 0
     
     async def _cleanup_browser(self):
-        """Clean up browser resources."""
+        """Release the leased browser context back to the pool."""
         try:
             if self.page:
                 try:
@@ -28,101 +50,36 @@ class WebNavigatorAgent(BaseAgent):
                 self.page = None
         except:
             pass
+        self.invalidate_snapshots()
         
         try:
-            if self.context:
-                try:
-                    await self.context.close()
-                except:
-                    pass
-                self.context = None
+            if self.context and not self._borrowed_context:
+                await self.browser_pool.release(self.context)
+            self.context = None
         except:
-            pass
-        
-        try:
-            if self.browser:
-                try:
-                    await self.browser.close()
-                except:
-                    pass
-                self.browser = None
-        except:
-            pass
-        
-        try:
-            if self.playwright:
-                try:
-                    await self.playwright.stop()
-                except:
-                    pass
-                self.playwright = None
-        except:
-            pass
+            self.context = None
+        self._borrowed_context = False
     
+    @timed_stage("browser_init")
     async def initialize_browser(self, headless: bool = False):
-        """Initialize the browser instance."""
+        """Lease a fresh browser context and page from the browser pool."""
         try:
-            # Clean up any existing instances first
+            # Release any context from a previous task first
             await self._cleanup_browser()
-            await asyncio.sleep(1)  # Longer wait for cleanup
-            
-            self.log("Starting Playwright...")
-            # Initialize fresh browser instance
-            self.playwright = await async_playwright().start()
-            await asyncio.sleep(1)
-            
-            self.log(f"Launching browser (headless={headless})...")
-            # Launch browser - try multiple approaches
-            browser_launched = False
             
-            if not headless:
-                # Try using system Chrome first (more stable on macOS)
-                try:
-                    self.log("Trying to use system Chrome...")
-                    self.browser = await self.playwright.chromium.launch(
-                        headless=False,
-                        channel='chrome',  # Use system Chrome if available
-                        slow_mo=500
-                    )
-                    browser_launched = True
-                    self.log("✅ Successfully launched system Chrome")
-                except Exception as e:
-                    self.log(f"System Chrome not available: {e}, trying bundled Chromium", "warning")
-            
-            if not browser_launched:
-                # Use bundled Chromium
-                try:
-                    if headless:
-                        self.browser = await self.playwright.chromium.launch(
-                            headless=True,
-                            args=['--no-sandbox', '--disable-dev-shm-usage']
-                        )
-                    else:
-                        # For visible mode - minimal args for stability
-                        self.browser = await self.playwright.chromium.launch(
-                            headless=False,
-                            slow_mo=500,
-                            args=[]  # No special args - let it use defaults
-                        )
-                    browser_launched = True
-                    self.log("✅ Successfully launched bundled Chromium")
-                except Exception as launch_error:
-                    self.log(f"Bundled Chromium launch failed: {launch_error}", "error")
-                    raise
+            if self.browser_pool is None:
+                self.browser_pool = BrowserPool(headless=headless)
             
-            await asyncio.sleep(2)  # Give browser plenty of time to start
+            self.log("Acquiring browser context from pool...")
+            self.context = await self.browser_pool.acquire()
             
-            self.log("Creating browser context...")
-            # Simple context
-            self.context = await self.browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            )
-            await asyncio.sleep(1)
+            # Lets the snapshot cache detect DOM changes with a cheap counter read
+            await self.context.add_init_script(DOM_VERSION_INIT_JS)
             
             self.log("Creating new page...")
             self.page = await self.context.new_page()
-            await asyncio.sleep(1)
+            self.page.on("framenavigated", self._on_frame_navigated)
+            track_network(self.page)
             
             # Verify it's working
             try:
@@ -140,6 +97,25 @@ class WebNavigatorAgent(BaseAgent):
             await self._cleanup_browser()
             return False
     
+    async def open_branch(self, action_tracker=None) -> "WebNavigatorAgent":
+        """
+        Open another page in this navigator's browser context, for work that runs
+        alongside this page (cookies and storage are shared; closing the branch only
+        closes its page). The branch starts on this page's URL.
+        """
+        branch = WebNavigatorAgent(self.openai_client, action_tracker, self.browser_pool, self.selector_cache)
+        branch.context = self.context
+        branch._borrowed_context = True
+        branch.page = await self.context.new_page()
+        branch.page.on("framenavigated", branch._on_frame_navigated)
+        track_network(branch.page)
+        url = self.page.url if self.page else ""
+        if url.startswith("http"):
+            await branch.navigate_to(url)
+        return branch
+    
+    @timed_stage("navigation")
+    @traced("navigator.navigate")
     async def navigate_to(self, url: str) -> bool:
         """Navigate to a specific URL."""
         try:
@@ -154,13 +130,18 @@ class WebNavigatorAgent(BaseAgent):
                 await self.initialize_browser()
             
             self.log(f"🌐 Navigating to: {url}")
+            current_span().set_attributes(url=url, mode=Config.EXECUTION_MODE)
             if self.action_tracker:
                 self.action_tracker.add_navigation(url)
-            await self.page.goto(url, wait_until="networkidle", timeout=60000)
-            await asyncio.sleep(4)  # Wait longer so user can see the page load
-            if self.action_tracker:
-                self.action_tracker.add_wait("load", timeout=60000)
-                self.action_tracker.add_sleep(4)
+            started = time.perf_counter()
+            if self.is_demo_mode:
+                await self.page.goto(url, wait_until="networkidle", timeout=clamp_ms(60000))
+                if self.action_tracker:
+                    self.action_tracker.add_wait("load", timeout=60000)
+            else:
+                await self.page.goto(url, wait_until="domcontentloaded", timeout=clamp_ms(60000))
+            await self.settle("load", demo_seconds=4)  # Demo: wait longer so user can see the page load
+            PAGE_LOAD_SECONDS.observe(time.perf_counter() - started, mode=Config.EXECUTION_MODE)
             
             # Verify page is still open
             try:
@@ -178,17 +159,80 @@ class WebNavigatorAgent(BaseAgent):
                 await self.initialize_browser()
             return False
     
+    @property
+    def is_demo_mode(self) -> bool:
+        """Whether actions are paced with fixed sleeps so a human can follow them."""
+        return Config.EXECUTION_MODE == "demo"
+    
+    @traced("navigator.settle")
+    async def settle(self, condition: str = "dom", demo_seconds: float = 1.0, element: Any = None,
+                     timeout: Optional[int] = None) -> bool:
+        """
+        Wait for the page to settle after an action.
+        
+        In demo mode this sleeps for demo_seconds so the action stays visible; in fast
+        mode it waits on the named condition (see utils.waits.wait_for_condition), for
+        at most Config.ACTION_SETTLE_TIMEOUT unless it is a page load.
+        """
+        current_span().set_attributes(condition=condition, demo=self.is_demo_mode)
+        if self.is_demo_mode:
+            await asyncio.sleep(clamp_seconds(demo_seconds))
+            SLEEP_SECONDS.inc(demo_seconds)
+            if self.action_tracker:
+                self.action_tracker.add_sleep(demo_seconds)
+            return True
+        if not self.page:
+            return False
+        if timeout is None and condition in ("dom", "network", "actionable"):
+            timeout = Config.ACTION_SETTLE_TIMEOUT
+        return await wait_for_condition(self.page, condition, element=element, timeout=timeout)
+    
+    @traced("navigator.wait_for_page_load")
+    async def wait_for_page_load(self, timeout: int = 10000) -> bool:
+        """Wait for the page to finish loading after a navigation-triggering action."""
+        if self.is_demo_mode:
+            await self.page.wait_for_load_state('networkidle', timeout=clamp_ms(timeout))
+            if self.action_tracker:
+                self.action_tracker.add_wait("load", timeout=timeout)
+            return True
+        return await wait_for_page_loaded(self.page, timeout)
+    
+    @traced("navigator.find_cached_selector")
+    async def find_cached_selector(self, page_type: str) -> Optional[str]:
+        """Return the best learned selector for this page type that is visible right now."""
+        url = await self.get_page_url()
+        for selector in self.selector_cache.get(url, page_type):
+            try:
+                if await self.page.locator(selector).first.is_visible():
+                    self.log(f"♻️  Using cached {page_type} selector: {selector}")
+                    current_span().set_attributes(page_type=page_type, selector=selector)
+                    return selector
+            except Exception:
+                pass
+            self.selector_cache.record_failure(url, page_type, selector)
+        return None
+    
+    async def remember_selector(self, page_type: str, selector: str, url: Optional[str] = None):
+        """Record that a selector worked for this page type (on the current domain unless url is given)."""
+        self.selector_cache.record_success(url or await self.get_page_url(), page_type, selector)
+    
+    async def forget_selector(self, page_type: str, selector: str, url: Optional[str] = None):
+        """Record that a cached selector failed when it was used."""
+        self.selector_cache.record_failure(url or await self.get_page_url(), page_type, selector)
+    
     async def find_element(self, selector: str, timeout: int = 10000) -> Optional[Any]:
         """Find an element on the page."""
         try:
-            element = await self.page.wait_for_selector(selector, timeout=timeout)
+            element = await self.page.wait_for_selector(selector, timeout=clamp_ms(timeout))
             return element
         except Exception as e:
             self.log(f"Element not found with selector {selector}: {str(e)}", "warning")
             return None
     
+    @traced("navigator.click")
     async def click(self, selector: str) -> bool:
         """Click on an element."""
+        current_span().set_attribute("selector", selector)
         try:
             element = await self.find_element(selector)
             if element:
@@ -196,9 +240,8 @@ class WebNavigatorAgent(BaseAgent):
                 if self.action_tracker:
                     self.action_tracker.add_click(selector, element_type="element")
                 await element.click()
-                await asyncio.sleep(3)  # Longer delay so user can see the action
-                if self.action_tracker:
-                    self.action_tracker.add_sleep(3)
+                self.invalidate_snapshots()
+                await self.settle("dom", demo_seconds=3)  # Demo: longer delay so user can see the action
                 self.log(f"✅ Successfully clicked!")
                 return True
             return False
@@ -206,8 +249,10 @@ class WebNavigatorAgent(BaseAgent):
             self.log(f"Failed to click on {selector}: {str(e)}", "error")
             return False
     
+    @traced("navigator.fill")
     async def fill_input(self, selector: str, text: str) -> bool:
         """Fill an input field."""
+        current_span().set_attribute("selector", selector)
         try:
             element = await self.find_element(selector)
             if element:
@@ -215,9 +260,8 @@ class WebNavigatorAgent(BaseAgent):
                 if self.action_tracker:
                     self.action_tracker.add_fill(selector, text)
                 await element.fill(text)
-                await asyncio.sleep(2)  # Longer delay so user can see typing
-                if self.action_tracker:
-                    self.action_tracker.add_sleep(2)
+                self.invalidate_snapshots()
+                await self.settle("dom", demo_seconds=2)  # Demo: longer delay so user can see typing
                 self.log(f"✅ Successfully filled input!")
                 return True
             return False
@@ -225,15 +269,93 @@ class WebNavigatorAgent(BaseAgent):
             self.log(f"Failed to fill input {selector}: {str(e)}", "error")
             return False
     
+    def _on_frame_navigated(self, frame: "Frame"):
+        if self.page and frame == self.page.main_frame:
+            self._navigations += 1
+            self._snapshots.clear()
+    
+    def invalidate_snapshots(self):
+        """Drop cached snapshots, e.g. after acting on the page outside this agent."""
+        self._snapshots.clear()
+    
+    async def _snapshot_key(self) -> Optional[Tuple]:
+        """Identify the current page state, or None if it cannot be tracked (never cache)."""
+        try:
+            version = await self.page.evaluate(DOM_VERSION_JS)
+        except Exception:
+            return None
+        if version is None:
+            return None
+        return (self._navigations, version, self.page.url)
+    
+    async def _cached_snapshot(self, kind: str, producer: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached snapshot of this kind if the page state has not changed since
+        it was taken, otherwise take a new one.
+        
+        The key is read before the snapshot, so a mutation racing with it only causes an
+        extra miss next time, never a stale hit.
+        """
+        key = await self._snapshot_key()
+        cached = self._snapshots.get(kind)
+        if key is not None and cached and cached[0] == key:
+            self.snapshot_hits += 1
+            SNAPSHOT_CACHE.inc(result="hit")
+            current_span().set_attribute("snapshot_hit", True)
+            return cached[1]
+        
+        self.snapshot_misses += 1
+        SNAPSHOT_CACHE.inc(result="miss")
+        current_span().set_attribute("snapshot_hit", False)
+        snapshot = await producer()
+        if key is not None:
+            self._snapshots[kind] = (key, snapshot)
+        return snapshot
+    
+    @traced("navigator.page_content")
     async def get_page_content(self) -> str:
-        """Get the current page content."""
+        """Get the current page content (served from the snapshot cache when unchanged)."""
         try:
-            content = await self.page.content()
-            return content
+            return await self._cached_snapshot("html", self.page.content)
         except Exception as e:
             self.log(f"Failed to get page content: {str(e)}", "error")
             return ""
     
+    @traced("navigator.page_snapshot")
+    async def get_page_snapshot(self, max_text: int = 20000, max_elements: int = 300) -> Dict[str, Any]:
+        """
+        Get a light snapshot of the page: url, title, visible text and interactive
+        elements (tag, type, name, id, text, placeholder, aria_label, href, selector).
+        
+        Much cheaper than get_page_content() when the full HTML is not needed.
+        """
+        async def take():
+            return await self.page.evaluate(LIGHT_SNAPSHOT_JS, {"maxText": max_text, "maxElements": max_elements})
+        try:
+            return await self._cached_snapshot(f"light:{max_text}:{max_elements}", take)
+        except Exception as e:
+            self.log(f"Failed to get page snapshot: {str(e)}", "error")
+            return {"url": await self.get_page_url(), "title": "", "text": "", "interactive": []}
+    
+    @traced("navigator.condensed_page")
+    async def get_condensed_page(self, budget_tokens: Optional[int] = None, focus: Optional[str] = None) -> str:
+        """
+        Get a token-budgeted outline of the page (forms, controls, headings, product
+        cards with stable selectors) for LLM prompts.
+        
+        Args:
+            budget_tokens: Approximate size limit (defaults to Config.PROMPT_PAGE_BUDGET_TOKENS)
+            focus: "search", "products", "cart" or "checkout" to prioritize what survives the budget
+        """
+        budget_tokens = budget_tokens or Config.PROMPT_PAGE_BUDGET_TOKENS
+        try:
+            outline = await self._cached_snapshot("outline", lambda: extract_page_outline(self.page))
+            return await self.executor.run(condense, outline, budget_tokens, focus)
+        except Exception as e:
+            # Fall back to the raw HTML, cut to the same budget
+            self.log(f"Failed to condense page, using raw HTML: {str(e)}", "warning")
+            return (await self.get_page_content())[:budget_tokens * 4]
+    
     async def get_page_url(self) -> str:
         """Get the current page URL."""
         try:
@@ -304,6 +426,14 @@ class WebNavigatorAgent(BaseAgent):
                     "message": "Content retrieved successfully"
                 }
             
+            elif action == "get_snapshot":
+                snapshot = await self.get_page_snapshot()
+                return {
+                    "status": "success",
+                    "data": snapshot,
+                    "message": "Snapshot retrieved successfully"
+                }
+            
             else:
                 return {
                     "status": "error",
@@ -320,7 +450,10 @@ class WebNavigatorAgent(BaseAgent):
             }
     
     async def close(self):
-        """Close the browser and cleanup."""
+        """Release the browser context; shut the pool down if this agent owns it."""
         await self._cleanup_browser()
+        if self._owns_pool and self.browser_pool:
+            await self.browser_pool.close()
+            self.browser_pool = None
         self.log("Browser closed successfully")
 
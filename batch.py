@@ -0,0 +1,99 @@
+"""
+Batch entry point - Runs many product queries concurrently through one orchestrator.
+
+Reads JSONL tasks (one {"query": ..., "id": ..., "website": ...} object per line, website
+optional; plain text lines are treated as bare queries) from a file or stdin and streams
+one JSON result per line. {"websites": [...], "merge": true} searches several stores at
+once and returns their offers ranked (price comparison). {"deadline_s": 120} caps one
+task's run time (default Config.TASK_DEADLINE).
+
+Usage:
+    python batch.py queries.jsonl --concurrency 4 > results.jsonl
+    cat queries.jsonl | python batch.py - --output results.jsonl
+    python batch.py queries.jsonl --metrics-port 9464      # scrape http://127.0.0.1:9464/metrics
+"""
+import argparse
+import asyncio
+import json
+import sys
+from config import Config
+from utils.llm_client import create_llm_client
+from utils.logger import setup_logger
+from utils.browser_pool import BrowserPool
+from utils.metrics import start_metrics_server
+from agents.orchestrator_agent import OrchestratorAgent
+
+def parse_task(line: str, line_number: int):
+    """Turn one input line into a task dict, or None for blank lines."""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        task = json.loads(line)
+    except ValueError:
+        task = line
+    if not isinstance(task, dict):
+        task = {"query": str(task)}
+    task.setdefault("id", line_number)
+    return task
+
+async def read_tasks(stream, save_artifacts: bool):
+    """Yield tasks from a file object without blocking the event loop on reads."""
+    loop = asyncio.get_running_loop()
+    line_number = 0
+    while True:
+        line = await loop.run_in_executor(None, stream.readline)
+        if not line:
+            break
+        line_number += 1
+        task = parse_task(line, line_number)
+        if task:
+            task.setdefault("save_artifacts", save_artifacts)
+            yield task
+
+async def run_batch(args) -> int:
+    """Run every task and write results as they complete. Returns the number of failures."""
+    Config.validate()
+    if start_metrics_server(args.metrics_port):
+        print(f"Serving metrics on http://{Config.METRICS_HOST}:{args.metrics_port}/metrics", file=sys.stderr)
+    client = create_llm_client(timeout=60.0)
+    pool = BrowserPool(headless=not args.headed, max_contexts=args.concurrency)
+    orchestrator = OrchestratorAgent(client, browser_pool=pool)
+    
+    source = sys.stdin if args.input == "-" else open(args.input, "r")
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    failures = 0
+    try:
+        async for result in orchestrator.execute_batch(read_tasks(source, args.artifacts), args.concurrency):
+            if result.get("status") == "error":
+                failures += 1
+            output.write(json.dumps(result, default=str) + "\n")
+            output.flush()
+    finally:
+        await orchestrator.cleanup()
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Run product queries in batch mode.")
+    parser.add_argument("input", nargs="?", default="-", help="JSONL file of tasks, or - for stdin")
+    parser.add_argument("--output", "-o", default="-", help="File to write JSONL results to (default: stdout)")
+    parser.add_argument("--concurrency", "-c", type=int, default=Config.BATCH_CONCURRENCY,
+                        help="Number of queries to run at once (one browser context each)")
+    parser.add_argument("--headed", action="store_true", help="Show the browser instead of running headless")
+    parser.add_argument("--artifacts", action="store_true",
+                        help="Save a screenshot and generated test script for every query")
+    parser.add_argument("--metrics-port", type=int, default=Config.METRICS_PORT,
+                        help="Serve Prometheus metrics on this port while the batch runs (0 = off)")
+    args = parser.parse_args()
+    
+    # Results go to stdout, so keep log lines on stderr
+    setup_logger(sys.stderr)
+    failures = asyncio.run(run_batch(args))
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
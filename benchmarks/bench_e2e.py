@@ -0,0 +1,229 @@
+"""
+Benchmark - End-to-end orchestration against the local fixture store and mock LLM.
+
+Runs OrchestratorAgent.execute for a matrix of queries and concurrency levels fully
+offline and reports, per concurrency level:
+    - p50/p95/p99 latency of each stage (browser_init, spec_extraction, planning,
+      navigation, search_box_detection, product_click, add_to_cart, checkout, ...)
+      and of the whole task
+    - throughput (tasks/s) and success rate
+    - peak RSS of this process and of exited child processes
+
+Results are written as JSON and compared against a stored baseline; the run fails
+(exit 1) when a stage's p95 or the throughput regresses past the threshold, and when
+there is no baseline to compare against (record one with --update-baseline on the
+machine that runs the comparison, or pass --baseline none).
+
+Usage:
+    python -m benchmarks.bench_e2e [--concurrency 1,4] [--repeat 2] [--json results.json]
+    python -m benchmarks.bench_e2e --update-baseline       # record a new baseline
+    python -m benchmarks.bench_e2e --baseline none         # skip the comparison
+"""
+from typing import Dict, Any, List, Optional
+import argparse
+import asyncio
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from config import Config
+from benchmarks.fixture_site import FixtureSite, LAYOUTS
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "e2e.json")
+
+DEFAULT_QUERIES = [
+    "iPhone 15 Pro 256GB storage white color",
+    "Samsung Galaxy S24 Ultra",
+    "Google Pixel 8 Pro",
+    "Sony WH-1000XM5 Headphones",
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (pct in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100 * len(ordered))
+    return ordered[max(0, min(len(ordered), rank) - 1)]
+
+
+def distribution(values: List[float]) -> Dict[str, float]:
+    return {
+        "n": len(values),
+        "p50": round(percentile(values, 50), 1),
+        "p95": round(percentile(values, 95), 1),
+        "p99": round(percentile(values, 99), 1),
+        "mean": round(statistics.fmean(values), 1) if values else 0.0
+    }
+
+
+def peak_rss_mb() -> Dict[str, Optional[float]]:
+    """Peak resident set size of this process and of its exited children, in MB."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return {"self": None, "children": None}
+    # ru_maxrss is KB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1)
+    }
+
+
+def configure(args):
+    """Point the agents at offline, headless, fast-mode dependencies."""
+    Config.LLM_BACKEND = "mock"
+    Config.MOCK_LLM_LATENCY_MS = args.llm_latency_ms
+    Config.MOCK_LLM_RATE_LIMIT_RATE = args.rate_limit_rate
+    Config.LLM_CACHE_ENABLED = args.llm_cache
+    Config.EXECUTION_MODE = "fast"
+    Config.BROWSER_HEADLESS = True
+    # Start every run without learned selectors so runs are comparable
+    Config.SELECTOR_CACHE_PATH = os.path.join(tempfile.mkdtemp(prefix="bench-e2e-"), "selectors.json")
+
+
+async def run_level(orchestrator, site_url: str, queries: List[str], concurrency: int) -> Dict[str, Any]:
+    """Run every query at one concurrency level and aggregate the stage timings."""
+    from utils.stage_timer import record_stages
+
+    semaphore = asyncio.Semaphore(concurrency)
+    runs = []
+
+    async def run_one(query: str):
+        async with semaphore:
+            with record_stages() as stages:
+                started = time.perf_counter()
+                result = await orchestrator.execute({"query": query, "website": site_url, "save_artifacts": False})
+                total_ms = (time.perf_counter() - started) * 1000
+            runs.append({"status": result.get("status"), "total_ms": total_ms, "stages": stages.summary()})
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_one(query) for query in queries))
+    wall_s = time.perf_counter() - started
+
+    stage_samples: Dict[str, List[float]] = {}
+    for run in runs:
+        for name, entry in run["stages"].items():
+            stage_samples.setdefault(name, []).append(entry["total_ms"])
+    return {
+        "concurrency": concurrency,
+        "tasks": len(runs),
+        "succeeded": sum(1 for run in runs if run["status"] == "success"),
+        "wall_s": round(wall_s, 2),
+        "throughput_per_s": round(len(runs) / wall_s, 3) if wall_s else 0.0,
+        "total": distribution([run["total_ms"] for run in runs]),
+        "stages": {name: distribution(values) for name, values in sorted(stage_samples.items())}
+    }
+
+
+async def run(args) -> Dict[str, Any]:
+    configure(args)
+    # Imported after configure() so shared caches pick up the benchmark settings
+    from utils.llm_client import create_llm_client
+    from utils.browser_pool import BrowserPool
+    from agents.orchestrator_agent import OrchestratorAgent
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    queries = args.queries or DEFAULT_QUERIES
+    results = {"config": {
+        "layout": args.layout, "site_latency_ms": args.site_latency_ms, "page_kb": args.page_kb,
+        "llm_latency_ms": args.llm_latency_ms, "rate_limit_rate": args.rate_limit_rate,
+        "llm_cache": args.llm_cache, "queries": queries, "repeat": args.repeat
+    }, "levels": {}}
+
+    with FixtureSite(layout=args.layout, latency_ms=args.site_latency_ms, page_kb=args.page_kb) as site:
+        pool = BrowserPool(headless=True, max_contexts=max(levels))
+        orchestrator = OrchestratorAgent(create_llm_client(), browser_pool=pool)
+        try:
+            # Warm-up launches the browser so the first level doesn't pay for it
+            await orchestrator.execute({"query": queries[0], "website": site.url, "save_artifacts": False})
+            for level in levels:
+                level_result = await run_level(orchestrator, site.url, queries * args.repeat, level)
+                results["levels"][f"c{level}"] = level_result
+                print(f"concurrency {level}: {level_result['throughput_per_s']} tasks/s, "
+                      f"p95 {level_result['total']['p95']} ms, "
+                      f"{level_result['succeeded']}/{level_result['tasks']} succeeded", file=sys.stderr)
+        finally:
+            await orchestrator.cleanup()
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float, min_delta_ms: float) -> List[str]:
+    """
+    List regressions against the baseline: any stage (or total) p95 that grew by more
+    than `threshold` (fraction) and `min_delta_ms`, or throughput that fell by more
+    than `threshold`.
+    """
+    regressions = []
+    for key, level in results["levels"].items():
+        base = baseline.get("levels", {}).get(key)
+        if not base:
+            continue
+        if level["throughput_per_s"] < base["throughput_per_s"] * (1 - threshold):
+            regressions.append(f"{key} throughput {level['throughput_per_s']} < baseline {base['throughput_per_s']}")
+        pairs = [("total", level["total"], base["total"])]
+        pairs += [(name, dist, base["stages"][name]) for name, dist in level["stages"].items() if name in base["stages"]]
+        for name, dist, base_dist in pairs:
+            if dist["p95"] > base_dist["p95"] * (1 + threshold) and dist["p95"] - base_dist["p95"] > min_delta_ms:
+                regressions.append(f"{key} {name} p95 {dist['p95']} ms > baseline {base_dist['p95']} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark against the offline fixture store.")
+    parser.add_argument("--concurrency", default="1,4", help="Comma-separated concurrency levels")
+    parser.add_argument("--repeat", type=int, default=2, help="Times each query runs per level")
+    parser.add_argument("--query", dest="queries", action="append", help="Query to run (repeatable)")
+    parser.add_argument("--layout", choices=LAYOUTS, default="form")
+    parser.add_argument("--site-latency-ms", type=float, default=20)
+    parser.add_argument("--page-kb", type=int, default=200, help="Script padding per fixture page")
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of mock LLM calls failing with 429")
+    parser.add_argument("--llm-cache", action="store_true", help="Keep the LLM response cache enabled")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON to compare against ('none' to skip)")
+    parser.add_argument("--update-baseline", action="store_true", help="Save these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression as a fraction")
+    parser.add_argument("--min-delta-ms", type=float, default=50, help="Ignore p95 regressions smaller than this")
+    args = parser.parse_args()
+
+    if not args.update_baseline and args.baseline != "none" and not os.path.exists(args.baseline):
+        # Without a baseline the run could never fail, so don't pretend it passed
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one "
+              f"or --baseline none to skip the comparison", file=sys.stderr)
+        sys.exit(1)
+
+    results = asyncio.run(run(args))
+    output = json.dumps(results, indent=2)
+    if args.json:
+        with open(args.json, "w") as f:
+            f.write(output)
+    print(output)
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, "w") as f:
+            f.write(output)
+        print(f"Baseline updated: {BASELINE_PATH}", file=sys.stderr)
+        return
+
+    if args.baseline != "none":
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold, args.min_delta_ms)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
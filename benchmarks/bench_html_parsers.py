@@ -0,0 +1,93 @@
+"""
+Benchmark - Compares HTML parser backends on the fallback extraction workloads.
+
+Usage:
+    python -m benchmarks.bench_html_parsers [--repeat 5] [--fixtures DIR] [--json results.json]
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import time
+from utils.html_parser import available_backends, find_search_inputs, find_product_links
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def synthetic_page(products: int = 400, script_kb: int = 1500, search_in_header: bool = True) -> str:
+    """Build a retail-style page: a heavy <head>, a header search form and a product grid."""
+    script = "var payload = '" + ("x" * 1024) + "';\n"
+    head = "<head><title>Store</title>" + "".join(
+        f"<script>{script * 64}</script><style>.c{i} {{ color: red; }}</style>" for i in range(script_kb // 64)
+    ) + "</head>"
+    search = '<form action="/search"><input type="text" name="q" placeholder="Search"><button type="submit">Go</button></form>'
+    cards = "".join(
+        f'<div class="card"><a href="/p/{i}"><img src="/img/{i}.jpg" alt="Phone {i}"></a>'
+        f'<h3><a href="/product/{i}">Phone {i} 128GB</a></h3><span>${i}.99</span>'
+        f'<a href="/reviews/{i}">Reviews</a></div>'
+        for i in range(products)
+    )
+    body = (f"<header>{search if search_in_header else ''}</header>"
+            f"<main>{cards}</main>"
+            f"<footer>{'' if search_in_header else search}</footer>")
+    return f"<!DOCTYPE html><html>{head}<body>{body}</body></html>"
+
+
+def load_fixtures(directory: str):
+    """Return (name, html) pairs from saved pages, or synthetic pages if there are none."""
+    paths = sorted(glob.glob(os.path.join(directory, "*.html")))
+    if paths:
+        for path in paths:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                yield os.path.basename(path), f.read()
+        return
+    yield "synthetic_search_in_header", synthetic_page(search_in_header=True)
+    yield "synthetic_search_in_footer", synthetic_page(search_in_header=False)
+
+
+def time_call(fn, repeat: int) -> float:
+    """Median wall time of fn() in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run(repeat: int, fixtures_dir: str):
+    modes = [(backend, False) for backend in available_backends()]
+    modes.append(("stream", True))
+    results = []
+    for name, html in load_fixtures(fixtures_dir):
+        for backend, stream in modes:
+            results.append({
+                "fixture": name,
+                "size_kb": round(len(html) / 1024),
+                "backend": backend,
+                "search_inputs_ms": round(time_call(lambda: find_search_inputs(html, 1, backend, stream), repeat), 2),
+                "product_links_ms": round(time_call(lambda: find_product_links(html, "https://example.com", 5, backend, stream), repeat), 2)
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML parser backends.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (median is reported)")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="Directory of saved *.html pages")
+    parser.add_argument("--json", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.fixtures)
+    print(f"{'fixture':<32} {'KB':>6} {'backend':<12} {'search ms':>10} {'products ms':>12}")
+    for row in results:
+        print(f"{row['fixture']:<32} {row['size_kb']:>6} {row['backend']:<12} "
+              f"{row['search_inputs_ms']:>10} {row['product_links_ms']:>12}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark - Import-time startup cost of the CLI entry points.
+
+Imports each target module in a fresh interpreter under ``python -X importtime`` and
+reports the target's median import time (interpreter startup excluded), its heaviest
+direct imports, and any heavy dependency it imports eagerly. The run fails (exit 1)
+when a target exceeds its ``max_ms`` budget or imports a module on its ``forbidden`` list.
+
+Budgets live in benchmarks/startup_budget.json:
+    {"targets": {"main": {"max_ms": 150, "forbidden": ["openai", "playwright", ...]}}}
+
+Usage:
+    python -m benchmarks.bench_startup [--repeat 7] [--json results.json]
+    python -m benchmarks.bench_startup --target main --top 15
+    python -m benchmarks.bench_startup --update-budget     # re-derive max_ms from this machine
+"""
+from typing import Dict, Any, List, Tuple
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_PATH = os.path.join(os.path.dirname(__file__), "startup_budget.json")
+
+_IMPORT_LINE = re.compile(r"^import time:\s+(?P<self>\d+) \|\s+(?P<cumulative>\d+) \| (?P<indent>\s*)(?P<module>\S+)$")
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Entries of ``-X importtime`` output as {module, self_us, cumulative_us, depth}."""
+    entries = []
+    for line in stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            entries.append({
+                "module": match.group("module"),
+                "self_us": int(match.group("self")),
+                "cumulative_us": int(match.group("cumulative")),
+                "depth": len(match.group("indent")) // 2
+            })
+    return entries
+
+
+def measure_once(target: str) -> Tuple[float, List[Dict[str, Any]]]:
+    """Import target in a fresh interpreter; returns (import ms, entries of the target's import tree)."""
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {target}"],
+                               cwd=ROOT, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{completed.stderr[-2000:]}")
+    entries = parse_importtime(completed.stderr)
+    # Entries are printed children-first; the target's tree ends at its depth-0 line. Anything
+    # before that tree was imported by interpreter startup (site, .pth hooks), not by us.
+    end = max(i for i, entry in enumerate(entries) if entry["depth"] == 0 and entry["module"] == target)
+    start = end
+    while start > 0 and entries[start - 1]["depth"] > 0:
+        start -= 1
+    return entries[end]["cumulative_us"] / 1000, entries[start:end + 1]
+
+
+def measure(target: str, repeat: int, top: int, forbidden: List[str]) -> Dict[str, Any]:
+    """Median import time of target over `repeat` runs, after one warm-up run for bytecode caches."""
+    measure_once(target)
+    runs = [measure_once(target) for _ in range(repeat)]
+    totals = [total for total, _ in runs]
+    median_ms = statistics.median(totals)
+    # Report the breakdown of the run closest to the median
+    _, entries = min(runs, key=lambda run: abs(run[0] - median_ms))
+
+    imported = {entry["module"] for entry in entries}
+    eager = sorted(name for name in forbidden if name in imported)
+    heaviest = sorted((entry for entry in entries if entry["depth"] == 1),
+                      key=lambda entry: entry["cumulative_us"], reverse=True)[:top]
+    return {
+        "median_ms": round(median_ms, 1),
+        "min_ms": round(min(totals), 1),
+        "max_ms": round(max(totals), 1),
+        "modules": len(entries),
+        "forbidden_imported": eager,
+        "heaviest": [{"module": entry["module"], "cumulative_ms": round(entry["cumulative_us"] / 1000, 1)}
+                     for entry in heaviest]
+    }
+
+
+def check(results: Dict[str, Any], budget: Dict[str, Any]) -> List[str]:
+    """List budget violations."""
+    violations = []
+    for target, result in results.items():
+        limits = budget["targets"].get(target, {})
+        if "max_ms" in limits and result["median_ms"] > limits["max_ms"]:
+            violations.append(f"{target}: {result['median_ms']} ms > budget {limits['max_ms']} ms")
+        for name in result["forbidden_imported"]:
+            violations.append(f"{target}: imports {name} eagerly")
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure and check import-time startup cost.")
+    parser.add_argument("--budget", default=BUDGET_PATH, help="Budget JSON file")
+    parser.add_argument("--target", dest="targets", action="append",
+                        help="Module to import (repeatable; defaults to every target in the budget)")
+    parser.add_argument("--repeat", type=int, default=7, help="Measured runs per target")
+    parser.add_argument("--top", type=int, default=10, help="Heaviest imports to report per target")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--update-budget", action="store_true",
+                        help="Set each target's max_ms to the measured median times --headroom")
+    parser.add_argument("--headroom", type=float, default=1.5)
+    args = parser.parse_args()
+
+    with open(args.budget) as f:
+        budget = json.load(f)
+    targets = args.targets or list(budget["targets"])
+
+    results = {}
+    for target in targets:
+        forbidden = budget["targets"].get(target, {}).get("forbidden", [])
+        results[target] = measure(target, args.repeat, args.top, forbidden)
+        result = results[target]
+        print(f"{target}: median {result['median_ms']} ms ({result['modules']} modules)", file=sys.stderr)
+        for entry in result["heaviest"]:
+            print(f"    {entry['cumulative_ms']:>8} ms  {entry['module']}", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.json:
+        with open(args.json, "w") as f:
+            f.write(output)
+    print(output)
+
+    if args.update_budget:
+        for target, result in results.items():
+            budget["targets"].setdefault(target, {})["max_ms"] = round(result["median_ms"] * args.headroom)
+        with open(args.budget, "w") as f:
+            f.write(json.dumps(budget, indent=2) + "\n")
+        print(f"Budget updated: {args.budget}", file=sys.stderr)
+        return
+
+    violations = check(results, budget)
+    for violation in violations:
+        print(f"REGRESSION: {violation}", file=sys.stderr)
+    if violations:
+        sys.exit(1)
+    print("Startup within budget", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
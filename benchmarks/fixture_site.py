@@ -0,0 +1,376 @@
+"""
+Fixture Site - Local offline storefront for end-to-end benchmarks and tests.
+
+Serves a small catalog through the same flow the agents drive on real retail sites:
+home page with a search box, search results grid, product page with an "Add to Bag"
+button, cart, checkout form, order review and confirmation. Latency and page weight
+are configurable so measurements are repeatable without touching the internet.
+
+Layouts (chosen per server, or per request with ?layout=):
+    icon   - the search input is hidden until a search icon is clicked (like apple.com)
+    form   - a plain search form in the header
+
+Usage:
+    python -m benchmarks.fixture_site --port 8765 --layout icon --latency-ms 50 --page-kb 500
+    WEBSITE_OVERRIDE=http://127.0.0.1:8765 python main.py "iPhone 15 Pro 256GB white"
+
+In code:
+    with FixtureSite(layout="form", latency_ms=20) as site:
+        await orchestrator.execute({"query": "...", "website": site.url})
+"""
+from typing import Dict, Any, Optional, List
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from http import cookies
+import argparse
+import threading
+import random
+import html
+import time
+import uuid
+
+LAYOUTS = ["icon", "form"]
+
+CATALOG: List[Dict[str, Any]] = [
+    {"slug": "iphone-15-pro", "name": "iPhone 15 Pro", "price": 999, "brand": "Apple"},
+    {"slug": "iphone-15", "name": "iPhone 15", "price": 799, "brand": "Apple"},
+    {"slug": "iphone-15-pro-max", "name": "iPhone 15 Pro Max", "price": 1199, "brand": "Apple"},
+    {"slug": "galaxy-s24-ultra", "name": "Samsung Galaxy S24 Ultra", "price": 1299, "brand": "Samsung"},
+    {"slug": "galaxy-s24", "name": "Samsung Galaxy S24", "price": 799, "brand": "Samsung"},
+    {"slug": "pixel-8-pro", "name": "Google Pixel 8 Pro", "price": 999, "brand": "Google"},
+    {"slug": "wh-1000xm5", "name": "Sony WH-1000XM5 Headphones", "price": 399, "brand": "Sony"},
+    {"slug": "air-max-90", "name": "Nike Air Max 90", "price": 130, "brand": "Nike"},
+]
+
+CHECKOUT_FIELDS = [
+    ("email", "Email", "email"),
+    ("first_name", "First name", "text"),
+    ("last_name", "Last name", "text"),
+    ("address", "Address", "text"),
+    ("city", "City", "text"),
+    ("zip", "ZIP code", "text"),
+    ("phone", "Phone", "tel"),
+]
+
+
+def search_catalog(query: str) -> List[Dict[str, Any]]:
+    """Products whose name contains every word of the query (all products for an empty query)."""
+    words = query.lower().split()
+    return [product for product in CATALOG if all(word in product["name"].lower() for word in words)]
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Request handler; per-server settings live on self.server (see FixtureSite)."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # --- Plumbing ------------------------------------------------------------
+
+    def _delay(self):
+        latency = self.server.latency_ms
+        if latency:
+            jitter = self.server.jitter_ms
+            time.sleep(max(0.0, latency + random.uniform(-jitter, jitter)) / 1000)
+
+    def _session(self) -> str:
+        jar = cookies.SimpleCookie(self.headers.get("Cookie", ""))
+        sid = jar["sid"].value if "sid" in jar else None
+        if not sid or sid not in self.server.carts:
+            sid = uuid.uuid4().hex
+            self._new_sid = sid
+            with self.server.lock:
+                self.server.carts[sid] = []
+        return sid
+
+    def _send(self, status: int, body: str, content_type: str = "text/html; charset=utf-8",
+              headers: Optional[Dict[str, str]] = None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        if getattr(self, "_new_sid", None):
+            self.send_header("Set-Cookie", f"sid={self._new_sid}; Path=/")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def _redirect(self, location: str):
+        self._send(303, "", headers={"Location": location})
+
+    def _form(self) -> Dict[str, str]:
+        length = int(self.headers.get("Content-Length") or 0)
+        fields = parse_qs(self.rfile.read(length).decode("utf-8")) if length else {}
+        return {key: values[0] for key, values in fields.items()}
+
+    # --- Page chrome ---------------------------------------------------------
+
+    def _layout(self, query: Dict[str, List[str]]) -> str:
+        layout = (query.get("layout") or [self.server.layout])[0]
+        return layout if layout in LAYOUTS else self.server.layout
+
+    def _filler(self) -> str:
+        """Head-heavy padding, like the inline scripts and CSS of real retail pages."""
+        kb = self.server.page_kb
+        if not kb:
+            return ""
+        chunk = "window.__fixturePayload = (window.__fixturePayload || '') + '" + ("x" * 1000) + "';\n"
+        return f"<script>{chunk * kb}</script>"
+
+    def _page(self, title: str, body: str, layout: str, search_value: str = "") -> str:
+        sid = self._session()
+        count = len(self.server.carts.get(sid, []))
+        value = html.escape(search_value, quote=True)
+        if layout == "icon":
+            search = f"""
+            <button id="search-toggle" aria-label="Search" onclick="document.getElementById('search-panel').hidden = false; document.getElementById('search-input').focus();">&#128269;</button>
+            <div id="search-panel" hidden>
+                <form action="/search" method="get" role="search">
+                    <input id="search-input" type="search" name="q" placeholder="Search store" aria-label="Search" value="{value}">
+                    <button type="submit" aria-label="Submit search">Search</button>
+                </form>
+            </div>"""
+        else:
+            search = f"""
+            <form action="/search" method="get" class="search-form">
+                <input type="text" name="q" placeholder="Search products" value="{value}">
+                <button type="submit" class="search-button">Search</button>
+            </form>"""
+        return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{html.escape(title)} - Fixture Store</title>
+{self._filler()}
+<style>
+    body {{ font-family: sans-serif; margin: 0; }}
+    header {{ display: flex; gap: 16px; align-items: center; padding: 12px; border-bottom: 1px solid #ddd; }}
+    .grid {{ display: grid; grid-template-columns: repeat(4, 1fr); gap: 16px; padding: 16px; }}
+    .card img, .product img {{ width: 160px; height: 160px; }}
+</style>
+</head>
+<body>
+<header>
+    <a href="/" class="logo">Fixture Store</a>
+    {search}
+    <a href="/cart" aria-label="Cart" class="cart-link">Cart (<span id="cart-count">{count}</span>)</a>
+</header>
+<main>
+{body}
+</main>
+</body>
+</html>"""
+
+    # --- Routes --------------------------------------------------------------
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        self._new_sid = None
+        self._delay()
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        layout = self._layout(query)
+        path = url.path.rstrip("/") or "/"
+
+        if path == "/":
+            cards = self._cards(CATALOG[:4])
+            return self._send(200, self._page("Home", f"<h1>Featured</h1><div class='grid'>{cards}</div>", layout))
+        if path == "/search":
+            term = (query.get("q") or [""])[0]
+            results = search_catalog(term)
+            heading = f"<h1>Results for &quot;{html.escape(term)}&quot;</h1>"
+            grid = f"<div class='grid'>{self._cards(results)}</div>" if results else "<p>No products found.</p>"
+            return self._send(200, self._page("Search", heading + grid, layout, term))
+        if path.startswith("/product/"):
+            return self._product(path.split("/", 2)[2], layout)
+        if path.startswith("/img/"):
+            return self._image(path.split("/", 2)[2])
+        if path == "/cart":
+            return self._cart(layout)
+        if path == "/checkout":
+            return self._checkout(layout)
+        if path == "/review":
+            body = """
+            <h1>Review your order</h1>
+            <form action="/place-order" method="post">
+                <button type="submit" data-testid="place-order">Place Order</button>
+            </form>"""
+            return self._send(200, self._page("Review", body, layout))
+        if path == "/confirmation":
+            return self._send(200, self._page("Confirmation", "<h1>Thank you! Your order has been placed.</h1>", layout))
+        self._send(404, self._page("Not found", "<h1>Page not found</h1>", layout))
+
+    def do_POST(self):
+        self._new_sid = None
+        self._delay()
+        path = urlparse(self.path).path
+        sid = self._session()
+        form = self._form()
+        if path == "/api/cart":
+            slug = form.get("slug")
+            if not any(product["slug"] == slug for product in CATALOG):
+                return self._send(400, '{"error": "unknown product"}', "application/json")
+            with self.server.lock:
+                self.server.carts[sid].append(slug)
+                count = len(self.server.carts[sid])
+            return self._send(200, f'{{"count": {count}}}', "application/json")
+        if path == "/checkout":
+            return self._redirect("/review")
+        if path == "/place-order":
+            with self.server.lock:
+                self.server.orders.append({"sid": sid, "items": list(self.server.carts[sid])})
+                self.server.carts[sid] = []
+            return self._redirect("/confirmation")
+        self._send(404, "", "text/plain")
+
+    # --- Pages ---------------------------------------------------------------
+
+    def _cards(self, products: List[Dict[str, Any]]) -> str:
+        return "".join(f"""
+        <div class="card">
+            <a href="/product/{p['slug']}"><img src="/img/{p['slug']}.svg" alt="{html.escape(p['name'])}"></a>
+            <h3><a href="/product/{p['slug']}">{html.escape(p['name'])}</a></h3>
+            <span class="price">${p['price']}</span>
+        </div>""" for p in products)
+
+    def _product(self, slug: str, layout: str):
+        product = next((p for p in CATALOG if p["slug"] == slug), None)
+        if not product:
+            return self._send(404, self._page("Not found", "<h1>Product not found</h1>", layout))
+        body = f"""
+        <div class="product">
+            <img src="/img/{product['slug']}.svg" alt="{html.escape(product['name'])}">
+            <h1>{html.escape(product['name'])}</h1>
+            <span class="price">${product['price']}</span>
+            <label>Storage <select name="storage"><option>128GB</option><option>256GB</option><option>512GB</option></select></label>
+            <button id="add-to-bag" data-testid="add-to-cart" onclick="
+                fetch('/api/cart', {{method: 'POST', headers: {{'Content-Type': 'application/x-www-form-urlencoded'}}, body: 'slug={product['slug']}'}})
+                    .then(r => r.json()).then(d => {{ document.getElementById('cart-count').textContent = d.count; document.getElementById('added').hidden = false; }});
+            ">Add to Bag</button>
+            <p id="added" hidden>Added to your bag. <a href="/cart">View Cart</a></p>
+        </div>"""
+        self._send(200, self._page(product["name"], body, layout))
+
+    def _image(self, name: str):
+        label = html.escape(name.rsplit(".", 1)[0])
+        svg = (f'<svg xmlns="http://www.w3.org/2000/svg" width="160" height="160">'
+               f'<rect width="160" height="160" fill="#eee"/><text x="8" y="84" font-size="12">{label}</text></svg>')
+        self._send(200, svg, "image/svg+xml")
+
+    def _cart(self, layout: str):
+        slugs = self.server.carts.get(self._session(), [])
+        items = [p for slug in slugs for p in CATALOG if p["slug"] == slug]
+        if not items:
+            return self._send(200, self._page("Cart", "<h1>Your bag is empty.</h1>", layout))
+        rows = "".join(f"<li>{html.escape(p['name'])} - ${p['price']}</li>" for p in items)
+        body = f"""
+        <h1>Your Bag</h1>
+        <ul class="cart-items">{rows}</ul>
+        <p>Total: ${sum(p['price'] for p in items)}</p>
+        <button data-testid="checkout" onclick="location.href='/checkout'">Checkout</button>"""
+        self._send(200, self._page("Cart", body, layout))
+
+    def _checkout(self, layout: str):
+        fields = "".join(f"""
+            <label for="{name}">{label}</label>
+            <input id="{name}" name="{name}" type="{kind}" required>""" for name, label, kind in CHECKOUT_FIELDS)
+        body = f"""
+        <h1>Checkout</h1>
+        <form id="checkout-form" action="/checkout" method="post">
+            {fields}
+            <button type="submit" id="continue">Continue</button>
+        </form>"""
+        self._send(200, self._page("Checkout", body, layout))
+
+
+class FixtureSite:
+    """
+    Runs the fixture storefront on a background thread.
+
+    Usable as a context manager; `url` is the base URL to pass as the website override.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, layout: str = "icon",
+                 latency_ms: float = 0, jitter_ms: float = 0, page_kb: int = 0, verbose: bool = False):
+        """
+        Args:
+            port: 0 picks a free port
+            layout: Default storefront layout ("icon" or "form")
+            latency_ms: Added server latency per request
+            jitter_ms: Uniform +/- jitter around latency_ms
+            page_kb: Inline script padding per HTML page, in KB
+        """
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout: {layout} (expected one of {LAYOUTS})")
+        self.server = ThreadingHTTPServer((host, port), FixtureHandler)
+        self.server.daemon_threads = True
+        self.server.layout = layout
+        self.server.latency_ms = latency_ms
+        self.server.jitter_ms = jitter_ms
+        self.server.page_kb = page_kb
+        self.server.verbose = verbose
+        self.server.lock = threading.Lock()
+        self.server.carts = {}
+        self.server.orders = []
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def orders(self) -> List[Dict[str, Any]]:
+        """Orders placed so far (session id and product slugs)."""
+        return list(self.server.orders)
+
+    def start(self) -> "FixtureSite":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.server.serve_forever, name="fixture-site", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self.server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server.server_close()
+
+    def __enter__(self) -> "FixtureSite":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the offline fixture storefront.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--layout", choices=LAYOUTS, default="icon")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Added latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Uniform +/- jitter around the latency")
+    parser.add_argument("--page-kb", type=int, default=0, help="Inline script padding per HTML page")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    site = FixtureSite(args.host, args.port, args.layout, args.latency_ms, args.jitter_ms, args.page_kb, args.verbose)
+    print(f"Fixture store ({args.layout} layout) at {site.url} - Ctrl+C to stop")
+    try:
+        site.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,24 @@
 Configuration management for the Web Scraping Agent system.
 """
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+def _find_dotenv(filename: str = ".env") -> str:
+    """Nearest .env at or above this file's directory (where load_dotenv() would look)."""
+    path = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        candidate = os.path.join(path, filename)
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(path)
+        if parent == path:
+            return ""
+        path = parent
+
+# python-dotenv is only imported when there is a .env file to load
+_dotenv_path = _find_dotenv()
+if _dotenv_path:
+    from dotenv import load_dotenv
+    load_dotenv(_dotenv_path)
 
 class Config:
     """Application configuration."""
@@ -13,6 +28,31 @@ class Config:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL = "gpt-3.5-turbo"  # Using GPT-3.5-turbo (more accessible, can change to gpt-4 if available)
     
+    # LLM response cache
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))  # seconds
+    LLM_CACHE_MAX_ENTRIES = 1000  # In-memory LRU bound
+    LLM_CACHE_MAX_DISK_ENTRIES = 10000  # On-disk bound
+    LLM_CACHE_PRUNE_EVERY = 100  # Disk writes between prunes of expired and surplus entries
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_responses.sqlite3")  # Empty disables the disk backend
+    
+    # LLM backend: "openai", or "mock" for offline deterministic runs (utils.mock_llm)
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+    MOCK_LLM_LATENCY_MS = float(os.getenv("MOCK_LLM_LATENCY_MS", "300"))  # Median latency per call
+    MOCK_LLM_LATENCY_DISTRIBUTION = os.getenv("MOCK_LLM_LATENCY_DISTRIBUTION", "lognormal")  # fixed, uniform or lognormal
+    MOCK_LLM_RATE_LIMIT_RATE = float(os.getenv("MOCK_LLM_RATE_LIMIT_RATE", "0"))  # Fraction of calls failing with 429
+    MOCK_LLM_SEED = int(os.getenv("MOCK_LLM_SEED", "0"))
+    
+    # LLM request scheduling (shared by all agents)
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+    LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+    LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+    LLM_MAX_RETRIES = 4
+    LLM_RETRY_BASE_DELAY = 1.0  # seconds, doubled per attempt with +/-50% jitter
+    LLM_RETRY_MAX_DELAY = 30.0
+    LLM_BREAKER_THRESHOLD = 5  # Consecutive failures before calls fail fast
+    LLM_BREAKER_RESET = 60  # seconds before a trial call is let through
+    
     # Browser Configuration
     BROWSER_HEADLESS = False  # Show browser so user can see what's happening
     BROWSER_TIMEOUT = 30000  # 30 seconds
@@ -21,6 +61,94 @@ class Config:
     # Agent Configuration
     MAX_RETRIES = 3
     RETRY_DELAY = 2  # seconds
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))  # Tasks in flight in batch mode
+    
+    # Store to shop on regardless of the product, e.g. the local fixture site (benchmarks.fixture_site)
+    WEBSITE_OVERRIDE = os.getenv("WEBSITE_OVERRIDE", "")
+    
+    # Browser Pool Configuration
+    BROWSER_POOL_MAX_CONTEXTS = int(os.getenv("BROWSER_POOL_MAX_CONTEXTS", "4"))  # Concurrent contexts per browser
+    BROWSER_POOL_RECYCLE_AFTER = int(os.getenv("BROWSER_POOL_RECYCLE_AFTER", "50"))  # Relaunch browser after N contexts
+    
+    # Network request filtering (opt-in): "off", "no_tracking" or "essential" (stubs third-party images, blocks media/fonts/ads/analytics)
+    REQUEST_FILTER_PROFILE = os.getenv("REQUEST_FILTER_PROFILE", "off")
+    REQUEST_BLOCK_RESOURCE_TYPES = [t for t in os.getenv("REQUEST_BLOCK_RESOURCE_TYPES", "").split(",") if t]
+    REQUEST_BLOCK_DOMAINS = [d for d in os.getenv("REQUEST_BLOCK_DOMAINS", "").split(",") if d]
+    # Image hosts never stubbed: product images must keep their real size for the product locator.
+    # Images from the page's own site are always loaded too.
+    REQUEST_ALLOW_IMAGE_DOMAINS = [d for d in os.getenv(
+        "REQUEST_ALLOW_IMAGE_DOMAINS",
+        "media-amazon.com,ssl-images-amazon.com,walmartimages.com,bbystatic.com,ebayimg.com,target.scene7.com,apple.com"
+    ).split(",") if d]
+    
+    # Execution pacing: "fast" waits on page conditions, "demo" keeps fixed sleeps so actions are visible
+    EXECUTION_MODE = os.getenv("EXECUTION_MODE", "fast")
+    DOM_SETTLE_MS = int(os.getenv("DOM_SETTLE_MS", "300"))  # DOM must be mutation-free this long
+    NETWORK_QUIET_MS = int(os.getenv("NETWORK_QUIET_MS", "500"))  # No requests in flight this long
+    SETTLE_TIMEOUT = 10000  # Upper bound for any single settle wait (ms)
+    ACTION_SETTLE_TIMEOUT = int(os.getenv("ACTION_SETTLE_TIMEOUT", "3000"))  # Upper bound for DOM/network settling after a click or fill (ms)
+    
+    # Selector discovery: "probe" evaluates all candidates in one round trip, "race" waits on them concurrently
+    SELECTOR_PROBE_MODE = os.getenv("SELECTOR_PROBE_MODE", "probe")
+    SELECTOR_RACE_TIMEOUT = 2000  # Total budget for one selector race (ms)
+    
+    # Learned selector cache
+    SELECTOR_CACHE_PATH = os.getenv("SELECTOR_CACHE_PATH", ".cache/selectors.json")
+    SELECTOR_CACHE_MAX_FAILURES = 3  # Evict a selector after this many consecutive failed validations
+    SELECTOR_CACHE_FLUSH_DELAY = 2.0  # Seconds updates are batched before the file is rewritten
+    
+    # HTML parsing for fallback extraction: "auto" (fastest installed), "selectolax", "lxml", "html.parser" or "stream"
+    HTML_PARSER_BACKEND = os.getenv("HTML_PARSER_BACKEND", "auto")
+    HTML_PARSER_STREAM = os.getenv("HTML_PARSER_STREAM", "false").lower() == "true"  # Early-exit chunked parsing
+    
+    # Page outlines sent to the LLM instead of raw HTML (token budget ~ characters / 4)
+    PROMPT_PAGE_BUDGET_TOKENS = int(os.getenv("PROMPT_PAGE_BUDGET_TOKENS", "1500"))
+    
+    # CPU-bound work (parsing, large JSON) runs off the event loop: "thread", "process" or "inline"
+    CPU_EXECUTOR = os.getenv("CPU_EXECUTOR", "thread")
+    CPU_EXECUTOR_WORKERS = int(os.getenv("CPU_EXECUTOR_WORKERS", "0"))  # 0 = min(4, cpu count)
+    CPU_EXECUTOR_MAX_PENDING = 16  # Jobs queued or running before callers wait (back-pressure)
+    CPU_OFFLOAD_MIN_BYTES = 50_000  # Smaller inputs are processed inline
+    LOOP_STALL_MONITOR = True
+    LOOP_STALL_WARN_MS = 100  # Log when the event loop wakes up this late
+    
+    # Task planning: "auto" plans routine queries locally and asks the LLM otherwise, "heuristic" or "llm" force one path
+    PLANNER_MODE = os.getenv("PLANNER_MODE", "auto")
+    PLANNER_MIN_CONFIDENCE = 0.6  # Heuristic plans below this confidence are escalated to the LLM
+    
+    # Deadlines: total seconds one task may take (0 = unlimited; a task's "deadline_s" overrides it).
+    # Each plan step may use its even share of the time left times STEP_BUDGET_SLACK.
+    TASK_DEADLINE = float(os.getenv("TASK_DEADLINE", "300"))
+    STEP_BUDGET_SLACK = float(os.getenv("STEP_BUDGET_SLACK", "2.0"))
+    
+    # Product search: "single" searches one store, "fanout" searches several stores concurrently and ranks the listings
+    SEARCH_MODE = os.getenv("SEARCH_MODE", "single")
+    FANOUT_SITES = [site.strip() for site in os.getenv(
+        "FANOUT_SITES", "https://www.amazon.com,https://www.bestbuy.com,https://www.walmart.com").split(",") if site.strip()]
+    FANOUT_MAX_SITES = int(os.getenv("FANOUT_MAX_SITES", "4"))  # One page each, in the task's browser context
+    FANOUT_SITE_TIMEOUT = float(os.getenv("FANOUT_SITE_TIMEOUT", "90"))  # Seconds before a slow store is given up on
+    FANOUT_CONFIDENT_SCORE = 0.8  # Match score (share of spec terms in a listing) that ends the fan-out early
+    
+    # Daemon mode (daemon.py): resident job server on TCP or a Unix socket
+    DAEMON_HOST = os.getenv("DAEMON_HOST", "127.0.0.1")
+    DAEMON_PORT = int(os.getenv("DAEMON_PORT", "8765"))
+    DAEMON_SOCKET = os.getenv("DAEMON_SOCKET", "")  # Set to listen on a Unix socket instead of TCP
+    DAEMON_CONCURRENCY = int(os.getenv("DAEMON_CONCURRENCY", os.getenv("BATCH_CONCURRENCY", "4")))
+    DAEMON_DRAIN_TIMEOUT = float(os.getenv("DAEMON_DRAIN_TIMEOUT", "60"))  # Seconds running jobs get on shutdown
+    DAEMON_JOB_HISTORY = 500  # Finished jobs kept for status queries
+    
+    # Plan execution: steps run as a dependency graph ("depends_on"), independent ones on separate pages
+    PLAN_MAX_PARALLEL = int(os.getenv("PLAN_MAX_PARALLEL", "3"))  # Pages of one browser context in use at once
+    PLAN_STEP_RETRIES = int(os.getenv("PLAN_STEP_RETRIES", "1"))  # Retries for failed steps of the agents below
+    PLAN_RETRY_AGENTS = ["ProductSearch", "WebNavigator"]  # Safe to repeat; checkout steps are never retried by default
+    
+    # Tracing: nested spans per agent step, LLM call and page round trip, appended as OTLP/JSON lines
+    TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+    TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "logs/traces.jsonl")
+    
+    # Metrics: counters and histograms served in the Prometheus text format at /metrics (port 0 = no endpoint)
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
     
     # Logging
     LOG_LEVEL = "INFO"
@@ -28,6 +156,8 @@ class Config:
     @classmethod
     def validate(cls):
         """Validate that required configuration is present."""
-        if not cls.OPENAI_API_KEY:
+        if cls.LLM_BACKEND not in ("openai", "mock"):
+            raise ValueError(f"Unknown LLM_BACKEND: {cls.LLM_BACKEND}")
+        if cls.LLM_BACKEND == "openai" and not cls.OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY is not set in environment variables")
 
@@ -0,0 +1,277 @@
+"""
+Daemon entry point - Keeps the orchestrator, browser pool and caches warm and accepts
+jobs over a local HTTP API (TCP or Unix socket).
+
+Endpoints (JSON in and out):
+    POST   /jobs                  submit {"query": ..., "website": ..., "save_artifacts": false} -> 202 {"id": ...}
+                                  ("websites": [...], "fanout": true, "merge": true for multi-store search;
+                                   "deadline_s": 120 to cap the job's run time)
+    GET    /jobs                  list jobs (without results)
+    GET    /jobs/<id>             status, per-stage timings and, once finished, the result
+    GET    /jobs/<id>?wait=30     same, after waiting up to 30 s for the job to finish
+    GET    /jobs/<id>/stream      NDJSON event stream (queued, running, stage..., finished)
+    DELETE /jobs/<id>             cancel (also POST /jobs/<id>/cancel)
+    GET    /health                pool, scheduler and job counts
+    GET    /metrics               Prometheus metrics
+
+SIGINT/SIGTERM stop accepting jobs, let running ones finish (up to --drain-timeout)
+and close the browser.
+
+Usage:
+    python daemon.py --port 8765
+    python daemon.py --unix /tmp/agent.sock
+    curl -s localhost:8765/jobs -d '{"query": "iPhone 15 Pro 256GB white"}'
+    curl -sN localhost:8765/jobs/<id>/stream
+    curl -s --unix-socket /tmp/agent.sock http://localhost/jobs/<id>?wait=60
+"""
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+import argparse
+import asyncio
+import json
+import math
+import os
+import signal
+import stat
+import sys
+from config import Config
+
+REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+async def read_request(reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str], bytes]:
+    """Read one HTTP/1.1 request: (method, target, headers, body)."""
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    if not request_line:
+        raise ConnectionResetError("Client closed the connection")
+    try:
+        method, target, _ = request_line.split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length") or 0)
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+class DaemonServer:
+    """HTTP front end for a JobManager; one request per connection."""
+
+    def __init__(self, manager, orchestrator):
+        self.manager = manager
+        self.orchestrator = orchestrator
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                method, target, _, body = await read_request(reader)
+                await self.dispatch(method, target, body, writer)
+            except HTTPError as e:
+                await self.respond(writer, e.status, {"error": str(e)})
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            except Exception as e:
+                await self.respond(writer, 500, {"error": str(e)})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer: asyncio.StreamWriter, status: int, payload: Any,
+                      content_type: str = "application/json"):
+        body = payload if isinstance(payload, bytes) else (json.dumps(payload, default=str) + "\n").encode("utf-8")
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def stream(self, writer: asyncio.StreamWriter, job_id: str):
+        """Send a job's events as chunked NDJSON until it finishes."""
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+        async for event in self.manager.stream(job_id):
+            line = (json.dumps(event, default=str) + "\n").encode("utf-8")
+            writer.write(f"{len(line):x}\r\n".encode("latin-1") + line + b"\r\n")
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    def _job(self, job_id: str):
+        job = self.manager.get(job_id)
+        if job is None:
+            raise HTTPError(404, f"No job {job_id}")
+        return job
+
+    async def dispatch(self, method: str, target: str, body: bytes, writer: asyncio.StreamWriter):
+        url = urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+        query = parse_qs(url.query)
+
+        if parts == ["health"] and method == "GET":
+            from utils.llm_scheduler import get_llm_scheduler
+            await self.respond(writer, 200, {
+                "jobs": self.manager.stats(),
+                "browser_pool": await self.orchestrator.browser_pool.health_check(),
+                "llm_scheduler": get_llm_scheduler().stats()
+            })
+        elif parts == ["metrics"] and method == "GET":
+            from utils.metrics import render, CONTENT_TYPE
+            await self.respond(writer, 200, render().encode("utf-8"), CONTENT_TYPE)
+        elif parts == ["jobs"] and method == "POST":
+            try:
+                task = json.loads(body or b"{}")
+            except ValueError:
+                raise HTTPError(400, "Body must be a JSON object")
+            if not isinstance(task, dict):
+                raise HTTPError(400, "Body must be a JSON object")
+            # Screenshots and generated scripts are opt-in for service jobs
+            task.setdefault("save_artifacts", False)
+            try:
+                job = self.manager.submit(task)
+            except ValueError as e:
+                raise HTTPError(400, str(e))
+            except RuntimeError as e:
+                raise HTTPError(503, str(e))
+            await self.respond(writer, 202, {"id": job.id, "status": job.status})
+        elif parts == ["jobs"] and method == "GET":
+            await self.respond(writer, 200, [job.to_dict(include_result=False) for job in self.manager.jobs.values()])
+        elif len(parts) == 2 and parts[0] == "jobs" and method == "GET":
+            job = self._job(parts[1])
+            if "wait" in query:
+                try:
+                    wait = float(query["wait"][0] or 0)
+                except ValueError:
+                    wait = -1
+                if not math.isfinite(wait) or wait < 0:
+                    raise HTTPError(400, "wait must be a number of seconds")
+                # wait=0 (or empty) asks for the status right away
+                if wait:
+                    await self.manager.wait(job.id, timeout=wait)
+            await self.respond(writer, 200, job.to_dict())
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "stream" and method == "GET":
+            self._job(parts[1])
+            await self.stream(writer, parts[1])
+        elif ((len(parts) == 2 and parts[0] == "jobs" and method == "DELETE") or
+              (len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel" and method == "POST")):
+            job = self._job(parts[1])
+            if not self.manager.cancel(job.id):
+                raise HTTPError(409, f"Job {job.id} is already {job.status}")
+            await self.respond(writer, 202, {"id": job.id, "status": "cancelling"})
+        else:
+            raise HTTPError(404 if method in ("GET", "POST", "DELETE") else 405, f"No route for {method} {url.path}")
+
+
+async def remove_stale_socket(path: str):
+    """
+    Remove a Unix socket left behind by a daemon that is no longer running.
+
+    Raises:
+        RuntimeError: Another daemon is listening on the socket, or the path is not a socket
+    """
+    if not os.path.exists(path):
+        return
+    if not stat.S_ISSOCK(os.stat(path).st_mode):
+        raise RuntimeError(f"{path} exists and is not a socket")
+    try:
+        _, writer = await asyncio.open_unix_connection(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.unlink(path)
+        return
+    writer.close()
+    raise RuntimeError(f"Another daemon is already listening on {path}")
+
+
+async def serve(args):
+    if args.unix:
+        # Before the slow startup, so a second daemon fails fast
+        try:
+            await remove_stale_socket(args.unix)
+        except RuntimeError as e:
+            raise SystemExit(str(e))
+
+    # Heavy modules are loaded once, here, and then stay warm for every job
+    from utils.llm_client import create_llm_client
+    from utils.browser_pool import BrowserPool
+    from utils.job_manager import JobManager
+    from agents.orchestrator_agent import OrchestratorAgent
+
+    Config.validate()
+    pool = BrowserPool(headless=not args.headed, max_contexts=args.concurrency)
+    orchestrator = OrchestratorAgent(create_llm_client(timeout=60.0), browser_pool=pool)
+    manager = JobManager(orchestrator, max_concurrency=args.concurrency)
+    handler = DaemonServer(manager, orchestrator).handle
+
+    if args.warm:
+        # Launch the browser now so the first job doesn't pay for it
+        try:
+            await pool.release(await pool.acquire())
+        except Exception as e:
+            print(f"Browser warm-up failed ({e}); it will be launched by the first job", file=sys.stderr)
+
+    if args.unix:
+        server = await asyncio.start_unix_server(handler, path=args.unix)
+        where = f"unix:{args.unix}"
+    else:
+        server = await asyncio.start_server(handler, host=args.host, port=args.port)
+        where = f"http://{args.host}:{args.port}"
+    print(f"Agent daemon listening on {where} (concurrency {args.concurrency})", file=sys.stderr)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    try:
+        await stop.wait()
+    finally:
+        print("Shutting down: draining jobs...", file=sys.stderr)
+        manager.accepting = False
+        # Keep serving status and stream requests while jobs drain
+        await manager.drain(timeout=args.drain_timeout)
+        server.close()
+        await server.wait_closed()
+        await orchestrator.cleanup()
+        if args.unix and os.path.exists(args.unix):
+            os.unlink(args.unix)
+        print("Agent daemon stopped", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the agent as a resident job server.")
+    parser.add_argument("--host", default=Config.DAEMON_HOST)
+    parser.add_argument("--port", type=int, default=Config.DAEMON_PORT)
+    parser.add_argument("--unix", default=Config.DAEMON_SOCKET or None, help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--concurrency", "-c", type=int, default=Config.DAEMON_CONCURRENCY,
+                        help="Jobs run at once (one browser context each)")
+    parser.add_argument("--headed", action="store_true", help="Show the browser instead of running headless")
+    parser.add_argument("--no-warm", dest="warm", action="store_false", help="Launch the browser on the first job")
+    parser.add_argument("--drain-timeout", type=float, default=Config.DAEMON_DRAIN_TIMEOUT,
+                        help="Seconds to let running jobs finish on shutdown before cancelling them")
+    args = parser.parse_args()
+
+    from utils.logger import setup_logger
+    setup_logger(sys.stderr)
+    asyncio.run(serve(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,8 @@ Demo script to show the agent working in a visible browser.
 """
 import asyncio
 import sys
-from openai import AsyncOpenAI
 from config import Config
+from utils.llm_client import create_llm_client
 from utils.logger import setup_logger
 from agents.orchestrator_agent import OrchestratorAgent
 
@@ -27,11 +27,8 @@ async def demo():
         # Validate configuration
         Config.validate()
         
-        # Initialize OpenAI client
-        client = AsyncOpenAI(
-            api_key=Config.OPENAI_API_KEY,
-            timeout=60.0
-        )
+        # Initialize the LLM client (OpenAI, or the offline mock with LLM_BACKEND=mock)
+        client = create_llm_client(timeout=60.0)
         
         # Get user query
         if len(sys.argv) > 1:
@@ -1,26 +1,31 @@
 """
 Main entry point for the Web Scraping Agent system.
+
+Usage:
+    python main.py "iPhone 15 Pro 256GB storage white color"
+    python main.py            # prompts for a query
 """
 import asyncio
 import sys
-from openai import AsyncOpenAI
 from config import Config
-from utils.logger import setup_logger
-from agents.orchestrator_agent import OrchestratorAgent
 
-logger = setup_logger()
+USAGE = __doc__.strip()
 
 async def main():
     """Main function to run the web scraping agent."""
+    # The agents pull in Playwright, the OpenAI SDK and loguru; import them only once
+    # there is a query to run so that --help and module imports stay fast
+    from utils.llm_client import create_llm_client
+    from utils.logger import setup_logger
+    from agents.orchestrator_agent import OrchestratorAgent
+    
+    logger = setup_logger()
     try:
         # Validate configuration
         Config.validate()
         
-        # Initialize OpenAI client
-        client = AsyncOpenAI(
-            api_key=Config.OPENAI_API_KEY,
-            timeout=60.0
-        )
+        # Initialize the LLM client (OpenAI, or the offline mock with LLM_BACKEND=mock)
+        client = create_llm_client(timeout=60.0)
         
         # Get user query
         if len(sys.argv) > 1:
@@ -59,11 +64,12 @@ async def main():
                     print(f"  Message: {step_result['result']['message']}")
         
         print("\n" + "="*80)
-        print("\n⚠️  Browser will stay open for 10 seconds so you can see the final state...")
-        print("   Close the browser window manually or wait for it to close automatically.\n")
-        
-        # Keep browser open for a bit so user can see
-        await asyncio.sleep(10)
+        if Config.EXECUTION_MODE == "demo" and not Config.BROWSER_HEADLESS:
+            print("\n⚠️  Browser will stay open for 10 seconds so you can see the final state...")
+            print("   Close the browser window manually or wait for it to close automatically.\n")
+            
+            # Keep browser open for a bit so user can see
+            await asyncio.sleep(10)
         
         # Cleanup
         await orchestrator.cleanup()
@@ -79,5 +85,8 @@ async def main():
         return None
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in ("-h", "--help"):
+        print(USAGE)
+        sys.exit(0)
     asyncio.run(main())
 
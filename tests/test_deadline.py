@@ -0,0 +1,15 @@
+"""Unit tests for task budgets."""
+import pytest
+
+from utils.deadline import parse_budget
+
+
+@pytest.mark.parametrize("value, seconds", [(None, 0.0), ("", 0.0), (0, 0.0), ("90", 90.0), (2.5, 2.5)])
+def test_parse_budget(value, seconds):
+    assert parse_budget(value) == seconds
+
+
+@pytest.mark.parametrize("value", ["soon", -1, "inf", "nan", [30]])
+def test_parse_budget_rejects_non_numbers(value):
+    with pytest.raises(ValueError):
+        parse_budget(value)
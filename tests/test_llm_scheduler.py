@@ -0,0 +1,98 @@
+"""Unit tests for the LLM scheduler's circuit breaker and its interplay with deadlines."""
+import asyncio
+import time
+
+import pytest
+
+from utils.deadline import DeadlineExceeded, run_with_deadline
+from utils.llm_scheduler import LLMScheduler, CircuitBreaker, CircuitOpenError
+
+
+def make_half_open_scheduler() -> LLMScheduler:
+    breaker = CircuitBreaker(threshold=1, reset_after=60)
+    breaker.record_failure()
+    breaker.opened_at = time.monotonic() - 61
+    assert breaker.state == "half_open"
+    return LLMScheduler(max_concurrency=2, requests_per_minute=6000, tokens_per_minute=10 ** 6,
+                        max_retries=0, breaker=breaker)
+
+
+def test_cancelled_half_open_trial_admits_the_next_call():
+    async def scenario():
+        scheduler = make_half_open_scheduler()
+
+        async def hang():
+            await asyncio.sleep(10)
+
+        trial = asyncio.create_task(scheduler.submit(hang))
+        await asyncio.sleep(0.01)
+        # The trial holds the half-open slot; everyone else is turned away
+        with pytest.raises(CircuitOpenError):
+            await scheduler.submit(lambda: asyncio.sleep(0))
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        async def ok():
+            return "ok"
+
+        assert await scheduler.submit(ok) == "ok"
+        assert scheduler.breaker.state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_trial_cancelled_while_waiting_for_a_slot_is_released():
+    async def scenario():
+        scheduler = make_half_open_scheduler()
+        scheduler.max_concurrency = 0  # Nobody gets a slot
+        trial = asyncio.create_task(scheduler.submit(lambda: asyncio.sleep(0)))
+        await asyncio.sleep(0.01)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        assert scheduler.breaker.allow()
+
+    asyncio.run(scenario())
+
+
+def test_failed_trial_reopens_the_breaker():
+    async def scenario():
+        scheduler = make_half_open_scheduler()
+
+        async def fail():
+            raise ValueError("bad request")
+
+        with pytest.raises(ValueError):
+            await scheduler.submit(fail)
+        assert scheduler.breaker.state == "closed"  # A client error says nothing about API health
+
+        scheduler = make_half_open_scheduler()
+
+        async def unavailable():
+            raise ConnectionError("down")
+
+        with pytest.raises(ConnectionError):
+            await scheduler.submit(unavailable)
+        assert scheduler.breaker.state == "open"
+
+    asyncio.run(scenario())
+
+
+def test_timeout_from_the_callers_deadline_is_not_charged_to_the_breaker():
+    async def scenario():
+        scheduler = LLMScheduler(max_concurrency=2, requests_per_minute=6000, tokens_per_minute=10 ** 6,
+                                 max_retries=3, breaker=CircuitBreaker(threshold=1, reset_after=60))
+
+        async def clamped_call():
+            # What the SDK does when its timeout was clamped to the time left
+            await asyncio.sleep(0.25)
+            raise asyncio.TimeoutError()
+
+        with pytest.raises(DeadlineExceeded):
+            await run_with_deadline(scheduler.submit(clamped_call), 0.3, "Task")
+        assert scheduler.breaker.failures == 0
+        assert scheduler.breaker.state == "closed"
+        assert scheduler.retries == 0
+
+    asyncio.run(scenario())
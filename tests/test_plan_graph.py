@@ -0,0 +1,106 @@
+"""Unit tests for the plan dependency graph and its step deadlines."""
+import asyncio
+
+import pytest
+
+from config import Config
+from utils.deadline import current_deadline, run_with_deadline
+from utils.plan_graph import PlanGraph
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(Config, "RETRY_DELAY", 0)
+
+
+def failing(*step_numbers):
+    """run_step that fails the given steps and succeeds the others."""
+    async def run_step(node):
+        if node.id in step_numbers:
+            return {"status": "error", "data": {}, "message": f"step {node.id} failed"}
+        return {"status": "success", "data": {}, "message": ""}
+    return run_step
+
+
+def test_explicit_dependents_of_a_failed_step_are_skipped():
+    graph = PlanGraph([
+        {"step_number": 1, "depends_on": []},
+        {"step_number": 2, "depends_on": [1]},
+        {"step_number": 3, "depends_on": [2]},
+        {"step_number": 4, "depends_on": []},
+    ])
+    asyncio.run(graph.run(failing(1)))
+    assert graph.summary() == {"succeeded": [4], "failed": [1], "skipped": [2, 3], "pending": []}
+    assert graph.status() == "partial"
+
+
+def test_implicit_edges_keep_the_sequential_rule():
+    steps = [{"step_number": n} for n in range(1, 5)]
+
+    graph = PlanGraph(steps)
+    asyncio.run(graph.run(failing(2)))
+    assert graph.summary()["skipped"] == [3, 4]
+
+    graph = PlanGraph(steps)
+    asyncio.run(graph.run(failing(3)))
+    assert graph.summary()["succeeded"] == [1, 2, 4]
+
+
+def test_failed_steps_are_retried_up_to_their_count():
+    graph = PlanGraph([
+        {"step_number": 1, "depends_on": []},
+        {"step_number": 2, "depends_on": [], "retries": 0},
+    ], retries=2)
+    asyncio.run(graph.run(failing(1, 2)))
+    attempts = {result["step"]: result["attempts"] for result in graph.results()}
+    assert attempts == {1: 3, 2: 1}
+
+
+def test_retry_that_succeeds_marks_the_step_succeeded():
+    calls = []
+
+    async def flaky(node):
+        calls.append(node.id)
+        return {"status": "error" if len(calls) == 1 else "success", "data": {}}
+
+    graph = PlanGraph([{"step_number": 1}], retries=1)
+    asyncio.run(graph.run(flaky))
+    assert graph.status() == "success"
+    assert graph.results()[0]["attempts"] == 2
+
+
+@pytest.mark.parametrize("steps", [
+    [{"step_number": 1, "depends_on": [2]}, {"step_number": 2, "depends_on": [1]}],
+    [{"step_number": 1}, {"step_number": 1}],
+    [{"step_number": 1, "depends_on": [7]}],
+])
+def test_unusable_dependencies_raise_and_fall_back_to_a_chain(steps):
+    with pytest.raises(ValueError):
+        PlanGraph(steps)
+    graph = PlanGraph.sequential(steps)
+    assert [result["depends_on"] for result in graph.results()] == [[], [1]][:len(steps)]
+    asyncio.run(graph.run(failing()))
+    assert graph.status() == "success"
+
+
+def test_step_timeout_leaves_the_task_deadline_intact(monkeypatch):
+    monkeypatch.setattr(Config, "STEP_BUDGET_SLACK", 0.3)
+    graph = PlanGraph([
+        {"step_number": 1, "depends_on": []},
+        {"step_number": 2, "depends_on": []},
+    ])
+    task_deadlines = []
+
+    async def run_step(node):
+        task_deadlines.append(current_deadline().name)
+        if node.id == 1:
+            await asyncio.sleep(10)
+        return {"status": "success", "data": {}}
+
+    # The hung step times out on its own budget and the task goes on to the next step
+    asyncio.run(run_with_deadline(graph.run(run_step, max_parallel=1), 1.0, "Task"))
+    first, second = graph.results()
+    assert first["status"] == "failed" and first["result"]["data"] == {"timed_out": True}
+    assert "Step 1" in first["result"]["message"]
+    assert second["status"] == "succeeded"
+    assert task_deadlines == ["Step 1", "Step 2"]
@@ -0,0 +1,23 @@
+"""Unit tests for listing price parsing."""
+import pytest
+
+from utils.product_ranking import parse_price
+
+
+@pytest.mark.parametrize("text, price", [
+    ("$1,099.00", 1099.0),
+    ("Was $1,199 Now $999", 999.0),
+    ("$999.99 Was $1,199.99", 999.99),
+    ("$999 (Save $200)", 999.0),
+    ("$50 off $899", 899.0),
+    ("4.5 out of 5 stars $29.99", 29.99),
+    ("$1,199 $999", 999.0),
+    ("1.299,00 €", 1299.0),
+    ("9,99 €", 9.99),
+    ("1,199", 1199.0),
+    (12, 12.0),
+    ("Out of stock", None),
+    (None, None),
+])
+def test_parse_price(text, price):
+    assert parse_price(text) == price
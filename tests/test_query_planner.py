@@ -0,0 +1,66 @@
+"""Unit tests for local query parsing and the rule-based planner."""
+import pytest
+
+from config import Config
+from utils.query_planner import heuristic_plan, parse_query
+
+
+def actions(plan):
+    return [step["action"] for step in plan["steps"]]
+
+
+@pytest.mark.parametrize("query, expected_actions", [
+    ("buy iPhone 15 Pro 256GB white", ["search_product", "add_to_cart", "full_checkout"]),
+    ("add to cart nike air max", ["search_product", "add_to_cart"]),
+    ("add to cart and checkout nike air max", ["search_product", "add_to_cart", "full_checkout"]),
+    ("search for samsung galaxy s24", ["search_product"]),
+    ("how much is sony wh-1000xm5", ["search_product"]),
+    ("find and buy sony wh-1000xm5", ["search_product", "add_to_cart", "full_checkout"]),
+])
+def test_routine_queries_are_planned_locally(query, expected_actions):
+    plan, confidence = heuristic_plan(query)
+    assert actions(plan) == expected_actions
+    assert confidence >= Config.PLANNER_MIN_CONFIDENCE
+    assert [step["step_number"] for step in plan["steps"]] == list(range(1, len(expected_actions) + 1))
+
+
+@pytest.mark.parametrize("query", [
+    "iPhone 15",                       # No intent word and no brand
+    "find the cheapest iPhone 15",     # Unsupported intent
+    "compare pixel 8 and iphone 15",
+    "return my order",
+    "buy a laptop and a mouse",        # Multi-part
+    "",
+])
+def test_unclear_queries_go_to_the_llm(query):
+    _, confidence = heuristic_plan(query)
+    assert confidence < Config.PLANNER_MIN_CONFIDENCE
+
+
+def test_confidence_signals():
+    plan, confidence = heuristic_plan("buy iPhone 15 Pro 256GB white")
+    assert confidence == 0.8
+    assert plan["reasons"] == ["purchase: buy", "product identified", "specifications"]
+
+    plan, confidence = heuristic_plan("iPhone 15")
+    assert confidence == 0.5
+    assert plan["reasons"] == ["purchase (default)", "product identified"]
+
+
+def test_plans_are_copies():
+    plan, _ = heuristic_plan("buy iPhone 15")
+    plan["steps"][0]["action"] = "changed"
+    assert actions(heuristic_plan("buy iPhone 15")[0])[0] == "search_product"
+
+
+@pytest.mark.parametrize("query, search_query, brand, specifications", [
+    ("iPhone 15 Pro 256GB white", "iPhone 15", None, {"storage": "256GB", "color": "white", "model": "15 pro"}),
+    ("Samsung Galaxy S24 Ultra black", "Samsung Galaxy S24", "Samsung", {"color": "black"}),
+    ("wireless earbuds", "wireless earbuds", None, {}),
+    ("sony noise cancelling headphones", "sony noise cancelling", "Sony", {}),
+])
+def test_parse_query(query, search_query, brand, specifications):
+    specs = parse_query(query)
+    assert specs["search_query"] == search_query
+    assert specs["brand"] == brand
+    assert specs["specifications"] == specifications
@@ -0,0 +1,56 @@
+"""Unit tests for request filter matching."""
+import pytest
+
+from utils.request_filter import RequestFilter
+
+
+@pytest.fixture
+def essential():
+    return RequestFilter("essential", block_domains=["ads.example.com", "facebook.com/tr"])
+
+
+@pytest.mark.parametrize("url, blocked", [
+    ("https://ads.example.com/x.js", True),
+    ("https://cdn.ads.example.com/x.js", True),
+    ("https://notads.example.com/x.js", False),
+    ("https://www.facebook.com/tr?id=1", True),
+    ("https://www.facebook.com/tr/", True),
+    ("https://www.facebook.com/travel", False),
+    ("https://www.facebook.com/", False),
+    ("https://cdn.segment.com/analytics.js", True),
+    ("https://notsegment.com/analytics.js", False),
+])
+def test_block_patterns_match_host_suffix_and_path_prefix(essential, url, blocked):
+    assert essential._matches_domain(url) is blocked
+
+
+@pytest.mark.parametrize("host, site", [
+    ("m.media-amazon.com", "media-amazon.com"),
+    ("www.bestbuy.com", "bestbuy.com"),
+    ("images.shop.co.uk", "shop.co.uk"),
+    ("www.store.com.au", "store.com.au"),
+    ("cdn.example.de", "example.de"),
+    ("127.0.0.1", "127.0.0.1"),
+])
+def test_site(host, site):
+    assert RequestFilter._site(host) == site
+
+
+@pytest.mark.parametrize("url, page_url, decision", [
+    # Same site as the page, or a known store image CDN: the real image
+    ("https://images.shop.co.uk/p.jpg", "https://www.shop.co.uk/item", "allow"),
+    ("https://m.media-amazon.com/images/p.jpg", "https://www.amazon.com/s?k=x", "allow"),
+    # Another site that merely shares the public suffix is third-party
+    ("https://tracker.other.co.uk/p.gif", "https://www.shop.co.uk/item", "stub"),
+    ("https://img.thirdparty.net/banner.png", "https://www.shop.com/", "stub"),
+    ("https://img.thirdparty.net/banner.png", None, "stub"),
+])
+def test_images(essential, url, page_url, decision):
+    assert essential.decide(url, "image", page_url) == decision
+
+
+def test_resource_types_and_data_urls(essential):
+    assert essential.decide("https://www.shop.com/font.woff2", "font") == "abort"
+    assert essential.decide("https://www.shop.com/app.js", "script") == "allow"
+    assert essential.decide("data:image/png;base64,AAAA", "image") == "allow"
+    assert RequestFilter("off").decide("https://img.thirdparty.net/banner.png", "image") == "allow"
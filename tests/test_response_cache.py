@@ -0,0 +1,35 @@
+"""Unit tests for the LLM response cache and its background disk writes."""
+import asyncio
+import sqlite3
+
+from utils.response_cache import ResponseCache
+
+
+def make_cache(tmp_path, **kwargs) -> ResponseCache:
+    return ResponseCache(max_entries=10, ttl_seconds=3600, path=str(tmp_path / "cache.sqlite3"), **kwargs)
+
+
+def test_writes_reach_disk_and_are_read_back_off_the_loop(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set_many({"exact:a": "1", "norm:a": "1"})
+    cache.close()
+
+    reopened = make_cache(tmp_path)
+    assert asyncio.run(reopened.lookup_async("exact:b", "norm:a")) == ("norm:a", "1")
+    assert asyncio.run(reopened.lookup_async("exact:c")) == (None, None)
+    assert (reopened.hits, reopened.misses) == (1, 1)
+    # The disk hit is now served from memory
+    assert reopened.get("norm:a") == "1"
+
+
+def test_disk_is_pruned_every_n_writes_not_on_each(tmp_path):
+    cache = make_cache(tmp_path, max_disk_entries=2, prune_every=5)
+    for n in range(4):
+        cache.set(f"k{n}", str(n))
+    cache.flush()
+    count = lambda: sqlite3.connect(cache.path).execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+    assert count() == 4
+    cache.set("k4", "4")
+    cache.flush()
+    assert count() == 2
+    cache.close()
@@ -0,0 +1,239 @@
+"""
+Browser Pool - Keeps a long-lived browser and hands out fresh contexts per task.
+"""
+from typing import Dict, Any, Optional, Set, TYPE_CHECKING
+from contextlib import asynccontextmanager
+from utils.logger import logger
+from config import Config
+from utils.request_filter import RequestFilter
+from utils.metrics import POOL_CONTEXTS, POOL_WAIT_SECONDS
+import asyncio
+import time
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, BrowserContext
+
+class BrowserPool:
+    """Long-lived Chromium instance that leases isolated BrowserContexts."""
+
+    def __init__(self, headless: Optional[bool] = None, max_contexts: Optional[int] = None,
+                 recycle_after: Optional[int] = None, request_filter: Optional[RequestFilter] = None):
+        """
+        Initialize the pool. The browser itself is launched lazily on first acquire.
+
+        Args:
+            headless: Launch the browser headless (defaults to Config.BROWSER_HEADLESS)
+            max_contexts: Maximum number of contexts leased at the same time
+            recycle_after: Relaunch the browser after it has served this many contexts
+            request_filter: Request blocking applied to every context (defaults to Config profile)
+        """
+        self.headless = Config.BROWSER_HEADLESS if headless is None else headless
+        self.max_contexts = max_contexts or Config.BROWSER_POOL_MAX_CONTEXTS
+        self.recycle_after = recycle_after or Config.BROWSER_POOL_RECYCLE_AFTER
+        self.context_options: Dict[str, Any] = {
+            "viewport": {'width': 1920, 'height': 1080},
+            "user_agent": 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+        }
+        self.request_filter = request_filter or RequestFilter()
+        self.playwright = None
+        self.browser: Optional["Browser"] = None
+        self.logger = logger.bind(agent="BrowserPool")
+        self._semaphore = asyncio.Semaphore(self.max_contexts)
+        self._lock = asyncio.Lock()
+        self._leases: Dict["BrowserContext", "Browser"] = {}
+        self._retiring: Set["Browser"] = set()
+        self._uses = 0
+        self._closed = False
+        POOL_CONTEXTS.set(self.max_contexts, state="max")
+
+    def log(self, message: str, level: str = "info"):
+        """Log a message with the pool's context."""
+        log_func = getattr(self.logger, level.lower(), self.logger.info)
+        log_func(message)
+
+    @property
+    def active_contexts(self) -> int:
+        """Number of contexts currently leased out."""
+        return len(self._leases)
+
+    def is_healthy(self) -> bool:
+        """Check whether the current browser is alive and connected."""
+        try:
+            return self.browser is not None and self.browser.is_connected()
+        except Exception:
+            return False
+
+    async def health_check(self) -> Dict[str, Any]:
+        """Report pool state, relaunching the browser if it has died."""
+        async with self._lock:
+            if self.browser is not None and not self.is_healthy():
+                self.log("Browser disconnected, relaunching on health check", "warning")
+                await self._discard_browser()
+                await self._ensure_browser()
+        return {
+            "healthy": self.is_healthy(),
+            "active_contexts": self.active_contexts,
+            "max_contexts": self.max_contexts,
+            "uses": self._uses,
+            "recycle_after": self.recycle_after,
+            "requests": dict(self.request_filter.stats)
+        }
+
+    async def _launch_browser(self) -> "Browser":
+        """Launch Chromium, preferring system Chrome in visible mode."""
+        if not self.playwright:
+            # Imported here so loading the pool doesn't pay for Playwright until a browser is needed
+            from playwright.async_api import async_playwright
+            self.log("Starting Playwright...")
+            self.playwright = await async_playwright().start()
+
+        self.log(f"Launching browser (headless={self.headless})...")
+        if not self.headless:
+            # Try using system Chrome first (more stable on macOS)
+            try:
+                browser = await self.playwright.chromium.launch(
+                    headless=False,
+                    channel='chrome',
+                    slow_mo=500
+                )
+                self.log("✅ Successfully launched system Chrome")
+                return browser
+            except Exception as e:
+                self.log(f"System Chrome not available: {e}, trying bundled Chromium", "warning")
+
+        if self.headless:
+            browser = await self.playwright.chromium.launch(
+                headless=True,
+                args=['--no-sandbox', '--disable-dev-shm-usage']
+            )
+        else:
+            browser = await self.playwright.chromium.launch(
+                headless=False,
+                slow_mo=500,
+                args=[]
+            )
+        self.log("✅ Successfully launched bundled Chromium")
+        return browser
+
+    async def _ensure_browser(self) -> "Browser":
+        """Return a healthy browser, launching or replacing it if necessary."""
+        if self.browser is not None and not self.is_healthy():
+            self.log("Browser is no longer connected, relaunching", "warning")
+            await self._discard_browser()
+
+        if self.browser is None:
+            try:
+                self.browser = await self._launch_browser()
+            except Exception:
+                # Playwright driver may be wedged - restart it once before giving up
+                await self._stop_playwright()
+                self.browser = await self._launch_browser()
+            self._uses = 0
+        return self.browser
+
+    async def _discard_browser(self):
+        """Forget the current browser, closing it if nothing still uses it."""
+        browser = self.browser
+        self.browser = None
+        if browser is None:
+            return
+        for context, owner in list(self._leases.items()):
+            if owner is browser:
+                self._leases.pop(context, None)
+                self._semaphore.release()
+        POOL_CONTEXTS.set(len(self._leases), state="active")
+        try:
+            await browser.close()
+        except Exception:
+            pass
+
+    async def _stop_playwright(self):
+        """Stop the Playwright driver."""
+        if self.playwright:
+            try:
+                await self.playwright.stop()
+            except Exception:
+                pass
+            self.playwright = None
+
+    async def acquire(self) -> "BrowserContext":
+        """Lease a fresh BrowserContext, waiting if the pool is at capacity."""
+        if self._closed:
+            raise RuntimeError("Browser pool is closed")
+
+        started = time.perf_counter()
+        await self._semaphore.acquire()
+        POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+        try:
+            async with self._lock:
+                browser = await self._ensure_browser()
+                context = await browser.new_context(**self.context_options)
+                try:
+                    await self.request_filter.attach(context)
+                except Exception:
+                    await context.close()
+                    raise
+                self._leases[context] = browser
+                self._uses += 1
+                POOL_CONTEXTS.set(len(self._leases), state="active")
+
+                # Retire the browser once it has served enough contexts; it is
+                # closed when its last leased context is released.
+                if self._uses >= self.recycle_after:
+                    self.log(f"Browser served {self._uses} contexts, recycling")
+                    self._retiring.add(browser)
+                    self.browser = None
+            return context
+        except Exception:
+            self._semaphore.release()
+            raise
+
+    async def release(self, context: Optional["BrowserContext"]):
+        """Close a leased context and return its slot to the pool."""
+        if context is None:
+            return
+        browser = self._leases.pop(context, None)
+        POOL_CONTEXTS.set(len(self._leases), state="active")
+        try:
+            await context.close()
+        except Exception:
+            pass
+        if browser is None:
+            return
+        self._semaphore.release()
+
+        if browser in self._retiring and browser not in self._leases.values():
+            self._retiring.discard(browser)
+            try:
+                await browser.close()
+            except Exception:
+                pass
+
+    @asynccontextmanager
+    async def context(self):
+        """Async context manager that leases and releases a BrowserContext."""
+        context = await self.acquire()
+        try:
+            yield context
+        finally:
+            await self.release(context)
+
+    async def close(self):
+        """Close every context, browser and the Playwright driver."""
+        self._closed = True
+        for context in list(self._leases.keys()):
+            await self.release(context)
+        for browser in list(self._retiring):
+            try:
+                await browser.close()
+            except Exception:
+                pass
+        self._retiring.clear()
+        if self.browser:
+            try:
+                await self.browser.close()
+            except Exception:
+                pass
+            self.browser = None
+        await self._stop_playwright()
+        self.log("Browser pool closed")
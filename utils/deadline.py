@@ -0,0 +1,161 @@
+"""
+Deadlines - A time budget for a task that every wait inside it respects.
+
+The current Deadline is bound through a context variable, so it follows the task into
+every agent, helper and asyncio.create_task child without being passed around. Code
+that waits on the browser or the API asks for its timeout through clamp_ms/clamp_seconds,
+which shorten it to the time left and raise DeadlineExceeded once the budget is spent.
+run_with_deadline also enforces the budget from outside: when it runs out the work is
+cancelled, so ``finally`` blocks still run and browser contexts go back to the pool.
+
+Outside a deadline every helper returns the timeout it was given.
+
+Usage:
+    result = await run_with_deadline(orchestrator.run_task(task), 120, "Task")
+
+    # Inside: a step gets its share of what is left
+    await run_with_deadline(run_step(step), step_budget(steps_left), f"step {n}")
+
+    await page.goto(url, timeout=clamp_ms(60000))
+"""
+from typing import Optional, Awaitable, TypeVar
+from contextvars import ContextVar
+from config import Config
+import asyncio
+import math
+import time
+
+T = TypeVar("T")
+
+# Waits shorter than this are not worth starting (seconds)
+MIN_TIMEOUT = 0.05
+# Share of the time left that step budgets hold back, so a task can still report
+# what its steps did before the task deadline itself fires
+WRAP_UP_SHARE = 0.05
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The task's time budget ran out."""
+
+
+class Deadline:
+    """A point in (monotonic) time by which the work must be done."""
+
+    __slots__ = ("name", "budget", "expires_at")
+
+    def __init__(self, seconds: float, name: str = "task", parent: Optional["Deadline"] = None):
+        self.name = name
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+        # A child can never outlive its parent
+        if parent is not None and parent.expires_at < self.expires_at:
+            self.expires_at = parent.expires_at
+            self.name = parent.name
+            self.budget = parent.budget
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() < MIN_TIMEOUT
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None outside one."""
+    deadline = _current_deadline.get()
+    return deadline.remaining() if deadline else None
+
+
+def check_deadline():
+    """
+    Cooperative cancellation point.
+
+    Raises:
+        DeadlineExceeded: The current deadline has passed
+    """
+    deadline = _current_deadline.get()
+    if deadline is not None and deadline.expired:
+        raise DeadlineExceeded(f"{deadline.name} ran out of its {round(deadline.budget, 1):g}s budget")
+
+
+def clamp_seconds(timeout: Optional[float]) -> Optional[float]:
+    """
+    `timeout` shortened to the time left (None means "no timeout of its own").
+
+    Raises:
+        DeadlineExceeded: No time is left
+    """
+    check_deadline()
+    left = remaining()
+    if left is None:
+        return timeout
+    return left if timeout is None else min(timeout, left)
+
+
+def clamp_ms(timeout_ms: Optional[float]) -> Optional[int]:
+    """clamp_seconds for Playwright-style millisecond timeouts."""
+    seconds = clamp_seconds(None if timeout_ms is None else timeout_ms / 1000)
+    return None if seconds is None else max(1, int(seconds * 1000))
+
+
+def parse_budget(value) -> float:
+    """
+    A task's "deadline_s" as seconds (None, "" and 0 mean no budget).
+
+    Raises:
+        ValueError: Not a finite, non-negative number
+    """
+    try:
+        seconds = float(value or 0)
+    except (TypeError, ValueError):
+        raise ValueError(f"deadline_s must be a number of seconds, got {value!r}")
+    if not math.isfinite(seconds) or seconds < 0:
+        raise ValueError(f"deadline_s must be a number of seconds, got {value!r}")
+    return seconds
+
+
+def step_budget(steps_left: int, slack: Optional[float] = None) -> Optional[float]:
+    """
+    Seconds the next of `steps_left` steps may use: an even share of the time left,
+    times `slack` (Config.STEP_BUDGET_SLACK) so a slow step can borrow from cheap ones.
+    None outside a deadline.
+    """
+    left = remaining()
+    if left is None:
+        return None
+    slack = Config.STEP_BUDGET_SLACK if slack is None else slack
+    return min(left * (1 - WRAP_UP_SHARE), left / max(1, steps_left) * slack)
+
+
+async def run_with_deadline(awaitable: Awaitable[T], seconds: Optional[float], name: str = "task") -> T:
+    """
+    Await `awaitable` with at most `seconds` (and never past the enclosing deadline).
+
+    Args:
+        seconds: Budget; None or 0 only inherits the enclosing deadline
+
+    Raises:
+        DeadlineExceeded: The budget ran out; the work was cancelled and has unwound
+    """
+    parent = _current_deadline.get()
+    if not seconds:
+        return await awaitable
+    deadline = Deadline(seconds, name, parent)
+    token = _current_deadline.set(deadline)
+    try:
+        # wait_for copies the context into the task it creates, deadline included
+        return await asyncio.wait_for(awaitable, deadline.remaining())
+    except asyncio.TimeoutError as e:
+        if isinstance(e, DeadlineExceeded) or not deadline.expired:
+            raise
+        raise DeadlineExceeded(f"{deadline.name} ran out of its {round(deadline.budget, 1):g}s budget") from None
+    finally:
+        _current_deadline.reset(token)
@@ -0,0 +1,205 @@
+"""
+DOM Condenser - Compact, token-budgeted page outlines for LLM prompts.
+
+Instead of the first few thousand characters of raw HTML (mostly <head>, scripts and CSS
+on real retail pages), prompts get an outline of what the model actually needs: forms and
+their fields, buttons and links, headings and product cards, each with a stable selector.
+The outline is extracted in one page.evaluate call and formatted to a token budget.
+"""
+from typing import Dict, Any, Optional, List
+from utils.page_snapshot import ELEMENT_HELPERS_JS
+
+SECTIONS = ["headings", "forms", "controls", "products"]
+
+# Sections in order of importance for each kind of question asked about a page
+FOCUS_ORDER = {
+    "search": ["forms", "controls", "headings", "products"],
+    "products": ["products", "headings", "controls", "forms"],
+    "cart": ["controls", "headings", "products", "forms"],
+    "checkout": ["forms", "controls", "headings", "products"]
+}
+
+CONDENSE_PAGE_JS = """
+({maxItems}) => {
+""" + ELEMENT_HELPERS_JS + """
+    const clean = (s, n) => (s || '').replace(/\\s+/g, ' ').trim().slice(0, n);
+    const labelFor = (el) => {
+        if (el.id) {
+            const label = document.querySelector(`label[for="${el.id.replace(/"/g, '\\\\"')}"]`);
+            if (label) return clean(label.innerText, 60);
+        }
+        const wrapping = el.closest('label');
+        return wrapping ? clean(wrapping.innerText, 60) : null;
+    };
+    const describe = (el) => ({
+        tag: el.tagName.toLowerCase(),
+        type: el.getAttribute('type'),
+        name: el.getAttribute('name'),
+        text: clean(el.innerText || el.value, 60),
+        label: labelFor(el),
+        placeholder: el.getAttribute('placeholder'),
+        aria_label: el.getAttribute('aria-label'),
+        href: el.getAttribute('href'),
+        selector: stableSelector(el)
+    });
+    const fieldQuery = 'input:not([type="hidden"]), select, textarea';
+    const buttonQuery = 'button, input[type="submit"], input[type="button"], [role="button"]';
+
+    const headings = [];
+    for (const el of document.querySelectorAll('h1, h2, h3')) {
+        if (headings.length >= maxItems) break;
+        const text = clean(el.innerText, 120);
+        if (text && isVisible(el)) headings.push({level: Number(el.tagName[1]), text});
+    }
+
+    const forms = [];
+    for (const form of document.querySelectorAll('form')) {
+        if (forms.length >= maxItems) break;
+        if (!isVisible(form)) continue;
+        const fields = [...form.querySelectorAll(fieldQuery)].filter(isVisible).slice(0, 20).map(describe);
+        const buttons = [...form.querySelectorAll(buttonQuery)].filter(isVisible).slice(0, 5).map(describe);
+        if (fields.length || buttons.length) {
+            forms.push({selector: stableSelector(form), action: form.getAttribute('action'),
+                        method: (form.getAttribute('method') || 'get').toLowerCase(), fields, buttons});
+        }
+    }
+
+    // Buttons and stray fields first, then links, so short budgets keep the actionable items
+    const controls = [];
+    const seen = new Set();
+    for (const query of [buttonQuery + ', ' + fieldQuery + ', [role="searchbox"]', 'a[href]']) {
+        for (const el of document.querySelectorAll(query)) {
+            if (controls.length >= maxItems) break;
+            if (seen.has(el) || el.closest('form') || !isVisible(el)) continue;
+            seen.add(el);
+            const item = describe(el);
+            if (item.tag === 'a' && !item.text && !item.aria_label) continue;
+            controls.push(item);
+        }
+    }
+
+    // Product cards: the smallest container around a price that also holds a link
+    const products = [];
+    const cards = new Set();
+    const priceRe = /(?:[$€£¥₹]\\s?\\d[\\d,.]*|\\d[\\d,.]*\\s?(?:USD|EUR|GBP))/;
+    const walker = document.createTreeWalker(document.body || document.documentElement, NodeFilter.SHOW_TEXT);
+    while (walker.nextNode() && products.length < maxItems) {
+        const match = priceRe.exec(walker.currentNode.nodeValue || '');
+        const parent = walker.currentNode.parentElement;
+        if (!match || !parent || ['SCRIPT', 'STYLE', 'NOSCRIPT'].includes(parent.tagName)) continue;
+        let card = parent;
+        for (let i = 0; card && i < 6 && !card.querySelector('a[href]') && !card.closest('a[href]'); i++) {
+            card = card.parentElement;
+        }
+        if (!card || cards.has(card) || clean(card.innerText, 1000).length > 600 || !isVisible(card)) continue;
+        cards.add(card);
+        const link = card.closest('a[href]') || card.querySelector('a[href]');
+        if (!link) continue;
+        const heading = card.querySelector('h1, h2, h3, h4, [class*="title" i], [class*="name" i]');
+        const image = card.querySelector('img[alt]');
+        const title = clean((heading && heading.innerText) || (link && link.innerText) || (image && image.alt), 100);
+        if (!title) continue;
+        products.push({title, price: match[0].trim(), href: link.getAttribute('href'), selector: stableSelector(link)});
+    }
+
+    return {url: location.href, title: clean(document.title, 120), headings, forms, controls, products};
+}
+"""
+
+
+async def extract_page_outline(page, max_items: int = 60) -> Dict[str, Any]:
+    """
+    Extract the raw page outline in one page.evaluate call.
+
+    Returns:
+        Dict with url, title, and lists of headings, forms, controls and products
+        (at most max_items each)
+    """
+    return await page.evaluate(CONDENSE_PAGE_JS, {"maxItems": max_items})
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting (about 4 characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def _describe(item: Dict[str, Any]) -> str:
+    tag = item.get("tag") or "element"
+    if item.get("type") and tag == "input":
+        tag = f"input[type={item['type']}]"
+    parts = [tag]
+    for key in ("text", "label", "placeholder", "aria_label"):
+        if item.get(key):
+            parts.append(f'{key}="{item[key]}"')
+            break
+    if item.get("name"):
+        parts.append(f"name={item['name']}")
+    if item.get("href"):
+        parts.append(f"href={item['href'][:80]}")
+    return f"{' '.join(parts)} -> {item.get('selector')}"
+
+
+def _section_lines(outline: Dict[str, Any], section: str) -> List[str]:
+    if section == "headings":
+        return [f"h{h['level']} {h['text']}" for h in outline.get("headings", [])]
+    if section == "forms":
+        lines = []
+        for form in outline.get("forms", []):
+            action = f" action={form['action']}" if form.get("action") else ""
+            lines.append(f"form{action} method={form.get('method')} -> {form.get('selector')}")
+            lines.extend(f"  {_describe(field)}" for field in form.get("fields", []) + form.get("buttons", []))
+        return lines
+    if section == "controls":
+        return [_describe(item) for item in outline.get("controls", [])]
+    if section == "products":
+        return [f'"{p["title"]}" {p.get("price") or ""} href={(p.get("href") or "")[:80]} -> {p.get("selector")}'
+                for p in outline.get("products", [])]
+    return []
+
+
+def condense(outline: Dict[str, Any], budget_tokens: int, focus: Optional[str] = None) -> str:
+    """
+    Format a page outline as compact text that fits in budget_tokens.
+
+    Every section first gets an equal share of the budget; whatever is left is then
+    filled with the remaining lines, most important section (per focus) first.
+
+    Args:
+        outline: Result of extract_page_outline
+        budget_tokens: Approximate token budget for the whole text
+        focus: "search", "products", "cart" or "checkout" to prioritize sections
+    """
+    order = FOCUS_ORDER.get(focus, SECTIONS)
+    header = f"Page: {outline.get('title', '')} ({outline.get('url', '')})"
+    budget_chars = max(budget_tokens * 4 - len(header) - 1, 0)
+
+    lines = {section: _section_lines(outline, section) for section in order}
+    taken = {section: 0 for section in order}
+    used = 0
+
+    # Pass 1: equal share per section
+    share = budget_chars // len(order)
+    for section in order:
+        section_used = len(section) + 4
+        for line in lines[section]:
+            if section_used + len(line) + 1 > share:
+                break
+            section_used += len(line) + 1
+            taken[section] += 1
+        used += section_used if taken[section] else 0
+
+    # Pass 2: spend the leftover in priority order
+    for section in order:
+        for line in lines[section][taken[section]:]:
+            cost = len(line) + 1 + (0 if taken[section] else len(section) + 4)
+            if used + cost > budget_chars:
+                break
+            used += cost
+            taken[section] += 1
+
+    output = [header]
+    for section in order:
+        if taken[section]:
+            output.append(f"## {section.title()}")
+            output.extend(lines[section][:taken[section]])
+    return "\n".join(output)
@@ -0,0 +1,148 @@
+"""
+CPU Executor - Runs CPU-bound work (HTML parsing, large JSON) off the asyncio event loop.
+"""
+from typing import Dict, Any, Optional, Callable
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from utils.logger import logger
+from config import Config
+import functools
+import asyncio
+import time
+import os
+
+class LoopStallMonitor:
+    """Measures how late the event loop wakes up from short sleeps."""
+
+    def __init__(self, interval: float = 0.1, warn_ms: Optional[float] = None):
+        self.interval = interval
+        self.warn_ms = warn_ms if warn_ms is not None else Config.LOOP_STALL_WARN_MS
+        self.logger = logger.bind(agent="LoopMonitor")
+        self.max_stall_ms = 0.0
+        self.total_stall_ms = 0.0
+        self.stalls = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start sampling on the running loop (no-op if already running)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (loop.time() - expected) * 1000)
+            self.max_stall_ms = max(self.max_stall_ms, lag_ms)
+            if lag_ms >= self.warn_ms:
+                self.stalls += 1
+                self.total_stall_ms += lag_ms
+                self.logger.warning(f"Event loop stalled for {lag_ms:.0f} ms")
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "stalls": self.stalls,
+            "max_stall_ms": round(self.max_stall_ms, 1),
+            "total_stall_ms": round(self.total_stall_ms, 1)
+        }
+
+
+class CPUExecutor:
+    """
+    Thread or process pool for CPU-bound work, with back-pressure.
+
+    At most `max_pending` jobs are queued or running at once; further callers wait
+    asynchronously instead of piling work onto the pool. Jobs smaller than
+    Config.CPU_OFFLOAD_MIN_BYTES run inline, where a pool round trip would cost more
+    than it saves.
+    """
+
+    def __init__(self, kind: Optional[str] = None, max_workers: Optional[int] = None,
+                 max_pending: Optional[int] = None):
+        """
+        Initialize the executor. The pool is created lazily on first use.
+
+        Args:
+            kind: "thread", "process" or "inline" (run on the loop, for debugging)
+            max_workers: Pool size
+            max_pending: Maximum jobs queued or running before callers wait
+        """
+        self.kind = kind or Config.CPU_EXECUTOR
+        self.max_workers = max_workers or Config.CPU_EXECUTOR_WORKERS or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending or Config.CPU_EXECUTOR_MAX_PENDING
+        self.monitor = LoopStallMonitor()
+        self._pool: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.submitted = 0
+        self.inline = 0
+        self.wait_ms = 0.0
+        self.run_ms = 0.0
+
+    def _get_pool(self) -> Optional[Executor]:
+        if self._pool is None and self.kind != "inline":
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="cpu")
+        return self._pool
+
+    async def run(self, fn: Callable, *args, size_hint: Optional[int] = None, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) off the event loop and return its result.
+
+        For the process pool fn and its arguments must be picklable (module-level functions).
+        size_hint is the input size in bytes; small inputs run inline.
+        """
+        if Config.LOOP_STALL_MONITOR:
+            self.monitor.start()
+
+        if self.kind == "inline" or (size_hint is not None and size_hint < Config.CPU_OFFLOAD_MIN_BYTES):
+            self.inline += 1
+            return fn(*args, **kwargs)
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+
+        queued_at = time.perf_counter()
+        async with self._semaphore:
+            started_at = time.perf_counter()
+            self.wait_ms += (started_at - queued_at) * 1000
+            self.submitted += 1
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._get_pool(), functools.partial(fn, *args, **kwargs))
+            finally:
+                self.run_ms += (time.perf_counter() - started_at) * 1000
+
+    def stats(self) -> Dict[str, Any]:
+        """Executor and event-loop stall statistics."""
+        return {
+            "kind": self.kind,
+            "submitted": self.submitted,
+            "inline": self.inline,
+            "queue_wait_ms": round(self.wait_ms, 1),
+            "run_ms": round(self.run_ms, 1),
+            **self.monitor.stats()
+        }
+
+    def shutdown(self):
+        """Stop the stall monitor and the worker pool."""
+        self.monitor.stop()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+_shared_executor: Optional[CPUExecutor] = None
+
+def get_executor() -> CPUExecutor:
+    """Return the process-wide CPU executor."""
+    global _shared_executor
+    if _shared_executor is None:
+        _shared_executor = CPUExecutor()
+    return _shared_executor
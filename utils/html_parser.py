@@ -0,0 +1,281 @@
+"""
+HTML Parser - Pluggable HTML parsing backends for the fallback extraction strategies.
+
+Backends, fastest first:
+    selectolax   - Lexbor C parser
+    lxml         - libxml2 C parser
+    html.parser  - BeautifulSoup over the pure-Python stdlib parser (always available)
+
+Every backend also supports a streaming mode that feeds the document in chunks to the
+stdlib tokenizer and stops as soon as enough candidates are found, which wins when the
+match sits near the top of a multi-megabyte page (e.g. a search box in the header).
+"""
+from typing import Dict, Any, Optional, List, Callable
+from html.parser import HTMLParser
+from config import Config
+
+SEARCH_KEYWORDS = ['search', 'q', 'query']
+PRODUCT_KEYWORDS = ['product', 'item', 'buy', 'shop', 'detail']
+BACKEND_PREFERENCE = ["selectolax", "lxml", "html.parser"]
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _backend_available(name: str) -> bool:
+    try:
+        if name == "selectolax":
+            import selectolax.lexbor  # noqa: F401
+        elif name == "lxml":
+            import lxml.html  # noqa: F401
+        elif name == "html.parser":
+            import bs4  # noqa: F401
+        else:
+            return False
+        return True
+    except ImportError:
+        return False
+
+
+def available_backends() -> List[str]:
+    """Installed backends in order of preference."""
+    return [name for name in BACKEND_PREFERENCE if _backend_available(name)]
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """Pick the requested backend, or the fastest installed one for "auto"."""
+    backend = backend or Config.HTML_PARSER_BACKEND
+    if backend == "auto":
+        installed = available_backends()
+        return installed[0] if installed else "stream"
+    if backend != "stream" and not _backend_available(backend):
+        raise ValueError(f"HTML parser backend not installed: {backend}")
+    return backend
+
+
+# --- Shared matching rules -------------------------------------------------------
+
+def _search_input_match(attrs: Dict[str, Optional[str]]) -> Optional[Dict[str, Any]]:
+    """Return a search-box candidate if an <input>'s attributes look like a search field."""
+    if (attrs.get('type') or '').lower() not in ('text', 'search'):
+        return None
+    fields = [(attrs.get(key) or '').lower() for key in ('name', 'id', 'placeholder', 'aria-label')]
+    if not any(keyword in text for keyword in SEARCH_KEYWORDS for text in fields):
+        return None
+    selector = "input"
+    if attrs.get('id'):
+        selector = f"#{attrs.get('id')}"
+    elif attrs.get('name'):
+        selector = f"input[name='{attrs.get('name')}']"
+    return {
+        "selector": selector,
+        "id": attrs.get('id'),
+        "name": attrs.get('name'),
+        "placeholder": attrs.get('placeholder'),
+        "aria_label": attrs.get('aria-label')
+    }
+
+
+def _product_link_match(href: str, text: str, current_url: str) -> Optional[Dict[str, Any]]:
+    """Return a product candidate if a link's text or href looks like a product page."""
+    text_lower = text.lower()
+    if not any(keyword in text_lower or keyword in href.lower() for keyword in PRODUCT_KEYWORDS):
+        return None
+    full_url = href if href.startswith('http') else f"{current_url.rstrip('/')}{href}"
+    return {
+        "title": text,
+        "link": full_url,
+        "selector": f"a[href='{href}']",
+        "matches_specs": True,
+        "price": None
+    }
+
+
+# --- Streaming (early-exit) backend ----------------------------------------------
+
+class _StopParsing(Exception):
+    pass
+
+
+class _StreamingExtractor(HTMLParser):
+    """Stdlib tokenizer that collects candidates and aborts once it has enough."""
+
+    def __init__(self, kind: str, limit: int, current_url: str = ""):
+        super().__init__(convert_charrefs=True)
+        self.kind = kind
+        self.limit = limit
+        self.current_url = current_url
+        self.results: List[Dict[str, Any]] = []
+        self._link_href: Optional[str] = None
+        self._link_text: List[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag in ('script', 'style'):
+            self._skip_depth += 1
+        elif self.kind == "search" and tag == "input":
+            self._add(_search_input_match(attrs))
+        elif self.kind == "product" and tag == "a" and attrs.get('href') is not None:
+            self._link_href = attrs.get('href') or ''
+            self._link_text = []
+
+    def handle_startendtag(self, tag, attrs):
+        if self.kind == "search" and tag == "input":
+            self._add(_search_input_match(dict(attrs)))
+
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style') and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag == "a" and self._link_href is not None:
+            text = "".join(self._link_text)
+            self._add(_product_link_match(self._link_href, text, self.current_url))
+            self._link_href = None
+
+    def handle_data(self, data):
+        if self._link_href is not None and not self._skip_depth:
+            self._link_text.append(data.strip())
+
+    def _add(self, match):
+        if match:
+            self.results.append(match)
+            if len(self.results) >= self.limit:
+                raise _StopParsing()
+
+
+def _stream(html: str, kind: str, limit: int, current_url: str = "") -> List[Dict[str, Any]]:
+    parser = _StreamingExtractor(kind, limit, current_url)
+    try:
+        for start in range(0, len(html), STREAM_CHUNK_SIZE):
+            parser.feed(html[start:start + STREAM_CHUNK_SIZE])
+        parser.close()
+    except _StopParsing:
+        pass
+    return parser.results
+
+
+# --- Tree backends ---------------------------------------------------------------
+
+def _search_inputs_selectolax(html: str, limit: int) -> List[Dict[str, Any]]:
+    from selectolax.lexbor import LexborHTMLParser
+    results = []
+    for node in LexborHTMLParser(html).css('input'):
+        match = _search_input_match(node.attributes)
+        if match:
+            results.append(match)
+            if len(results) >= limit:
+                break
+    return results
+
+
+def _product_links_selectolax(html: str, current_url: str, limit: int) -> List[Dict[str, Any]]:
+    from selectolax.lexbor import LexborHTMLParser
+    results = []
+    for node in LexborHTMLParser(html).css('a[href]'):
+        text = node.text(deep=True, separator='', strip=True)
+        match = _product_link_match(node.attributes.get('href') or '', text, current_url)
+        if match:
+            results.append(match)
+            if len(results) >= limit:
+                break
+    return results
+
+
+def _search_inputs_lxml(html: str, limit: int) -> List[Dict[str, Any]]:
+    import lxml.html
+    results = []
+    for element in lxml.html.fromstring(html).iter('input'):
+        match = _search_input_match(dict(element.attrib))
+        if match:
+            results.append(match)
+            if len(results) >= limit:
+                break
+    return results
+
+
+def _product_links_lxml(html: str, current_url: str, limit: int) -> List[Dict[str, Any]]:
+    import lxml.html
+    results = []
+    for element in lxml.html.fromstring(html).iter('a'):
+        href = element.get('href')
+        if href is None:
+            continue
+        text = "".join(t.strip() for t in element.itertext())
+        match = _product_link_match(href, text, current_url)
+        if match:
+            results.append(match)
+            if len(results) >= limit:
+                break
+    return results
+
+
+def _search_inputs_bs4(html: str, limit: int) -> List[Dict[str, Any]]:
+    from bs4 import BeautifulSoup
+    results = []
+    for inp in BeautifulSoup(html, 'html.parser').find_all('input'):
+        attrs = {key: (" ".join(value) if isinstance(value, list) else value) for key, value in inp.attrs.items()}
+        match = _search_input_match(attrs)
+        if match:
+            results.append(match)
+            if len(results) >= limit:
+                break
+    return results
+
+
+def _product_links_bs4(html: str, current_url: str, limit: int) -> List[Dict[str, Any]]:
+    from bs4 import BeautifulSoup
+    results = []
+    for link in BeautifulSoup(html, 'html.parser').find_all('a', href=True):
+        match = _product_link_match(link.get('href', ''), link.get_text(strip=True), current_url)
+        if match:
+            results.append(match)
+            if len(results) >= limit:
+                break
+    return results
+
+
+_SEARCH_INPUT_BACKENDS: Dict[str, Callable] = {
+    "selectolax": _search_inputs_selectolax,
+    "lxml": _search_inputs_lxml,
+    "html.parser": _search_inputs_bs4
+}
+
+_PRODUCT_LINK_BACKENDS: Dict[str, Callable] = {
+    "selectolax": _product_links_selectolax,
+    "lxml": _product_links_lxml,
+    "html.parser": _product_links_bs4
+}
+
+
+# --- Public API ------------------------------------------------------------------
+
+def find_search_inputs(html: str, limit: int = 1, backend: Optional[str] = None,
+                       stream: Optional[bool] = None) -> List[Dict[str, Any]]:
+    """
+    Find <input type="text|search"> elements that look like a site search box.
+
+    Returns:
+        Up to `limit` candidates in document order, each with a CSS "selector"
+    """
+    if not html:
+        return []
+    stream = Config.HTML_PARSER_STREAM if stream is None else stream
+    backend = resolve_backend(backend)
+    if stream or backend == "stream":
+        return _stream(html, "search", limit)
+    return _SEARCH_INPUT_BACKENDS[backend](html, limit)
+
+
+def find_product_links(html: str, current_url: str, limit: int = 5, backend: Optional[str] = None,
+                       stream: Optional[bool] = None) -> List[Dict[str, Any]]:
+    """
+    Find links whose text or href looks like a product page.
+
+    Returns:
+        Up to `limit` product dicts (title, link, selector, matches_specs, price)
+    """
+    if not html:
+        return []
+    stream = Config.HTML_PARSER_STREAM if stream is None else stream
+    backend = resolve_backend(backend)
+    if stream or backend == "stream":
+        return _stream(html, "product", limit, current_url)
+    return _PRODUCT_LINK_BACKENDS[backend](html, current_url, limit)
@@ -0,0 +1,228 @@
+"""
+Job Manager - Queues orchestration jobs for a long-running worker and tracks their state.
+
+Jobs run concurrently (up to max_concurrency) through one shared OrchestratorAgent, so
+the browser pool, LLM scheduler and caches stay warm between jobs. Each job records an
+event log (queued, running, per-stage timings, finished) that clients can poll or stream.
+
+Usage:
+    manager = JobManager(orchestrator, max_concurrency=4)
+    job = manager.submit({"query": "iPhone 15 Pro"})
+    async for event in manager.stream(job.id):
+        ...
+    await manager.drain(timeout=30)
+"""
+from typing import Dict, Any, Optional, List, AsyncIterator
+from collections import OrderedDict
+from config import Config
+from utils.logger import logger
+from utils.stage_timer import StageRecorder, record_stages
+from utils.deadline import parse_budget
+import asyncio
+import time
+import uuid
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class _JobStageRecorder(StageRecorder):
+    """Stage recorder that also appends every stage to its job's event log."""
+
+    def __init__(self, job: "Job"):
+        super().__init__()
+        self.job = job
+
+    def add(self, stage: str, duration_ms: float):
+        super().add(stage, duration_ms)
+        self.job.emit("stage", stage=stage, duration_ms=round(duration_ms, 1))
+
+
+class Job:
+    """One submitted task, its state and its event log."""
+
+    def __init__(self, task: Dict[str, Any]):
+        self.id = uuid.uuid4().hex[:12]
+        self.task = task
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.events: List[Dict[str, Any]] = []
+        self.stages = _JobStageRecorder(self)
+        self._changed = asyncio.Event()
+        self._runner: Optional[asyncio.Task] = None
+        self.emit(QUEUED)
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def emit(self, event: str, **data):
+        """Append an event and wake up streaming readers."""
+        self.events.append({"event": event, "job_id": self.id, "time": round(time.time(), 3), **data})
+        self._changed.set()
+
+    async def wait_changed(self):
+        await self._changed.wait()
+        self._changed.clear()
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        info = {
+            "id": self.id,
+            "status": self.status,
+            "query": self.task.get("query"),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queue_ms": round((self.started_at - self.created_at) * 1000, 1) if self.started_at else None,
+            "run_ms": round((self.finished_at - self.started_at) * 1000, 1) if self.finished_at and self.started_at else None,
+            "stages": self.stages.summary(),
+            "error": self.error
+        }
+        if include_result:
+            info["result"] = self.result
+        return info
+
+
+class JobManager:
+    """Runs jobs on a shared orchestrator with bounded concurrency and graceful drain."""
+
+    def __init__(self, orchestrator, max_concurrency: Optional[int] = None, history: Optional[int] = None):
+        """
+        Args:
+            orchestrator: OrchestratorAgent shared by every job
+            max_concurrency: Jobs running at once (one browser context each)
+            history: Finished jobs kept for status queries before the oldest are forgotten
+        """
+        self.orchestrator = orchestrator
+        self.max_concurrency = max_concurrency or Config.DAEMON_CONCURRENCY
+        self.history = history or Config.DAEMON_JOB_HISTORY
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.accepting = True
+        self.logger = logger.bind(agent="JobManager")
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def log(self, message: str, level: str = "info"):
+        log_func = getattr(self.logger, level.lower(), self.logger.info)
+        log_func(message)
+
+    def submit(self, task: Dict[str, Any]) -> Job:
+        """
+        Queue a task and start it as soon as a slot is free.
+
+        Raises:
+            RuntimeError: The manager is draining and no longer accepts jobs
+            ValueError: The task has no query or its "deadline_s" is not a number
+        """
+        if not self.accepting:
+            raise RuntimeError("Shutting down, not accepting new jobs")
+        query = task.get("query")
+        if not isinstance(query, str) or not query.strip():
+            raise ValueError("Task needs a non-empty string 'query'")
+        parse_budget(task.get("deadline_s"))
+        job = Job(task)
+        self.jobs[job.id] = job
+        job._runner = asyncio.create_task(self._run(job))
+        # A job cancelled before its task starts never enters _run
+        job._runner.add_done_callback(lambda _: self._finish(job, CANCELLED, "Cancelled"))
+        self._forget_old_jobs()
+        self.log(f"Job {job.id} queued: {task.get('query')}")
+        return job
+
+    async def _run(self, job: Job):
+        try:
+            async with self._semaphore:
+                job.status = RUNNING
+                job.started_at = time.time()
+                job.emit(RUNNING)
+                with record_stages(job.stages):
+                    result = await self.orchestrator.execute(job.task)
+            job.result = result
+            if result.get("status") == "success":
+                self._finish(job, SUCCEEDED)
+            else:
+                self._finish(job, FAILED, result.get("message"))
+        except asyncio.CancelledError:
+            self._finish(job, CANCELLED, "Cancelled")
+        except Exception as e:
+            self.log(f"Job {job.id} crashed: {e}", "error")
+            self._finish(job, FAILED, str(e))
+
+    def _finish(self, job: Job, status: str, error: Optional[str] = None):
+        if job.done:
+            return
+        job.status = status
+        job.error = error
+        job.finished_at = time.time()
+        job.emit("finished", status=status, result=job.result, error=error)
+        self.log(f"Job {job.id} {status} in {job.to_dict(False)['run_ms'] or 0} ms")
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            self.jobs.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; its browser context is released as it unwinds."""
+        job = self.jobs.get(job_id)
+        if job is None or job.done or job._runner is None:
+            return False
+        job._runner.cancel()
+        return True
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Job]:
+        """Wait until a job finishes (or the timeout passes) and return it."""
+        job = self.jobs.get(job_id)
+        if job is None or job._runner is None:
+            return job
+        # asyncio.wait neither raises for a cancelled job nor cancels it when the caller gives up
+        await asyncio.wait([job._runner], timeout=timeout)
+        return job
+
+    async def stream(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield a job's events from the beginning until it finishes."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        index = 0
+        while True:
+            while index < len(job.events):
+                yield job.events[index]
+                index += 1
+            if job.done:
+                return
+            await job.wait_changed()
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"accepting": self.accepting, "max_concurrency": self.max_concurrency, "jobs": counts}
+
+    async def drain(self, timeout: Optional[float] = None):
+        """
+        Stop accepting jobs and wait for the ones in flight.
+
+        Jobs still running after `timeout` seconds are cancelled.
+        """
+        self.accepting = False
+        pending = [job._runner for job in self.jobs.values() if job._runner and not job.done]
+        if not pending:
+            return
+        self.log(f"Draining {len(pending)} job(s)...")
+        _, still_running = await asyncio.wait(pending, timeout=timeout)
+        if still_running:
+            self.log(f"Cancelling {len(still_running)} job(s) after the drain timeout", "warning")
+            for runner in still_running:
+                runner.cancel()
+            await asyncio.gather(*still_running, return_exceptions=True)
@@ -0,0 +1,202 @@
+"""
+LLM Client - Shared wrapper around the AsyncOpenAI client with response caching and
+rate-limit-aware scheduling.
+"""
+from typing import Dict, Any, Optional, List
+from types import SimpleNamespace
+from config import Config
+from utils.response_cache import ResponseCache
+from utils.tracing import span
+from utils.metrics import LLM_REQUEST_SECONDS, LLM_TOKENS, LLM_CACHE
+from utils.llm_scheduler import LLMScheduler, get_llm_scheduler, estimate_request_tokens, DEFAULT_PRIORITY
+from utils.deadline import clamp_seconds, remaining
+from utils.logger import logger
+import hashlib
+import time
+import json
+import re
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def strip_code_fences(text: str) -> str:
+    """Remove a surrounding markdown code block from a model response."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("```")[1]
+        if text.startswith("json"):
+            text = text[4:]
+    return text.strip()
+
+
+def parse_llm_json(text: str) -> Any:
+    """Parse a model response as JSON, tolerating a markdown code block around it."""
+    return json.loads(strip_code_fences(text))
+
+
+def _is_json(text: str) -> bool:
+    """Whether a response parses as JSON once code fences are removed."""
+    try:
+        parse_llm_json(text)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+# Request arguments that don't change the answer
+_UNKEYED_ARGS = {"model", "messages", "timeout", "extra_headers", "user"}
+
+
+def cache_keys(model: str, messages: List[Dict[str, Any]], backend: str = "openai",
+               params: Optional[Dict[str, Any]] = None) -> tuple:
+    """
+    Build the exact and normalized cache keys for a chat request.
+
+    Both keys cover the sampling and output arguments (temperature, max_tokens,
+    response_format, ...) in `params`. The normalized key collapses whitespace only, so
+    prompts that differ in indentation of the embedded page preview share an entry while
+    case-sensitive selectors and ids still tell prompts apart. Keys are per backend, so
+    answers from the mock backend are never served to real runs.
+    """
+    params = {key: value for key, value in (params or {}).items() if key not in _UNKEYED_ARGS}
+    exact = json.dumps({"backend": backend, "model": model, "messages": messages, "params": params},
+                       sort_keys=True, default=str)
+    normalized = json.dumps({
+        "backend": backend,
+        "model": model,
+        "params": params,
+        "messages": [
+            {"role": m.get("role"), "content": _WHITESPACE.sub(" ", str(m.get("content", ""))).strip()}
+            for m in messages
+        ]
+    }, sort_keys=True, default=str)
+    return (
+        "exact:" + hashlib.sha256(exact.encode("utf-8")).hexdigest(),
+        "norm:" + hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    )
+
+
+def cached_response(content: str, model: str) -> SimpleNamespace:
+    """Build an object shaped like a chat completion from cached content."""
+    message = SimpleNamespace(role="assistant", content=content)
+    return SimpleNamespace(
+        model=model,
+        choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+        usage=None,
+        cached=True
+    )
+
+
+class LLMClient:
+    """
+    Drop-in replacement for the AsyncOpenAI client used by the agents.
+
+    Exposes the same ``chat.completions.create`` call, serving repeated prompts from a
+    shared ResponseCache and sending the rest through the shared LLMScheduler. Every
+    other attribute is forwarded to the wrapped client.
+    """
+
+    def __init__(self, client, cache: Optional[ResponseCache] = None, scheduler: Optional[LLMScheduler] = None):
+        # The scheduler owns retries; SDK-level retries would multiply them
+        if hasattr(client, "with_options"):
+            client = client.with_options(max_retries=0)
+        self.client = client
+        self.backend = getattr(client, "backend", "openai")
+        self.cache = cache or get_response_cache()
+        self.scheduler = scheduler or get_llm_scheduler()
+        self.logger = logger.bind(agent="LLMClient")
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    @classmethod
+    def wrap(cls, client) -> "LLMClient":
+        """Wrap a raw client, returning it unchanged if it is already wrapped."""
+        if client is None or isinstance(client, cls):
+            return client
+        return cls(client)
+
+    def __getattr__(self, name: str):
+        return getattr(self.client, name)
+
+    async def create(self, **kwargs) -> Any:
+        """
+        Create a chat completion, consulting the cache first.
+
+        Accepts every argument of ``chat.completions.create`` plus ``cache=False`` to
+        bypass the cache for a single call and ``priority`` ("planning", "detection" or
+        "background") to rank it in the scheduler queue.
+        
+        Raises:
+            CircuitOpenError: The API has been failing and the call was not attempted
+        """
+        use_cache = kwargs.pop("cache", True) and Config.LLM_CACHE_ENABLED
+        priority = kwargs.pop("priority", DEFAULT_PRIORITY)
+        model = kwargs.get("model", Config.OPENAI_MODEL)
+        messages = kwargs.get("messages", [])
+        estimated_tokens = estimate_request_tokens(messages, kwargs.get("max_tokens"))
+
+        with span("llm.chat", model=model, priority=priority, estimated_tokens=estimated_tokens) as current:
+            if use_cache:
+                exact_key, normalized_key = cache_keys(model, messages, self.backend, kwargs)
+                key, content = await self.cache.lookup_async(exact_key, normalized_key)
+                if content is not None:
+                    self.logger.debug(f"LLM cache hit ({key.split(':')[0]})")
+                    current.set_attributes(cache_hit=True, cache_key=key.split(':')[0])
+                    LLM_CACHE.inc(result="hit")
+                    return cached_response(content, model)
+                LLM_CACHE.inc(result="miss")
+            current.set_attribute("cache_hit", False)
+            if "timeout" in kwargs or remaining() is not None:
+                # Never wait on the API past the task's deadline
+                kwargs["timeout"] = clamp_seconds(kwargs.get("timeout"))
+
+            started = time.perf_counter()
+            status = "error"
+            try:
+                response = await self.scheduler.submit(
+                    lambda: self.client.chat.completions.create(**kwargs),
+                    priority=priority,
+                    estimated_tokens=estimated_tokens
+                )
+                status = "success"
+            finally:
+                LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, model=model, priority=priority, status=status)
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                prompt_tokens = getattr(usage, "prompt_tokens", None)
+                completion_tokens = getattr(usage, "completion_tokens", None)
+                current.set_attributes(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+                if isinstance(prompt_tokens, int):
+                    LLM_TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+                if isinstance(completion_tokens, int):
+                    LLM_TOKENS.inc(completion_tokens, model=model, kind="completion")
+
+            if use_cache:
+                content = response.choices[0].message.content
+                # Only cache answers the agents can actually use
+                if content and _is_json(content):
+                    self.cache.set_many({exact_key: content, normalized_key: content})
+            return response
+
+
+def create_llm_client(timeout: float = 60.0):
+    """
+    Create the raw chat client selected by Config.LLM_BACKEND.
+    
+    "openai" returns an AsyncOpenAI client, "mock" a MockLLMClient configured from
+    the MOCK_LLM_* settings. Agents wrap either one in LLMClient.
+    """
+    if Config.LLM_BACKEND == "mock":
+        from utils.mock_llm import MockLLMClient
+        return MockLLMClient()
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=Config.OPENAI_API_KEY, timeout=timeout)
+
+
+_shared_cache: Optional[ResponseCache] = None
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide LLM response cache."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = ResponseCache()
+    return _shared_cache
@@ -0,0 +1,306 @@
+"""
+LLM Scheduler - Rate-limit-aware admission, retry and circuit breaking for LLM calls.
+
+Every completion goes through one shared scheduler that:
+    - caps concurrent requests, admitting waiters by priority class
+    - spends from token buckets for requests/min and tokens/min before sending
+    - retries throttling, server and connection errors with jittered exponential backoff
+    - opens a circuit breaker after repeated failures so callers fall back immediately
+      instead of queueing behind a throttled API
+"""
+from typing import Dict, Any, Optional, Callable, Awaitable, List
+from utils.logger import logger
+from config import Config
+from utils.tracing import current_span
+from utils.deadline import DeadlineExceeded, remaining
+import itertools
+import asyncio
+import random
+import heapq
+import time
+
+# Lower value = admitted first
+PRIORITIES = {
+    "planning": 0,    # Task planning and query understanding, on the critical path
+    "detection": 1,   # Element and product detection on a loaded page
+    "background": 2
+}
+DEFAULT_PRIORITY = "detection"
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+# A timeout with less than this left before the caller's deadline (seconds) was caused by
+# the deadline clamping the request timeout, not by a slow API
+DEADLINE_TIMEOUT_MARGIN = 0.5
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the API while the circuit breaker is open."""
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_quota_error(error: Exception) -> bool:
+    """Whether the account is out of quota (retrying will not help)."""
+    code = getattr(error, "code", None)
+    return code == "insufficient_quota" or "insufficient_quota" in str(error) or "quota" in str(error).lower()
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Whether an error means the API is throttling us, out of quota, or circuit-broken."""
+    if isinstance(error, CircuitOpenError):
+        return True
+    if _status_code(error) == 429 or type(error).__name__ == "RateLimitError":
+        return True
+    message = str(error).lower()
+    return "429" in message or "rate limit" in message or is_quota_error(error)
+
+
+def is_timeout_error(error: Exception) -> bool:
+    return isinstance(error, asyncio.TimeoutError) or type(error).__name__ == "APITimeoutError"
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Whether a failed call is worth retrying after a backoff."""
+    if isinstance(error, (CircuitOpenError, DeadlineExceeded)) or is_quota_error(error):
+        return False
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    if type(error).__name__ in ("APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError"):
+        return True
+    return _status_code(error) in RETRYABLE_STATUS
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait, if it sent a Retry-After header."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    try:
+        value = headers.get("retry-after") if headers else None
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_request_tokens(messages: List[Dict[str, Any]], max_tokens: Optional[int] = None) -> int:
+    """Rough prompt + completion token count for a chat request (about 4 characters per token)."""
+    prompt = sum(len(str(m.get("content", ""))) for m in messages) // 4
+    return prompt + (max_tokens or 500)
+
+
+class TokenBucket:
+    """Continuously refilled bucket; acquire() waits until enough tokens are available."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1):
+        """Take amount tokens, waiting for the refill if needed (FIFO among waiters)."""
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+    def charge(self, amount: float):
+        """Take tokens without waiting (may go negative), e.g. to correct an estimate."""
+        self._refill()
+        self.tokens -= amount
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; lets one trial call through after `reset_after` seconds."""
+
+    def __init__(self, threshold: Optional[int] = None, reset_after: Optional[float] = None):
+        self.threshold = threshold or Config.LLM_BREAKER_THRESHOLD
+        self.reset_after = reset_after or Config.LLM_BREAKER_RESET
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may proceed now."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial_in_flight or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    def abandon_trial(self):
+        """The trial call was cancelled before it had an outcome; let the next call try instead."""
+        self._trial_in_flight = False
+
+
+class LLMScheduler:
+    """
+    Shared admission queue for LLM calls.
+
+    Usage:
+        response = await scheduler.submit(lambda: client.chat.completions.create(**kwargs),
+                                          priority="planning", estimated_tokens=1200)
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, requests_per_minute: Optional[int] = None,
+                 tokens_per_minute: Optional[int] = None, max_retries: Optional[int] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.max_concurrency = max_concurrency or Config.LLM_MAX_CONCURRENCY
+        self.max_retries = Config.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.request_bucket = TokenBucket(requests_per_minute or Config.LLM_REQUESTS_PER_MINUTE)
+        self.token_bucket = TokenBucket(tokens_per_minute or Config.LLM_TOKENS_PER_MINUTE)
+        self.breaker = breaker or CircuitBreaker()
+        self.logger = logger.bind(agent="LLMScheduler")
+        self._active = 0
+        self._waiters: list = []  # heap of (priority, sequence, future)
+        self._sequence = itertools.count()
+        self.completed = 0
+        self.retries = 0
+        self.rejected = 0
+
+    async def _acquire_slot(self, priority: int):
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The slot may have been handed over just as we were cancelled
+            if future.done() and not future.cancelled():
+                self._release_slot()
+            raise
+
+    def _release_slot(self):
+        # Hand the slot straight to the most urgent live waiter
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    async def submit(self, call: Callable[[], Awaitable[Any]], priority: str = DEFAULT_PRIORITY,
+                     estimated_tokens: int = 0) -> Any:
+        """
+        Run call() under the concurrency cap and rate limits, retrying transient failures.
+
+        Raises:
+            CircuitOpenError: The breaker is open; the caller should use its fallback
+            Exception: The last error from call() once retries are exhausted (or would
+                outlast the current deadline)
+        """
+        rank = PRIORITIES.get(priority, PRIORITIES[DEFAULT_PRIORITY])
+        attempt = 0
+        while True:
+            trial = self.breaker.state == "half_open"
+            if not self.breaker.allow():
+                self.rejected += 1
+                raise CircuitOpenError("LLM circuit breaker is open after repeated failures")
+
+            try:
+                await self._acquire_slot(rank)
+            except asyncio.CancelledError:
+                if trial:
+                    self.breaker.abandon_trial()
+                raise
+            try:
+                await self.request_bucket.acquire(1)
+                if estimated_tokens:
+                    await self.token_bucket.acquire(estimated_tokens)
+                response = await call()
+            except asyncio.CancelledError:
+                # Neither a success nor a failure; don't leave the breaker waiting on it
+                if trial:
+                    self.breaker.abandon_trial()
+                raise
+            except Exception as e:
+                left = remaining()
+                if is_timeout_error(e) and left is not None and left < DEADLINE_TIMEOUT_MARGIN:
+                    # Our own deadline cut the request short; that says nothing about API health
+                    if trial:
+                        self.breaker.abandon_trial()
+                    raise DeadlineExceeded("LLM call ran out of the task's time budget") from e
+                retryable = is_retryable_error(e)
+                if retryable or is_rate_limit_error(e):
+                    self.breaker.record_failure()
+                else:
+                    # A client error says nothing about API health
+                    self.breaker.record_success()
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                delay = _retry_after(e) or min(Config.LLM_RETRY_MAX_DELAY, Config.LLM_RETRY_BASE_DELAY * 2 ** attempt)
+                delay *= random.uniform(0.5, 1.5)
+                left = remaining()
+                if left is not None and delay >= left:
+                    # The retry could not finish before the task's deadline
+                    raise
+                attempt += 1
+                self.retries += 1
+                current_span().set_attribute("retries", attempt)
+                self.logger.warning(f"LLM call failed ({type(e).__name__}), retry {attempt}/{self.max_retries} in {delay:.1f}s")
+            else:
+                self.breaker.record_success()
+                self.completed += 1
+                usage = getattr(response, "usage", None)
+                actual = getattr(usage, "total_tokens", None)
+                if isinstance(actual, int) and actual > estimated_tokens:
+                    self.token_bucket.charge(actual - estimated_tokens)
+                return response
+            finally:
+                self._release_slot()
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self._active,
+            "waiting": sum(1 for _, _, future in self._waiters if not future.done()),
+            "completed": self.completed,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "breaker": self.breaker.state
+        }
+
+
+_shared_scheduler: Optional[LLMScheduler] = None
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Return the process-wide LLM scheduler."""
+    global _shared_scheduler
+    if _shared_scheduler is None:
+        _shared_scheduler = LLMScheduler()
+    return _shared_scheduler
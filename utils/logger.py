@@ -1,14 +1,26 @@
 """
 Logging utility for the application.
+
+loguru is imported on first use, so modules can hold a ``logger`` at import time
+without paying for it in short-lived commands that never log.
 """
-from loguru import logger
 import sys
 
-def setup_logger():
-    """Configure and setup the logger."""
+class _LazyLogger:
+    """Stand-in for loguru's logger that imports loguru on first attribute access."""
+
+    def __getattr__(self, name: str):
+        from loguru import logger as loguru_logger
+        return getattr(loguru_logger, name)
+
+logger = _LazyLogger()
+
+def setup_logger(stream=None):
+    """Configure and setup the logger (console output goes to stdout unless another stream is given)."""
+    from loguru import logger
     logger.remove()  # Remove default handler
     logger.add(
-        sys.stdout,
+        stream or sys.stdout,
         format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
         level="INFO"
     )
@@ -17,7 +29,7 @@ def setup_logger():
         rotation="10 MB",
         retention="7 days",
         format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-        level="DEBUG"
+        level="DEBUG",
+        delay=True  # Open the file on the first record, not at setup
     )
     return logger
-
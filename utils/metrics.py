@@ -0,0 +1,274 @@
+"""
+Metrics - Process-wide counters, gauges and histograms in the Prometheus text format.
+
+Recording is a dict update under a lock, with no I/O or formatting, so instrumentation
+stays on in hot paths. The samples are rendered only when scraped, either through
+render() or through the optional HTTP endpoint (Config.METRICS_PORT).
+
+Usage:
+    STEPS.inc(agent="ProductSearch", action="search", status="success")
+    with PAGE_LOAD_SECONDS.time(mode="fast"):
+        await page.goto(url)
+
+    start_metrics_server(9464)  # GET /metrics
+"""
+from typing import Dict, Any, Optional, Tuple, Iterable, List, TYPE_CHECKING
+from contextlib import contextmanager
+from config import Config
+import threading
+import bisect
+import time
+import math
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _format_labels(pairs: Iterable[Tuple[str, Any]]) -> str:
+    body = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return "{" + body + "}" if body else ""
+
+
+class _Metric:
+    """A named family of samples keyed by label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> List[Tuple[str, Tuple, float]]:
+        """(sample name, label pairs, value) for every series."""
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, tuple(zip(self.labelnames, key)), value) for key, value in items]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing total."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, e.g. contexts in use."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """Distribution of observations in fixed buckets (upper bounds in seconds by default)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), sum, count
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._values.get(self._key(labels))
+        return series[2] if series else 0
+
+    def samples(self) -> List[Tuple[str, Tuple, float]]:
+        with self._lock:
+            items = [(key, (list(series[0]), series[1], series[2])) for key, series in self._values.items()]
+        result = []
+        for key, (counts, total, count) in items:
+            labels = tuple(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                result.append((f"{self.name}_bucket", labels + (("le", _format_value(bound)),), cumulative))
+            result.append((f"{self.name}_sum", labels, total))
+            result.append((f"{self.name}_count", labels, count))
+        return result
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, documentation: str, labelnames: Tuple[str, ...], **kwargs) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(name)
+            if existing is not None:
+                if not isinstance(existing, cls) or existing.labelnames != tuple(labelnames):
+                    raise ValueError(f"Metric {name} is already registered with a different type or labels")
+                return existing
+            metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def reset(self):
+        """Drop every recorded sample, keeping the metric definitions."""
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        return "\n".join(metric.render() for metric in list(self._metrics.values())) + "\n"
+
+
+_registry = MetricsRegistry()
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Return the process-wide metrics registry."""
+    return _registry
+
+
+def render() -> str:
+    return _registry.render()
+
+
+# Metrics recorded by the agents
+QUERIES = _registry.counter("agent_queries_total", "Queries processed by the orchestrator", ("status",))
+STEPS = _registry.counter("agent_steps_total", "Agent execute() calls", ("agent", "action", "status"))
+STEP_SECONDS = _registry.histogram("agent_step_seconds", "Duration of agent execute() calls", ("agent", "action"))
+LLM_REQUEST_SECONDS = _registry.histogram("llm_request_seconds", "Latency of LLM calls sent to the API, including retries",
+                                          ("model", "priority", "status"))
+LLM_TOKENS = _registry.counter("llm_tokens_total", "Tokens reported by the LLM API", ("model", "kind"))
+LLM_CACHE = _registry.counter("llm_cache_requests_total", "LLM response cache lookups", ("result",))
+SNAPSHOT_CACHE = _registry.counter("page_snapshot_requests_total", "Page content and snapshot cache lookups", ("result",))
+PAGE_LOAD_SECONDS = _registry.histogram("page_load_seconds", "Time for navigate_to() to load and settle a page", ("mode",))
+SLEEP_SECONDS = _registry.counter("pacing_sleep_seconds_total", "Time spent in fixed demo-mode sleeps", ())
+POOL_CONTEXTS = _registry.gauge("browser_pool_contexts", "Browser contexts leased out / allowed", ("state",))
+POOL_WAIT_SECONDS = _registry.histogram("browser_pool_wait_seconds", "Time waiting to lease a browser context")
+
+
+_server: Optional["ThreadingHTTPServer"] = None
+
+def start_metrics_server(port: Optional[int] = None, host: Optional[str] = None) -> Optional["ThreadingHTTPServer"]:
+    """
+    Serve /metrics from a background thread (once per process).
+
+    Returns the server, or None when no port is configured (METRICS_PORT=0).
+    """
+    global _server
+    port = Config.METRICS_PORT if port is None else port
+    if _server is not None or not port:
+        return _server
+    # http.server is only needed once an endpoint is requested
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    _server = ThreadingHTTPServer((host or Config.METRICS_HOST, port), MetricsHandler)
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _server
+
+
+def stop_metrics_server():
+    global _server
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
@@ -0,0 +1,185 @@
+"""
+Mock LLM - Deterministic stand-in for the AsyncOpenAI client.
+
+Answers ``chat.completions.create`` locally so end-to-end runs, caching and rate-limit
+handling can be benchmarked offline and reproducibly. Responses are, in order of
+precedence:
+    1. scripted: a list consumed in order, or a {prompt substring: response} dict
+    2. rule-based: derived from the prompt the same way the agents' fallbacks work
+       (query parsing, heuristic planning, reading selectors off the page outline)
+
+Latency follows a configurable distribution and a fraction of calls can fail with a
+429 to exercise the scheduler's backoff and circuit breaker.
+"""
+from typing import Dict, Any, Optional, List, Union
+from types import SimpleNamespace
+from config import Config
+from utils.query_planner import parse_query, heuristic_plan
+import asyncio
+import random
+import json
+import re
+
+LATENCY_DISTRIBUTIONS = ["fixed", "uniform", "lognormal"]
+
+_SELECTOR_LINE = re.compile(r"^\s*(?P<desc>.*?) -> (?P<selector>.+)$")
+
+
+class MockRateLimitError(Exception):
+    """Injected throttling error, shaped like openai.RateLimitError (status_code 429)."""
+
+    status_code = 429
+
+    def __init__(self, message: str = "Error code: 429 - Rate limit reached (mock)"):
+        super().__init__(message)
+        self.response = SimpleNamespace(status_code=429, headers={})
+
+
+def _outline_lines(prompt: str) -> List[Dict[str, str]]:
+    """(description, selector) pairs from a page outline embedded in a prompt."""
+    lines = []
+    for line in prompt.splitlines():
+        match = _SELECTOR_LINE.match(line)
+        if match:
+            lines.append({"text": match.group("desc").strip(), "desc": match.group("desc").strip().lower(),
+                          "selector": match.group("selector").strip()})
+    return lines
+
+
+def _first_selector(lines: List[Dict[str, str]], *keywords: str, prefix: str = "") -> Optional[str]:
+    """Selector of the first outline line (optionally of one element kind) mentioning a keyword."""
+    for keyword in keywords:
+        for line in lines:
+            if line["desc"].startswith(prefix) and keyword in line["desc"]:
+                return line["selector"]
+    return None
+
+
+def _prompt_value(prompt: str, label: str) -> str:
+    match = re.search(rf"{re.escape(label)}:\s*(.+)", prompt)
+    return match.group(1).strip() if match else ""
+
+
+def rule_based_response(messages: List[Dict[str, Any]]) -> Any:
+    """Build the JSON answer an agent prompt expects, without a model."""
+    system = " ".join(str(m.get("content", "")) for m in messages if m.get("role") == "system").lower()
+    prompt = "\n".join(str(m.get("content", "")) for m in messages if m.get("role") != "system")
+    lowered = prompt.lower()
+    lines = _outline_lines(prompt)
+
+    if "extracts product information" in system:
+        return parse_query(_prompt_value(prompt, "User Query"))
+    if "task planning" in system:
+        plan, _ = heuristic_plan(_prompt_value(prompt, "User Query"))
+        return {"steps": plan["steps"]}
+    if "find the search input" in lowered:
+        selector = _first_selector(lines, "input[type=search]", "search", prefix="input")
+        button = _first_selector(lines, "search", "submit", prefix="button")
+        return {"input_selector": selector, "button_selector": button, "method": "ai_detected"}
+    if "find product elements" in lowered:
+        products = []
+        for line in lines:
+            match = re.match(r'^"(?P<title>[^"]+)"\s*(?P<price>\S*)\s*href=(?P<href>\S*)', line["text"])
+            if match:
+                products.append({"title": match.group("title"), "price": match.group("price") or None,
+                                 "link": match.group("href"), "selector": line["selector"], "matches_specs": True})
+        return products
+    if "add a product to cart" in lowered:
+        return {
+            "add_to_cart_selector": _first_selector(lines, "add to bag", "add to cart", prefix="button"),
+            "cart_button_selector": _first_selector(lines, "cart", prefix="a "),
+            "checkout_button_selector": _first_selector(lines, "checkout", "buy now", prefix="button")
+        }
+    if "checkout form fields" in lowered:
+        fields = {
+            "email": ("email",), "first_name": ("first name", "first_name"), "last_name": ("last name", "last_name"),
+            "address": ("address",), "city": ("city",), "zip": ("zip", "postal"), "phone": ("phone", "tel")
+        }
+        selectors = {field: _first_selector(lines, *keywords, prefix="input") for field, keywords in fields.items()}
+        selectors["continue_button"] = _first_selector(lines, "continue", "next", prefix="button")
+        return selectors
+    return {}
+
+
+class MockLLMClient:
+    """
+    Drop-in replacement for AsyncOpenAI exposing ``chat.completions.create``.
+
+    Usage:
+        client = MockLLMClient(latency_ms=300, distribution="lognormal", rate_limit_rate=0.05, seed=1)
+        orchestrator = OrchestratorAgent(client)
+    """
+
+    # Keeps canned answers out of the cache entries of real backends
+    backend = "mock"
+
+    def __init__(self, script: Optional[Union[List[Any], Dict[str, Any]]] = None,
+                 latency_ms: Optional[float] = None, distribution: Optional[str] = None,
+                 rate_limit_rate: Optional[float] = None, seed: Optional[int] = None):
+        """
+        Args:
+            script: Responses served in order (list) or by prompt substring (dict);
+                    values may be strings or JSON-serializable objects
+            latency_ms: Median latency per call
+            distribution: "fixed", "uniform" (0.5x-1.5x) or "lognormal" (long tail)
+            rate_limit_rate: Fraction of calls that fail with MockRateLimitError
+            seed: Seed for latency and error injection
+        """
+        self.script = script
+        self.latency_ms = Config.MOCK_LLM_LATENCY_MS if latency_ms is None else latency_ms
+        self.distribution = distribution or Config.MOCK_LLM_LATENCY_DISTRIBUTION
+        if self.distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {self.distribution}")
+        self.rate_limit_rate = Config.MOCK_LLM_RATE_LIMIT_RATE if rate_limit_rate is None else rate_limit_rate
+        self.random = random.Random(Config.MOCK_LLM_SEED if seed is None else seed)
+        self.calls = 0
+        self.rate_limited = 0
+        self._script_index = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _latency(self) -> float:
+        if self.distribution == "uniform":
+            return self.latency_ms * self.random.uniform(0.5, 1.5)
+        if self.distribution == "lognormal":
+            return self.latency_ms * self.random.lognormvariate(0, 0.5)
+        return self.latency_ms
+
+    def _scripted(self, messages: List[Dict[str, Any]]) -> Any:
+        if isinstance(self.script, list) and self._script_index < len(self.script):
+            self._script_index += 1
+            return self.script[self._script_index - 1]
+        if isinstance(self.script, dict):
+            prompt = "\n".join(str(m.get("content", "")) for m in messages)
+            for needle, response in self.script.items():
+                if needle in prompt:
+                    return response
+        return None
+
+    async def create(self, model: Optional[str] = None, messages: Optional[List[Dict[str, Any]]] = None,
+                     **kwargs) -> SimpleNamespace:
+        """Answer a chat completion request (extra OpenAI arguments are accepted and ignored)."""
+        messages = messages or []
+        self.calls += 1
+        await asyncio.sleep(self._latency() / 1000)
+
+        if self.rate_limit_rate and self.random.random() < self.rate_limit_rate:
+            self.rate_limited += 1
+            raise MockRateLimitError()
+
+        answer = self._scripted(messages)
+        if answer is None:
+            answer = rule_based_response(messages)
+        content = answer if isinstance(answer, str) else json.dumps(answer)
+
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+        completion_tokens = len(content) // 4
+        return SimpleNamespace(
+            model=model or Config.OPENAI_MODEL,
+            choices=[SimpleNamespace(index=0, message=SimpleNamespace(role="assistant", content=content),
+                                     finish_reason="stop")],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                  total_tokens=prompt_tokens + completion_tokens)
+        )
+
+    async def close(self):
+        pass
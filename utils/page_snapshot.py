@@ -0,0 +1,95 @@
+"""
+Page Snapshot - In-page scripts backing WebNavigatorAgent's snapshot cache.
+"""
+
+# Installed on every document of a context. Bumps window.__wsaDomVersion whenever the DOM
+# changes in a way that shows up in page.content() or in what is visible. class and style
+# are watched because menus, search overlays and lazy panels are usually revealed by
+# toggling them. Other attributes (most data-* and aria-* state) are ignored.
+DOM_VERSION_INIT_JS = """
+(() => {
+    window.__wsaDomVersion = 0;
+    const bump = () => { window.__wsaDomVersion++; };
+    const observe = () => new MutationObserver(bump).observe(document, {
+        subtree: true,
+        childList: true,
+        characterData: true,
+        attributes: true,
+        attributeFilter: ['href', 'src', 'value', 'disabled', 'hidden', 'id', 'name', 'type',
+                          'placeholder', 'aria-label', 'aria-hidden', 'data-wsa-target',
+                          'class', 'style', 'open']
+    });
+    try { observe(); } catch (e) { document.addEventListener('DOMContentLoaded', observe); }
+})();
+"""
+
+DOM_VERSION_JS = "() => (typeof window.__wsaDomVersion === 'number' ? window.__wsaDomVersion : null)"
+
+# Shared in-page helpers, spliced into the top of snapshot functions: visibility check and
+# the shortest selector that uniquely identifies an element (id, test id, name, aria-label,
+# placeholder, href, then an nth-of-type path).
+ELEMENT_HELPERS_JS = """
+    const isVisible = (el) => {
+        const rect = el.getBoundingClientRect();
+        if (rect.width === 0 || rect.height === 0) return false;
+        const style = window.getComputedStyle(el);
+        return style.visibility !== 'hidden' && style.display !== 'none';
+    };
+    const cssEscape = (value) => (window.CSS && CSS.escape) ? CSS.escape(value) : value.replace(/[^a-zA-Z0-9_-]/g, '\\\\$&');
+    const stableSelector = (el) => {
+        const tag = el.tagName.toLowerCase();
+        if (el.id && document.querySelectorAll('#' + cssEscape(el.id)).length === 1) return '#' + cssEscape(el.id);
+        for (const attr of ['data-testid', 'name', 'aria-label', 'placeholder']) {
+            const value = el.getAttribute(attr);
+            if (value) {
+                const selector = `${tag}[${attr}="${value.replace(/"/g, '\\\\"')}"]`;
+                try { if (document.querySelectorAll(selector).length === 1) return selector; } catch (e) {}
+            }
+        }
+        if (tag === 'a' && el.getAttribute('href')) {
+            const selector = `a[href="${el.getAttribute('href').replace(/"/g, '\\\\"')}"]`;
+            try { if (document.querySelectorAll(selector).length === 1) return selector; } catch (e) {}
+        }
+        const path = [];
+        for (let node = el; node && node.nodeType === 1 && node !== document.body; node = node.parentElement) {
+            if (node.id && node !== el) { path.unshift('#' + cssEscape(node.id)); break; }
+            let index = 1;
+            for (let sib = node.previousElementSibling; sib; sib = sib.previousElementSibling) {
+                if (sib.tagName === node.tagName) index++;
+            }
+            path.unshift(`${node.tagName.toLowerCase()}:nth-of-type(${index})`);
+        }
+        return path.join(' > ');
+    };
+"""
+
+# Lightweight alternative to page.content(): visible text plus interactive elements with
+# a stable selector each, typically a few KB instead of several MB.
+LIGHT_SNAPSHOT_JS = """
+({maxText, maxElements}) => {
+""" + ELEMENT_HELPERS_JS + """
+    const interactive = [];
+    const query = 'a[href], button, input, select, textarea, [role="button"], [role="link"], [role="searchbox"]';
+    for (const el of document.querySelectorAll(query)) {
+        if (interactive.length >= maxElements) break;
+        if (el.type === 'hidden' || !isVisible(el)) continue;
+        interactive.push({
+            tag: el.tagName.toLowerCase(),
+            type: el.type || null,
+            name: el.getAttribute('name'),
+            id: el.id || null,
+            text: (el.innerText || el.value || '').trim().slice(0, 80),
+            placeholder: el.getAttribute('placeholder'),
+            aria_label: el.getAttribute('aria-label'),
+            href: el.getAttribute('href'),
+            selector: stableSelector(el)
+        });
+    }
+    return {
+        url: location.href,
+        title: document.title,
+        text: (document.body ? document.body.innerText : '').slice(0, maxText),
+        interactive
+    };
+}
+"""
@@ -0,0 +1,247 @@
+"""
+Plan Graph - Runs a task plan as a dependency graph instead of a fixed sequence.
+
+Each step may list the steps it needs in "depends_on" (step numbers). A step without
+the key implicitly depends on the step before it, and ``"depends_on": []`` marks a step
+that can start right away. Steps whose dependencies have all succeeded run concurrently
+(up to max_parallel). A failed step is retried up to its "retries" count, and the steps
+that depend on it are skipped while the independent branches carry on, so the result
+always reports what did get done.
+
+Implicit edges keep the old sequential rule: only a failure among the first
+CRITICAL_STEPS steps stops the chain, a later failed step lets the next one run anyway.
+Plain sequential plans therefore run the same steps as before; what changes is the
+retries and the per-step results.
+
+Under a deadline (utils.deadline) each step's budget is its share of the time left,
+split over the longest chain of steps still ahead of it.
+
+Usage:
+    graph = PlanGraph(plan["steps"], retries=lambda step: 1)
+    await graph.run(run_step, max_parallel=3)   # run_step(node) -> result dict
+    graph.results()   # one entry per step, in step order, with status and attempts
+    graph.status()    # "success", "partial" or "error"
+"""
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Union
+from config import Config
+from utils.deadline import DeadlineExceeded, run_with_deadline, step_budget, clamp_seconds, check_deadline
+from utils.logger import logger
+import asyncio
+import time
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+# Steps numbered up to this stop the steps that implicitly follow them when they fail
+CRITICAL_STEPS = 2
+
+
+class PlanNode:
+    """One plan step, its dependencies and its outcome."""
+
+    def __init__(self, step: Dict[str, Any], depends_on: List[int], retries: int, implicit: bool = False):
+        self.step = step
+        self.id: int = step["step_number"]
+        self.depends_on = depends_on
+        # depends_on was not given: the step just follows the one before it
+        self.implicit = implicit
+        self.dependents: List[int] = []
+        self.retries = retries
+        # Steps on the longest chain from here to the end of the plan, this one included
+        self.height = 1
+        self.status = PENDING
+        self.attempts = 0
+        self.result: Optional[Dict[str, Any]] = None
+        self.duration_ms: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED, SKIPPED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "step": self.id,
+            "agent": self.step.get("agent", ""),
+            "action": self.step.get("action", ""),
+            "depends_on": self.depends_on,
+            "status": self.status,
+            "attempts": self.attempts,
+            "duration_ms": self.duration_ms,
+            "result": self.result
+        }
+
+
+def _step_numbers(value: Union[None, int, str, List[Any]]) -> List[int]:
+    if value is None:
+        return []
+    values = value if isinstance(value, (list, tuple)) else [value]
+    return [int(item) for item in values]
+
+
+class PlanGraph:
+    """Dependency graph of a plan's steps and the scheduler that runs it."""
+
+    def __init__(self, steps: List[Dict[str, Any]], retries: Union[int, Callable[[Dict[str, Any]], int]] = 0):
+        """
+        Args:
+            steps: Plan steps; "depends_on" and "retries" are optional per step
+            retries: Retries for steps that don't set "retries" (a count, or a function of the step)
+
+        Raises:
+            ValueError: Duplicate step numbers, an unknown dependency or a dependency cycle
+        """
+        self.nodes: Dict[int, PlanNode] = {}
+        self.logger = logger.bind(agent="PlanGraph")
+        previous: Optional[int] = None
+        for index, step in enumerate(steps):
+            step = dict(step)
+            step.setdefault("step_number", index + 1)
+            try:
+                step["step_number"] = int(step["step_number"])
+                depends_on = (_step_numbers(step["depends_on"]) if "depends_on" in step
+                              else [previous] if previous is not None else [])
+            except (TypeError, ValueError):
+                raise ValueError(f"Step {step.get('step_number')} has a non-numeric step number or dependency")
+            if step["step_number"] in self.nodes:
+                raise ValueError(f"Duplicate step number {step['step_number']}")
+            default_retries = retries(step) if callable(retries) else retries
+            node = PlanNode(step, depends_on, int(step.get("retries", default_retries)), "depends_on" not in step)
+            self.nodes[node.id] = node
+            previous = node.id
+
+        for node in self.nodes.values():
+            for dependency in node.depends_on:
+                if dependency not in self.nodes:
+                    raise ValueError(f"Step {node.id} depends on unknown step {dependency}")
+                self.nodes[dependency].dependents.append(node.id)
+        self.order = self._topological_order()
+        for node_id in reversed(self.order):
+            node = self.nodes[node_id]
+            node.height = 1 + max((self.nodes[child].height for child in node.dependents), default=0)
+
+    def log(self, message: str, level: str = "info"):
+        log_func = getattr(self.logger, level.lower(), self.logger.info)
+        log_func(message)
+
+    def _topological_order(self) -> List[int]:
+        waiting = {node_id: len(node.depends_on) for node_id, node in self.nodes.items()}
+        ready = sorted(node_id for node_id, count in waiting.items() if count == 0)
+        order = []
+        while ready:
+            node_id = ready.pop(0)
+            order.append(node_id)
+            for child in self.nodes[node_id].dependents:
+                waiting[child] -= 1
+                if waiting[child] == 0:
+                    ready.append(child)
+        if len(order) != len(self.nodes):
+            cycle = sorted(node_id for node_id in self.nodes if node_id not in order)
+            raise ValueError(f"Dependency cycle between steps {cycle}")
+        return order
+
+    @classmethod
+    def sequential(cls, steps: List[Dict[str, Any]], retries: Union[int, Callable[[Dict[str, Any]], int]] = 0) -> "PlanGraph":
+        """The plan as a plain chain, ignoring its (unusable) "depends_on" edges."""
+        chain = []
+        for index, step in enumerate(steps):
+            step = {key: value for key, value in step.items() if key != "depends_on"}
+            step["step_number"] = index + 1
+            chain.append(step)
+        return cls(chain, retries)
+
+    def _satisfied(self, node: PlanNode, dependency: int) -> bool:
+        status = self.nodes[dependency].status
+        if status == SUCCEEDED:
+            return True
+        # Sequential rule: a step that merely follows a failed non-critical step still runs
+        return status == FAILED and node.implicit and dependency > CRITICAL_STEPS
+
+    def _ready(self) -> List[PlanNode]:
+        return [self.nodes[node_id] for node_id in self.order
+                if self.nodes[node_id].status == PENDING
+                and all(self._satisfied(self.nodes[node_id], dependency) for dependency in self.nodes[node_id].depends_on)]
+
+    def _skip_blocked(self):
+        """Skip every pending step that waits on a step which failed or was skipped."""
+        for node_id in self.order:
+            node = self.nodes[node_id]
+            blocked = [dependency for dependency in node.depends_on
+                       if self.nodes[dependency].status in (FAILED, SKIPPED) and not self._satisfied(node, dependency)]
+            if node.status == PENDING and blocked:
+                node.status = SKIPPED
+                node.result = {"status": "skipped", "data": {},
+                               "message": f"Skipped: depends on step {blocked[0]}, which {self.nodes[blocked[0]].status}"}
+
+    async def _run_node(self, node: PlanNode, run_step: Callable[[PlanNode], Awaitable[Dict[str, Any]]]):
+        """Run one step with its retries; never raises except when cancelled."""
+        node.status = RUNNING
+        started = time.perf_counter()
+        while True:
+            node.attempts += 1
+            try:
+                check_deadline()
+                result = await run_with_deadline(run_step(node), step_budget(node.height), f"Step {node.id}")
+            except DeadlineExceeded as e:
+                result = {"status": "error", "data": {"timed_out": True}, "message": str(e)}
+            except Exception as e:
+                self.log(f"Step {node.id} raised: {str(e)}", "error")
+                result = {"status": "error", "data": {}, "message": str(e)}
+            node.result = result
+            if result.get("status") != "error" or node.attempts > node.retries:
+                break
+            self.log(f"Step {node.id} failed ({result.get('message')}), "
+                     f"retry {node.attempts}/{node.retries}", "warning")
+            try:
+                await asyncio.sleep(clamp_seconds(Config.RETRY_DELAY))
+            except DeadlineExceeded:
+                break
+        node.status = FAILED if result.get("status") == "error" else SUCCEEDED
+        node.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    async def run(self, run_step: Callable[[PlanNode], Awaitable[Dict[str, Any]]],
+                  max_parallel: Optional[int] = None):
+        """
+        Run every step whose dependencies succeed, independent steps concurrently.
+
+        Args:
+            run_step: Coroutine function running one node and returning its result dict
+                ("status" "error" counts as a failure)
+            max_parallel: Steps running at once (defaults to Config.PLAN_MAX_PARALLEL)
+        """
+        max_parallel = max(1, max_parallel or Config.PLAN_MAX_PARALLEL)
+        running: Dict[asyncio.Task, PlanNode] = {}
+        try:
+            while True:
+                self._skip_blocked()
+                for node in self._ready()[:max_parallel - len(running)]:
+                    running[asyncio.create_task(self._run_node(node, run_step))] = node
+                if not running:
+                    break
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    running.pop(task)
+        finally:
+            # Cancelled from outside: stop the steps still in flight
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+    def results(self) -> List[Dict[str, Any]]:
+        """Every step's outcome, in step order (steps never reached are "pending")."""
+        return [self.nodes[node_id].to_dict() for node_id in sorted(self.nodes)]
+
+    def summary(self) -> Dict[str, List[int]]:
+        summary: Dict[str, List[int]] = {SUCCEEDED: [], FAILED: [], SKIPPED: [], PENDING: []}
+        for node_id in sorted(self.nodes):
+            summary.setdefault(self.nodes[node_id].status, []).append(node_id)
+        return summary
+
+    def status(self) -> str:
+        """"success" when every step succeeded, "partial" when some did, otherwise "error"."""
+        succeeded = sum(1 for node in self.nodes.values() if node.status == SUCCEEDED)
+        if succeeded == len(self.nodes):
+            return "success"
+        return "partial" if succeeded else "error"
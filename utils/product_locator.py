@@ -0,0 +1,112 @@
+"""
+Product Locator - Finds clickable product images/links in a single page round trip.
+"""
+from typing import Dict, Any, List
+
+# Scores (text element, nearest image/link) pairs entirely inside the page. Each returned
+# target is tagged with a data-wsa-target attribute so Python can click it by selector.
+LOCATE_PRODUCTS_JS = """
+({phrase, keywords, limit, maxHops}) => {
+    const lower = (s) => (s || '').toLowerCase();
+    const isVisible = (el) => {
+        if (!el) return false;
+        const rect = el.getBoundingClientRect();
+        if (rect.width === 0 || rect.height === 0) return false;
+        const style = window.getComputedStyle(el);
+        return style.visibility !== 'hidden' && style.display !== 'none';
+    };
+    const coverage = (text) => keywords.filter(k => text.includes(k)).length / Math.max(keywords.length, 1);
+
+    document.querySelectorAll('[data-wsa-target]').forEach(el => el.removeAttribute('data-wsa-target'));
+
+    // 1. Smallest elements whose text contains every keyword
+    const textElements = new Set();
+    const walker = document.createTreeWalker(document.body || document.documentElement, NodeFilter.SHOW_TEXT);
+    const skip = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE']);
+    while (walker.nextNode()) {
+        const node = walker.currentNode;
+        const parent = node.parentElement;
+        if (!parent || skip.has(parent.tagName)) continue;
+        const text = lower(node.nodeValue);
+        if (!keywords.some(k => text.includes(k))) continue;
+        let el = parent;
+        for (let i = 0; el && i < 4; i++, el = el.parentElement) {
+            const full = lower(el.textContent);
+            if (full.length > 500) break;
+            if (coverage(full) === 1) { textElements.add(el); break; }
+        }
+    }
+
+    // 2. Pair each text element with its nearest image and link
+    const candidates = [];
+    const seen = new Set();
+    const addCandidate = (target, kind, textEl, distance, baseScore) => {
+        if (!target || seen.has(target) || !isVisible(target)) return;
+        seen.add(target);
+        const text = lower(textEl ? textEl.textContent : (target.alt || target.title || ''));
+        let score = baseScore + coverage(text) * 5 - distance * 1.5;
+        if (phrase && text.includes(phrase)) score += 5;
+        if (textEl && /^H[1-4]$/.test(textEl.tagName)) score += 2;
+        if (target.closest('a[href]')) score += 2;
+        if (kind === 'image') score += 3;
+        score -= Math.min(text.length, 500) / 250;
+        candidates.push({target, kind, distance, score,
+                         text: (textEl ? textEl.textContent : (target.alt || '')).trim().slice(0, 120),
+                         href: (target.closest('a[href]') || {}).href || null,
+                         alt: target.alt || null});
+    };
+
+    for (const el of textElements) {
+        if (el.tagName === 'IMG') { addCandidate(el, 'image', el, 0, 10); continue; }
+        let image = null;
+        let distance = 0;
+        for (let node = el; node && distance <= maxHops; node = node.parentElement, distance++) {
+            image = [...node.querySelectorAll('img')].find(isVisible) || null;
+            if (!image) {
+                for (const sib of [node.previousElementSibling, node.nextElementSibling]) {
+                    const img = sib && (sib.tagName === 'IMG' ? sib : sib.querySelector('img'));
+                    if (isVisible(img)) { image = img; break; }
+                }
+            }
+            if (image) break;
+        }
+        if (image) addCandidate(image, 'image', el, distance, 10);
+        else {
+            const link = el.closest('a[href]') || el.querySelector('a[href]');
+            if (link) addCandidate(link, 'link', el, 0, 6);
+        }
+    }
+
+    // 3. Images whose alt/title/src mention the product (weaker signal)
+    for (const img of document.images) {
+        if (seen.has(img)) continue;
+        const attrs = lower(img.alt) + ' ' + lower(img.title) + ' ' + lower(img.getAttribute('src'));
+        if (keywords.some(k => attrs.includes(k))) addCandidate(img, 'image', null, 0, 4);
+    }
+
+    candidates.sort((a, b) => b.score - a.score);
+    return candidates.slice(0, limit).map((c, i) => {
+        c.target.setAttribute('data-wsa-target', String(i));
+        return {selector: `[data-wsa-target="${i}"]`, kind: c.kind, score: Math.round(c.score * 100) / 100,
+                distance: c.distance, text: c.text, href: c.href, alt: c.alt};
+    });
+}
+"""
+
+
+async def locate_products(page, product_name: str, limit: int = 10, max_hops: int = 6) -> List[Dict[str, Any]]:
+    """
+    Rank clickable product targets for a product name in one page.evaluate call.
+
+    Returns:
+        Candidates (best first), each with a "selector" that clicks it, plus kind
+        ("image" or "link"), score, text, href and alt
+    """
+    phrase = product_name.lower().strip()
+    keywords = [word for word in phrase.split() if word]
+    return await page.evaluate(LOCATE_PRODUCTS_JS, {
+        "phrase": phrase,
+        "keywords": keywords,
+        "limit": limit,
+        "maxHops": max_hops
+    })
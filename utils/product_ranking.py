@@ -0,0 +1,105 @@
+"""
+Product Ranking - Scores product listings from different storefronts against the
+requested specs so results from several sites can be compared.
+
+Usage:
+    offers = [make_offer(product, "https://store.example", specs) for product in products]
+    ranked = rank_offers(offers)   # confident matches first, cheapest first among them
+"""
+from typing import Dict, Any, List, Optional
+from config import Config
+import re
+
+_CURRENCY = r"[$€£¥₹]|\b(?:USD|EUR|GBP|CAD|AUD|INR)\b"
+_PRICE = re.compile(
+    rf"(?P<before>{_CURRENCY})?\s?"
+    r"(?P<amount>\d{1,3}(?:[,.\s]\d{3})+(?:[.,]\d{1,2})?|\d+(?:[.,]\d{1,2})?)(?![\d%])"
+    rf"(?:\s?(?P<after>{_CURRENCY})(?!\s?\d))?"
+)
+# Amounts that are the old price or the discount, not what the item costs now
+_NOT_THE_PRICE = re.compile(r"(?:was|list|reg\.?|regular|msrp|orig\.?|original|save|you save)[:\s]*$", re.I)
+_OFF = re.compile(r"^\s*off\b", re.I)
+_TOKEN = re.compile(r"[a-z0-9]+")
+# Words that say nothing about which product it is
+_STOPWORDS = {"the", "a", "an", "and", "with", "for", "of", "in", "color", "colour", "storage", "buy", "new"}
+
+
+def _amount(text: str) -> float:
+    """Number from "1,299.00", "1.299,00" or "1 299": a final separator followed by one or
+    two digits is the decimal point, every other separator groups thousands."""
+    text = re.sub(r"\s", "", text)
+    decimal = re.search(r"[.,](\d{1,2})$", text)
+    whole = re.sub(r"[.,]", "", text[:decimal.start()] if decimal else text)
+    return float(f"{whole}.{decimal.group(1)}" if decimal else whole)
+
+
+def parse_price(text: Any) -> Optional[float]:
+    """
+    Current price in a price string ("$1,099.00" -> 1099.0), or None.
+
+    Amounts labelled as the old price or the saving ("Was $1,199", "Save $200", "$50 off")
+    are passed over. Of the rest an amount with a currency sign wins over a bare number,
+    and the last one wins ("$1,199 $999" -> 999.0). Comma decimals are understood
+    ("1.299,00 €" -> 1299.0).
+    """
+    if isinstance(text, (int, float)):
+        return float(text)
+    text = str(text or "")
+    candidates = []
+    for match in _PRICE.finditer(text):
+        if _NOT_THE_PRICE.search(text[:match.start()]) or _OFF.match(text[match.end():]):
+            continue
+        candidates.append((bool(match.group("before") or match.group("after")), match.group("amount")))
+    if not candidates:
+        return None
+    with_currency = [amount for marked, amount in candidates if marked]
+    return _amount((with_currency or [amount for _, amount in candidates])[-1])
+
+
+def spec_terms(product_specs: Dict[str, Any]) -> List[str]:
+    """Distinct lowercase tokens a matching listing should mention."""
+    parts = [product_specs.get("product_name") or "", product_specs.get("brand") or ""]
+    parts += [str(value) for value in (product_specs.get("specifications") or {}).values()]
+    parts += [str(product_specs.get(key) or "") for key in ("storage", "color", "model")]
+    terms = []
+    for token in _TOKEN.findall(" ".join(parts).lower()):
+        if token not in _STOPWORDS and token not in terms:
+            terms.append(token)
+    return terms
+
+
+def match_score(product: Dict[str, Any], product_specs: Dict[str, Any]) -> float:
+    """Fraction (0-1) of the spec terms found in a listing's title or link."""
+    terms = spec_terms(product_specs)
+    if not terms:
+        return 0.0
+    haystack = set(_TOKEN.findall(f"{product.get('title') or ''} {product.get('link') or ''}".lower()))
+    return round(sum(1 for term in terms if term in haystack) / len(terms), 3)
+
+
+def make_offer(product: Dict[str, Any], website: str, product_specs: Dict[str, Any]) -> Dict[str, Any]:
+    """A product listing tagged with its site, match score and numeric price."""
+    return {
+        **product,
+        "website": website,
+        "score": match_score(product, product_specs),
+        "price_value": parse_price(product.get("price"))
+    }
+
+
+def is_confident(offer: Optional[Dict[str, Any]], threshold: Optional[float] = None) -> bool:
+    threshold = Config.FANOUT_CONFIDENT_SCORE if threshold is None else threshold
+    return bool(offer) and offer.get("score", 0) >= threshold
+
+
+def rank_offers(offers: List[Dict[str, Any]], threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Order offers for the user: confident matches first, cheapest first among them
+    (unpriced last); the rest by match score.
+    """
+    def key(offer: Dict[str, Any]):
+        price = offer.get("price_value")
+        if is_confident(offer, threshold):
+            return (0, price is None, price or 0.0, -offer["score"])
+        return (1, -offer.get("score", 0), price is None, price or 0.0)
+    return sorted(offers, key=key)
@@ -0,0 +1,147 @@
+"""
+Query Planner - Local query parsing and rule-based task planning.
+
+Most queries name a product and imply the standard search -> add to cart -> checkout
+flow, so the plan can be built locally; the LLM planner is only needed when the
+intent is unclear.
+"""
+from typing import Dict, Any, List, Tuple
+import re
+
+DEFAULT_PLAN_STEPS = [
+    {"step_number": 1, "agent": "ProductSearch", "action": "search_product", "expected_result": "Find product"},
+    {"step_number": 2, "agent": "CartCheckout", "action": "add_to_cart", "expected_result": "Add product to cart"},
+    {"step_number": 3, "agent": "CartCheckout", "action": "full_checkout", "expected_result": "Complete checkout"}
+]
+
+PURCHASE_WORDS = ["buy", "purchase", "order", "checkout", "check out", "get me", "i want", "i need"]
+CART_ONLY_WORDS = ["add to cart", "add to bag", "put in cart", "put in my cart"]
+SEARCH_ONLY_WORDS = ["search for", "look for", "look up", "find", "show me", "price of", "how much"]
+# Requests the fixed flow cannot serve; these always go to the LLM planner
+UNSUPPORTED_WORDS = ["compare", "cheapest", "return", "refund", "cancel", "track", "review",
+                     "subscribe", "unsubscribe", "sell", "wishlist", "coupon"]
+
+
+def parse_query(query: str) -> Dict[str, Any]:
+    """
+    Extract product name, brand, specifications and a simplified search query from
+    a user query without an LLM.
+    """
+    specs = {}
+    if not query:
+        query = ""
+    query_lower = query.lower()
+
+    # Extract storage
+    storage_match = re.search(r'(\d+)\s*(gb|tb)', query_lower)
+    if storage_match:
+        specs["storage"] = storage_match.group(0).upper()
+
+    # Extract color
+    colors = ["white", "black", "blue", "red", "green", "yellow", "purple", "pink", "gray", "silver", "gold"]
+    for color in colors:
+        if color in query_lower:
+            specs["color"] = color
+            break
+
+    # Extract model numbers
+    model_match = re.search(r'(\d+)\s*(pro|max|plus|mini)', query_lower)
+    if model_match:
+        specs["model"] = model_match.group(0)
+
+    # Extract core product name (just the main product, not specs)
+    # For iPhone: "iPhone 15 Pro 256GB white" -> "iPhone 15"
+    # For Samsung: "Samsung Galaxy S24 Ultra" -> "Samsung Galaxy S24"
+    product_name = query
+
+    # For iPhone, extract just "iPhone" + number
+    if "iphone" in query_lower:
+        iphone_match = re.search(r'iphone\s+(\d+)', query_lower)
+        if iphone_match:
+            search_query = f"iPhone {iphone_match.group(1)}"
+            product_name = f"iPhone {iphone_match.group(1)} Pro"  # Keep Pro in product_name for matching
+        else:
+            search_query = "iPhone"
+    # For Samsung Galaxy
+    elif "galaxy" in query_lower or "samsung" in query_lower:
+        galaxy_match = re.search(r'(samsung\s+galaxy\s+s\d+)', query_lower)
+        if galaxy_match:
+            search_query = galaxy_match.group(1).title()
+            product_name = query  # Keep full name
+        else:
+            words = query.split()
+            search_query = " ".join(words[:3])
+    else:
+        # For other products, take first 2-3 words
+        words = query.split()
+        search_query = " ".join(words[:3]) if len(words) >= 3 else query
+
+    # Extract brand
+    brands = ["apple", "samsung", "google", "sony", "lg", "nike", "adidas"]
+    brand = None
+    for brand_name in brands:
+        if brand_name in query_lower:
+            brand = brand_name.capitalize()
+            break
+
+    return {
+        "product_name": product_name,
+        "brand": brand,
+        "specifications": specs,
+        "website": None,
+        "search_query": search_query  # Simplified name for search
+    }
+
+
+def _contains(text: str, phrases: List[str]) -> List[str]:
+    return [phrase for phrase in phrases if re.search(r"\b" + re.escape(phrase) + r"\b", text)]
+
+
+def heuristic_plan(query: str, product_specs: Dict[str, Any] = None) -> Tuple[Dict[str, Any], float]:
+    """
+    Build a task plan from intent keywords and the locally parsed product.
+
+    Returns:
+        (plan, confidence) where confidence is 0..1; the plan carries the signals
+        that produced it under "reasons"
+    """
+    product_specs = product_specs or parse_query(query)
+    query_lower = (query or "").lower()
+    reasons = []
+
+    unsupported = _contains(query_lower, UNSUPPORTED_WORDS)
+    cart_only = _contains(query_lower, CART_ONLY_WORDS)
+    purchase = _contains(query_lower, PURCHASE_WORDS)
+    search_only = _contains(query_lower, SEARCH_ONLY_WORDS)
+
+    if cart_only and not _contains(query_lower, ["checkout", "check out", "buy", "purchase", "order"]):
+        steps = DEFAULT_PLAN_STEPS[:2]
+        reasons.append(f"cart only: {cart_only[0]}")
+    elif search_only and not purchase:
+        steps = DEFAULT_PLAN_STEPS[:1]
+        reasons.append(f"search only: {search_only[0]}")
+    else:
+        steps = DEFAULT_PLAN_STEPS
+        reasons.append(f"purchase: {purchase[0]}" if purchase else "purchase (default)")
+
+    confidence = 0.0
+    if len((product_specs.get("search_query") or "").split()) >= 1:
+        confidence += 0.5
+        reasons.append("product identified")
+    if product_specs.get("brand"):
+        confidence += 0.2
+        reasons.append(f"brand: {product_specs['brand']}")
+    if product_specs.get("specifications"):
+        confidence += 0.1
+        reasons.append("specifications")
+    if purchase or cart_only or search_only:
+        confidence += 0.2
+    if unsupported:
+        confidence -= 0.5
+        reasons.append(f"unsupported intent: {unsupported[0]}")
+    if len(query_lower.split()) > 20 or " and " in query_lower:
+        confidence -= 0.2
+        reasons.append("long or multi-part query")
+
+    plan = {"steps": [dict(step) for step in steps], "reasons": reasons}
+    return plan, max(0.0, min(1.0, round(confidence, 2)))
@@ -0,0 +1,173 @@
+"""
+Request Filter - Blocks unneeded network requests for scraping runs.
+"""
+from typing import Dict, Any, Optional, Iterable
+from urllib.parse import urlparse
+from config import Config
+import ipaddress
+import base64
+
+# 1x1 transparent GIF served in place of blocked images. The <img> keeps its attributes
+# and, when the page sizes it (width/height attributes or CSS), its layout box; an
+# unsized image collapses to 1x1. Product images would then fail the locator's size and
+# visibility checks, so images from the page's own site and from
+# Config.REQUEST_ALLOW_IMAGE_DOMAINS (store image CDNs) are never stubbed.
+PLACEHOLDER_GIF = base64.b64decode("R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7")
+
+# Second-level labels under which country-code TLDs register names ("shop.co.uk"), so a
+# site is its last three labels there, not two
+_COUNTRY_SECOND_LEVELS = {"co", "com", "net", "org", "gov", "edu", "ac", "ne", "or", "go"}
+
+ANALYTICS_AND_AD_DOMAINS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googletagservices.com",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "adservice.google.com",
+    "connect.facebook.net",
+    "facebook.com/tr",
+    "bat.bing.com",
+    "analytics.tiktok.com",
+    "hotjar.com",
+    "segment.io",
+    "segment.com",
+    "optimizely.com",
+    "mixpanel.com",
+    "amplitude.com",
+    "fullstory.com",
+    "newrelic.com",
+    "nr-data.net",
+    "scorecardresearch.com",
+    "quantserve.com",
+    "criteo.com",
+    "criteo.net",
+    "taboola.com",
+    "outbrain.com",
+    "adnxs.com",
+    "demdex.net",
+    "omtrdc.net",
+    "everesttech.net",
+    "adsrvr.org",
+    "pinimg.com/ct"
+]
+
+PROFILES: Dict[str, Dict[str, Any]] = {
+    # Load everything, no interception
+    "off": {"resource_types": [], "domains": []},
+    # Only analytics and ad scripts/beacons
+    "no_tracking": {"resource_types": [], "domains": ANALYTICS_AND_AD_DOMAINS},
+    # Documents, scripts, stylesheets and XHR only - what the agents actually need
+    "essential": {"resource_types": ["image", "media", "font"], "domains": ANALYTICS_AND_AD_DOMAINS}
+}
+
+class RequestFilter:
+    """Route handler that aborts or stubs requests by resource type and domain."""
+
+    def __init__(self, profile: Optional[str] = None, block_resource_types: Optional[Iterable[str]] = None,
+                 block_domains: Optional[Iterable[str]] = None):
+        """
+        Initialize the filter.
+
+        Args:
+            profile: Preset name from PROFILES (defaults to Config.REQUEST_FILTER_PROFILE)
+            block_resource_types: Extra Playwright resource types to block
+            block_domains: Extra domain/path patterns to block (matched against host + path)
+        """
+        self.profile = profile or Config.REQUEST_FILTER_PROFILE
+        if self.profile not in PROFILES:
+            raise ValueError(f"Unknown request filter profile: {self.profile}")
+        preset = PROFILES[self.profile]
+        self.block_resource_types = set(preset["resource_types"]) | set(block_resource_types or Config.REQUEST_BLOCK_RESOURCE_TYPES)
+        self.block_domains = list(preset["domains"]) + list(block_domains or Config.REQUEST_BLOCK_DOMAINS)
+        self.allow_image_domains = list(Config.REQUEST_ALLOW_IMAGE_DOMAINS)
+        self.stats = {"allowed": 0, "aborted": 0, "stubbed": 0}
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any request would ever be blocked."""
+        return bool(self.block_resource_types or self.block_domains)
+
+    def _matches_domain(self, url: str) -> bool:
+        """
+        Whether url is covered by a block pattern: "host" or "host/path". The host matches
+        itself and its subdomains, the path matches itself and everything below it, so
+        "segment.com" does not catch "notsegment.com" nor "facebook.com/tr" "facebook.com/travel".
+        """
+        parsed = urlparse(url)
+        host = (parsed.hostname or "").lower()
+        path = parsed.path or "/"
+        for pattern in self.block_domains:
+            pattern_host, _, pattern_path = pattern.lower().partition("/")
+            if host != pattern_host and not host.endswith("." + pattern_host):
+                continue
+            prefix = "/" + pattern_path.rstrip("/")
+            if not pattern_path or path == prefix or path.startswith(prefix + "/"):
+                return True
+        return False
+
+    @staticmethod
+    def _site(host: str) -> str:
+        """
+        Registrable name of a host: "m.media-amazon.com" -> "media-amazon.com",
+        "images.shop.co.uk" -> "shop.co.uk". IP addresses are their own site.
+        """
+        try:
+            ipaddress.ip_address(host)
+            return host
+        except ValueError:
+            pass
+        labels = host.split(".")
+        if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in _COUNTRY_SECOND_LEVELS:
+            return ".".join(labels[-3:])
+        return ".".join(labels[-2:])
+
+    def _is_product_image(self, url: str, page_url: Optional[str]) -> bool:
+        """Whether an image may be a product image: served by the page's site or a known store CDN."""
+        host = (urlparse(url).hostname or "").lower()
+        page_host = (urlparse(page_url or "").hostname or "").lower()
+        if page_host and self._site(host) == self._site(page_host):
+            return True
+        return any(host == domain or host.endswith("." + domain) for domain in self.allow_image_domains)
+
+    def decide(self, url: str, resource_type: str, page_url: Optional[str] = None) -> str:
+        """Return "allow", "abort" or "stub" for a request made by a page at page_url."""
+        if url.startswith("data:"):
+            return "allow"
+        if self.block_domains and self._matches_domain(url):
+            return "abort"
+        if resource_type in self.block_resource_types:
+            if resource_type != "image":
+                return "abort"
+            # Third-party images are stubbed rather than aborted so sized ones keep their box
+            return "allow" if self._is_product_image(url, page_url) else "stub"
+        return "allow"
+
+    async def handle(self, route):
+        """Playwright route handler."""
+        request = route.request
+        try:
+            page_url = request.frame.url
+        except Exception:
+            # Service worker requests have no frame
+            page_url = None
+        decision = self.decide(request.url, request.resource_type, page_url)
+        try:
+            if decision == "abort":
+                self.stats["aborted"] += 1
+                await route.abort("blockedbyclient")
+            elif decision == "stub":
+                self.stats["stubbed"] += 1
+                await route.fulfill(status=200, content_type="image/gif", body=PLACEHOLDER_GIF)
+            else:
+                self.stats["allowed"] += 1
+                await route.continue_()
+        except Exception:
+            # The page may have navigated away or closed while the request was pending
+            pass
+
+    async def attach(self, context):
+        """Install the filter on a browser context (no-op when nothing is blocked)."""
+        if self.enabled:
+            await context.route("**/*", self.handle)
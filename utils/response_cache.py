@@ -0,0 +1,197 @@
+"""
+Response Cache - LRU/TTL cache for LLM responses with an optional SQLite backend.
+
+The in-memory LRU is read and written directly. The SQLite table is only touched from
+one dedicated worker thread, so an event loop never waits on disk: set() queues the
+write and returns, lookup_async() awaits the disk read, and old rows are pruned once
+every Config.LLM_CACHE_PRUNE_EVERY writes rather than on each one.
+
+Usage:
+    cache = ResponseCache()
+    key, value = await cache.lookup_async(exact_key, normalized_key)
+    cache.set_many({exact_key: content, normalized_key: content})
+"""
+from typing import Optional, Tuple, Dict, Iterable
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+import asyncio
+import sqlite3
+import time
+import os
+
+class ResponseCache:
+    """Two-level cache: bounded in-memory LRU in front of a persistent SQLite table."""
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None,
+                 path: Optional[str] = None, max_disk_entries: Optional[int] = None,
+                 prune_every: Optional[int] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum entries kept in memory (least recently used are dropped)
+            ttl_seconds: How long an entry stays valid
+            path: SQLite file for the on-disk backend; empty string disables it
+            max_disk_entries: Maximum entries kept on disk (oldest are dropped)
+            prune_every: Disk writes between two prunes of expired and surplus rows
+        """
+        self.max_entries = max_entries or Config.LLM_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds or Config.LLM_CACHE_TTL
+        self.path = Config.LLM_CACHE_PATH if path is None else path
+        self.max_disk_entries = max_disk_entries or Config.LLM_CACHE_MAX_DISK_ENTRIES
+        self.prune_every = prune_every or Config.LLM_CACHE_PRUNE_EVERY
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        # Every SQLite call runs on this one thread, in submission order
+        self._disk = ThreadPoolExecutor(max_workers=1, thread_name_prefix="response-cache")
+        self._writes_since_prune = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """Open the SQLite backend on first use (disk thread only)."""
+        if self._db is None and self.path:
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._db = sqlite3.connect(self.path)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses (created)")
+                self._db.commit()
+            except sqlite3.Error:
+                self.path = ""
+                self._db = None
+        return self._db
+
+    def _expired(self, created: float) -> bool:
+        return time.time() - created > self.ttl_seconds
+
+    def _remember(self, key: str, value: str, created: float):
+        """Insert into the in-memory LRU, evicting the least recently used entry."""
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _from_memory(self, key: str) -> Optional[str]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        value, created = entry
+        if self._expired(created):
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _read(self, keys: Iterable[str]) -> Tuple[Optional[str], Optional[str], Optional[float]]:
+        """First of keys found on disk and not expired: (key, value, created) (disk thread only)."""
+        db = self._connect()
+        if db is not None:
+            try:
+                for key in keys:
+                    row = db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+                    if row and not self._expired(row[1]):
+                        return key, row[0], row[1]
+            except sqlite3.Error:
+                pass
+        return None, None, None
+
+    def _write(self, entries: Dict[str, str], created: float):
+        """Store entries in one transaction, pruning every prune_every writes (disk thread only)."""
+        db = self._connect()
+        if db is None:
+            return
+        try:
+            db.executemany("INSERT OR REPLACE INTO responses (key, value, created) VALUES (?, ?, ?)",
+                           [(key, value, created) for key, value in entries.items()])
+            self._writes_since_prune += 1
+            if self._writes_since_prune >= self.prune_every:
+                self._writes_since_prune = 0
+                db.execute(
+                    "DELETE FROM responses WHERE created < ? OR key NOT IN "
+                    "(SELECT key FROM responses ORDER BY created DESC LIMIT ?)",
+                    (created - self.ttl_seconds, self.max_disk_entries)
+                )
+            db.commit()
+        except sqlite3.Error:
+            pass
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached value, or None if it is missing or expired (blocks on disk; see lookup_async)."""
+        value = self._from_memory(key)
+        if value is not None:
+            return value
+        _, value, created = self._disk.submit(self._read, [key]).result()
+        if value is not None:
+            self._remember(key, value, created)
+        return value
+
+    def lookup(self, *keys: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Try each key in turn for one request, counting a single hit or miss.
+
+        Returns:
+            (key that matched, value), or (None, None)
+        """
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                self.hits += 1
+                return key, value
+        self.misses += 1
+        return None, None
+
+    async def lookup_async(self, *keys: str) -> Tuple[Optional[str], Optional[str]]:
+        """lookup() for code on an event loop: memory first, then one disk read off the loop."""
+        for key in keys:
+            value = self._from_memory(key)
+            if value is not None:
+                self.hits += 1
+                return key, value
+        key, value, created = await asyncio.wrap_future(self._disk.submit(self._read, keys))
+        if value is None:
+            self.misses += 1
+            return None, None
+        self._remember(key, value, created)
+        self.hits += 1
+        return key, value
+
+    def set_many(self, entries: Dict[str, str]):
+        """Store values in memory now and on disk in the background."""
+        created = time.time()
+        for key, value in entries.items():
+            self._remember(key, value, created)
+        if self.path:
+            self._disk.submit(self._write, dict(entries), created)
+
+    def set(self, key: str, value: str):
+        """Store a value in memory now and on disk in the background."""
+        self.set_many({key: value})
+
+    def flush(self):
+        """Wait until every queued disk write has been made."""
+        self._disk.submit(lambda: None).result()
+
+    def clear(self):
+        """Drop every cached response."""
+        self._memory.clear()
+
+        def drop():
+            db = self._connect()
+            if db is not None:
+                db.execute("DELETE FROM responses")
+                db.commit()
+        self._disk.submit(drop).result()
+
+    def close(self):
+        """Finish queued writes and close the SQLite connection."""
+        def disconnect():
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+        self._disk.submit(disconnect).result()
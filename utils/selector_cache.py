@@ -0,0 +1,157 @@
+"""
+Selector Cache - Remembers which selectors worked per domain and page type.
+
+Updates are kept in memory and written to disk in batches: inside an event loop the
+file is rewritten (off the loop, in a worker thread) at most once per
+Config.SELECTOR_CACHE_FLUSH_DELAY seconds; flush() writes pending changes at once and
+runs at interpreter exit.
+"""
+from typing import Dict, Any, Optional, List
+from datetime import datetime
+from urllib.parse import urlparse
+from config import Config
+import threading
+import asyncio
+import atexit
+import json
+import os
+
+class SelectorCache:
+    """Persistent on-disk cache of learned selectors, keyed by domain and page type."""
+
+    def __init__(self, path: Optional[str] = None, max_failures: Optional[int] = None):
+        """
+        Initialize the cache. The file is loaded lazily on first access.
+
+        Args:
+            path: JSON file backing the cache
+            max_failures: Consecutive failed validations before a selector is evicted
+        """
+        self.path = path or Config.SELECTOR_CACHE_PATH
+        self.max_failures = max_failures or Config.SELECTOR_CACHE_MAX_FAILURES
+        self._data: Optional[Dict[str, Dict[str, Dict[str, Dict[str, Any]]]]] = None
+        self._dirty = False
+        self._flush_scheduled = False
+        self._write_lock = threading.Lock()
+
+    @staticmethod
+    def domain_for(url: str) -> str:
+        """Normalize a URL to the cache's domain key."""
+        netloc = urlparse(url or "").netloc.lower()
+        return netloc[4:] if netloc.startswith("www.") else netloc
+
+    def _load(self) -> Dict[str, Dict[str, Dict[str, Dict[str, Any]]]]:
+        """Load the cache file, starting empty if it is missing or corrupt."""
+        if self._data is None:
+            try:
+                with open(self.path, 'r') as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def save(self):
+        """Atomically write the cache to disk."""
+        self._dirty = False
+        self._write(json.dumps(self._load(), indent=2))
+
+    def _write(self, text: str):
+        with self._write_lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(text)
+            os.replace(tmp_path, self.path)
+
+    def get(self, url: str, page_type: str) -> List[str]:
+        """Return cached selectors for a page, best hit rate first."""
+        entries = self._load().get(self.domain_for(url), {}).get(page_type, {})
+        ranked = sorted(
+            entries.items(),
+            key=lambda item: (self.hit_rate(item[1]), item[1].get("last_validated") or ""),
+            reverse=True
+        )
+        return [selector for selector, _ in ranked]
+
+    @staticmethod
+    def hit_rate(entry: Dict[str, Any]) -> float:
+        """Fraction of validations in which the selector worked."""
+        total = entry.get("hits", 0) + entry.get("misses", 0)
+        return entry.get("hits", 0) / total if total else 0.0
+
+    def record_success(self, url: str, page_type: str, selector: str):
+        """Record that a selector worked on this domain and page type."""
+        domain = self.domain_for(url)
+        if not domain or not selector:
+            return
+        entries = self._load().setdefault(domain, {}).setdefault(page_type, {})
+        entry = entries.setdefault(selector, {"hits": 0, "misses": 0, "consecutive_failures": 0})
+        entry["hits"] += 1
+        entry["consecutive_failures"] = 0
+        entry["last_validated"] = datetime.now().isoformat()
+        self._mark_dirty()
+
+    def record_failure(self, url: str, page_type: str, selector: str):
+        """Record a failed validation, evicting the selector after repeated failures."""
+        domain = self.domain_for(url)
+        entries = self._load().get(domain, {}).get(page_type, {})
+        entry = entries.get(selector)
+        if entry is None:
+            return
+        entry["misses"] += 1
+        entry["consecutive_failures"] += 1
+        if entry["consecutive_failures"] >= self.max_failures:
+            del entries[selector]
+        self._mark_dirty()
+
+    def _mark_dirty(self):
+        """Schedule a batched write, or write now when no event loop is running."""
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._safe_save()
+            return
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_later(Config.SELECTOR_CACHE_FLUSH_DELAY, self._flush_in_background, loop)
+
+    def _flush_in_background(self, loop: asyncio.AbstractEventLoop):
+        self._flush_scheduled = False
+        if not self._dirty:
+            return
+        self._dirty = False
+        # Serialize on the loop (no concurrent mutation); only the file I/O leaves it
+        text = json.dumps(self._load(), indent=2)
+        future = loop.run_in_executor(None, self._write, text)
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())  # Disk errors never break a run
+
+    def flush(self):
+        """Write pending changes now."""
+        if self._dirty:
+            self._safe_save()
+
+    def _safe_save(self):
+        """Persist the cache, never letting a disk error break the agent run."""
+        try:
+            self.save()
+        except OSError:
+            pass
+
+    def clear(self):
+        """Remove every cached selector."""
+        self._data = {}
+        self._safe_save()
+
+
+_shared_cache: Optional[SelectorCache] = None
+
+def get_selector_cache() -> SelectorCache:
+    """Return the process-wide selector cache."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = SelectorCache()
+        atexit.register(_shared_cache.flush)
+    return _shared_cache
@@ -0,0 +1,132 @@
+"""
+Selector Probe - Evaluates many candidate selectors in a single page round trip.
+"""
+from typing import Dict, Any, Optional, List, Tuple
+from config import Config
+from utils.waits import wait_for_dom_settled
+from utils.deadline import clamp_ms
+import asyncio
+
+# For each group of selectors, return the first (highest priority) match together with
+# the element details callers used to fetch with separate element.evaluate calls.
+PROBE_SELECTOR_GROUPS_JS = """
+(groups) => {
+    const isVisible = (el) => {
+        const rect = el.getBoundingClientRect();
+        if (rect.width === 0 || rect.height === 0) return false;
+        const style = window.getComputedStyle(el);
+        return style.visibility !== 'hidden' && style.display !== 'none' && style.opacity !== '0';
+    };
+    return groups.map(([selectors, requireVisible]) => {
+        for (let i = 0; i < selectors.length; i++) {
+            let elements;
+            try {
+                elements = document.querySelectorAll(selectors[i]);
+            } catch (e) {
+                continue;  // Not a valid CSS selector (e.g. Playwright-only syntax)
+            }
+            for (const el of elements) {
+                if (requireVisible && (!isVisible(el) || el.disabled)) continue;
+                return {
+                    index: i,
+                    selector: selectors[i],
+                    tag: el.tagName,
+                    type: el.type || '',
+                    name: el.name || '',
+                    id: el.id || '',
+                    placeholder: el.getAttribute('placeholder') || '',
+                    matches: elements.length
+                };
+            }
+        }
+        return null;
+    });
+}
+"""
+
+DESCRIBE_ELEMENT_JS = """
+(el) => ({
+    tag: el.tagName,
+    type: el.type || '',
+    name: el.name || '',
+    id: el.id || '',
+    placeholder: el.getAttribute('placeholder') || ''
+})
+"""
+
+
+async def probe_selector_groups(page, groups: List[Tuple[List[str], bool]]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Find the best match for several selector lists in one page.evaluate call.
+
+    Args:
+        page: Playwright page
+        groups: (selectors, require_visible) pairs; selectors are in priority order
+
+    Returns:
+        One match dict (selector, index, tag, type, name, id, placeholder) or None per group
+    """
+    try:
+        return await page.evaluate(PROBE_SELECTOR_GROUPS_JS, [[list(sels), visible] for sels, visible in groups])
+    except Exception:
+        return [None] * len(groups)
+
+
+async def probe_selectors(page, selectors: List[str], require_visible: bool = True) -> Optional[Dict[str, Any]]:
+    """Return the highest-priority selector with a (visible) match, or None."""
+    return (await probe_selector_groups(page, [(selectors, require_visible)]))[0]
+
+
+async def race_selectors(page, selectors: List[str], timeout: Optional[int] = None,
+                         state: str = "visible") -> Optional[Dict[str, Any]]:
+    """
+    Wait for all selectors concurrently and return the first one that matches.
+
+    Returns:
+        Match dict with the same shape as probe_selectors plus the element handle, or None
+    """
+    timeout = clamp_ms(timeout or Config.SELECTOR_RACE_TIMEOUT)
+    tasks = {
+        asyncio.ensure_future(page.wait_for_selector(selector, timeout=timeout, state=state)): (index, selector)
+        for index, selector in enumerate(selectors)
+    }
+    pending = set(tasks.keys())
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.cancelled() or task.exception() is not None:
+                    continue
+                element = task.result()
+                if element:
+                    index, selector = tasks[task]
+                    try:
+                        details = await element.evaluate(DESCRIBE_ELEMENT_JS)
+                    except Exception:
+                        details = {}
+                    return {"index": index, "selector": selector, "element": element, **details}
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def find_first_selector(page, selectors: List[str], require_visible: bool = True,
+                              mode: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Locate the first matching selector using the configured strategy.
+
+    "probe" mode runs one in-page evaluation, and re-probes once after the DOM settles.
+    "race" mode waits on every selector concurrently and returns the first hit.
+    """
+    mode = mode or Config.SELECTOR_PROBE_MODE
+    if mode == "race":
+        return await race_selectors(page, selectors, state="visible" if require_visible else "attached")
+
+    match = await probe_selectors(page, selectors, require_visible)
+    if match is None:
+        await wait_for_dom_settled(page, timeout=Config.SELECTOR_RACE_TIMEOUT)
+        match = await probe_selectors(page, selectors, require_visible)
+    return match
@@ -0,0 +1,85 @@
+"""
+Stage Timer - Per-task latency breakdown by named stage.
+
+A StageRecorder is bound to the current task through a context variable, so timings
+from concurrent tasks never mix and tasks spawned with asyncio.create_task report into
+their parent's recorder. Code outside a recording pays one ContextVar lookup.
+
+Usage:
+    with record_stages() as stages:
+        await orchestrator.execute(task)
+    stages.summary()  # {"planning": {"count": 1, "total_ms": 3.1, "max_ms": 3.1}, ...}
+
+    @timed_stage("navigation")
+    async def navigate_to(self, url): ...
+"""
+from typing import Dict, Any, Optional, List, Tuple, Callable
+from contextlib import contextmanager
+from contextvars import ContextVar
+import functools
+import time
+
+_current_recorder: ContextVar[Optional["StageRecorder"]] = ContextVar("stage_recorder", default=None)
+
+
+class StageRecorder:
+    """Collects (stage, duration_ms) samples for one task."""
+
+    def __init__(self):
+        self.samples: List[Tuple[str, float]] = []
+
+    def add(self, stage: str, duration_ms: float):
+        self.samples.append((stage, duration_ms))
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Count, total and max duration per stage."""
+        result: Dict[str, Dict[str, Any]] = {}
+        for stage, duration_ms in self.samples:
+            entry = result.setdefault(stage, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+        for entry in result.values():
+            entry["total_ms"] = round(entry["total_ms"], 1)
+            entry["max_ms"] = round(entry["max_ms"], 1)
+        return result
+
+
+@contextmanager
+def record_stages(recorder: Optional[StageRecorder] = None):
+    """Record stages timed inside this block (and tasks it spawns) into `recorder` or a fresh one."""
+    recorder = recorder or StageRecorder()
+    token = _current_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current_recorder.reset(token)
+
+
+def current_recorder() -> Optional[StageRecorder]:
+    return _current_recorder.get()
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as stage `name` in the current recorder, if any."""
+    recorder = _current_recorder.get()
+    if recorder is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add(name, (time.perf_counter() - started) * 1000)
+
+
+def timed_stage(name: str) -> Callable:
+    """Decorator timing every call of an async function as stage `name`."""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with stage(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
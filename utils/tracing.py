@@ -0,0 +1,213 @@
+"""
+Tracing - Nested timing spans with attributes, exported as OTLP/JSON.
+
+Spans nest through a context variable, so the spans of concurrent tasks stay in
+separate traces and work started with asyncio.create_task inherits its parent span.
+When a trace's root span ends, the whole trace is appended to Config.TRACE_EXPORT_PATH
+as one OTLP/JSON ``{"resourceSpans": [...]}`` document per line (the layout of the
+OpenTelemetry collector's file exporter), ready to load into any OTLP-aware viewer.
+
+With tracing disabled every helper returns a shared no-op span, so call sites can stay
+instrumented in hot paths.
+
+Usage:
+    with span("search_box.strategy", strategy="probe") as s:
+        ...
+        s.set_attribute("selector", selector)
+
+    @traced("navigator.navigate")
+    async def navigate_to(self, url): ...
+"""
+from typing import Dict, Any, Optional, List, Callable
+from contextlib import contextmanager
+from contextvars import ContextVar
+from config import Config
+import functools
+import threading
+import random
+import json
+import time
+import os
+
+SERVICE_NAME = "web-scraping-agent"
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "status", "message")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = dict(attributes)
+        self.status = "UNSET"
+        self.message = ""
+
+    def set_attribute(self, key: str, value: Any):
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def record_exception(self, error: BaseException):
+        self.status = "ERROR"
+        self.message = f"{type(error).__name__}: {str(error)[:200]}"
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return (self.end_ns - self.start_ns) / 1e6 if self.end_ns else None
+
+
+class _NoopSpan:
+    """Stand-in returned while tracing is disabled."""
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+    def record_exception(self, error: BaseException):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans: List[Span]) -> Dict[str, Any]:
+    """Encode finished spans as one OTLP/JSON ExportTraceServiceRequest."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{
+            "scope": {"name": "utils.tracing"},
+            "spans": [{
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "parentSpanId": s.parent_id or "",
+                "name": s.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in s.attributes.items()],
+                "status": {"code": {"UNSET": 0, "OK": 1, "ERROR": 2}[s.status], "message": s.message}
+            } for s in spans]
+        }]
+    }]}
+
+
+class JSONFileExporter:
+    """Appends each finished trace to a file as one OTLP/JSON line."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or Config.TRACE_EXPORT_PATH
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        line = json.dumps(to_otlp(spans), separators=(",", ":"))
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class Tracer:
+    """Creates spans and hands each finished trace to the exporter."""
+
+    def __init__(self, exporter=None, enabled: Optional[bool] = None):
+        self.enabled = Config.TRACING_ENABLED if enabled is None else enabled
+        self.exporter = exporter or JSONFileExporter()
+        self._open_traces: Dict[str, List[Span]] = {}
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+        parent = _current_span.get()
+        trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        current = Span(name, trace_id, parent.span_id if parent else None, attributes)
+        if parent is None:
+            self._open_traces[trace_id] = []
+        token = _current_span.set(current)
+        try:
+            yield current
+            if current.status == "UNSET":
+                current.status = "OK"
+        except BaseException as e:
+            current.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            current.end_ns = time.time_ns()
+            self._finish(current)
+
+    def _finish(self, finished: Span):
+        if finished.parent_id is None:
+            spans = self._open_traces.pop(finished.trace_id, [])
+            spans.append(finished)
+            self._export(spans)
+        elif finished.trace_id in self._open_traces:
+            self._open_traces[finished.trace_id].append(finished)
+        else:
+            # Outlived its root (e.g. a background task); export on its own
+            self._export([finished])
+
+    def _export(self, spans: List[Span]):
+        try:
+            self.exporter.export(spans)
+        except Exception:
+            pass  # Tracing must never break the agent
+
+
+_tracer: Optional[Tracer] = None
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer."""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
+
+
+def span(name: str, **attributes):
+    """Open a child span of the current span (or a new trace) for a with-block."""
+    return get_tracer().span(name, **attributes)
+
+
+def current_span():
+    """The innermost open span, or a no-op span outside any trace."""
+    return _current_span.get() or NOOP_SPAN
+
+
+def traced(name: Optional[str] = None, **attributes) -> Callable:
+    """Decorator running every call of an async function inside a span."""
+    def decorator(fn: Callable) -> Callable:
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(span_name, **attributes):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,187 @@
+"""
+Event-driven waits - Wait on real page conditions instead of fixed sleeps.
+"""
+from typing import Any, Optional
+from config import Config
+from utils.deadline import clamp_ms
+import asyncio
+import time
+import weakref
+
+# Resolves once no DOM mutation has been seen for quietMs (true) or timeoutMs elapses (false).
+# Class and style changes alone don't count: carousels and animations rewrite them
+# continuously and would hold the wait until its cap on most store pages.
+DOM_SETTLE_JS = """
+([quietMs, timeoutMs]) => new Promise(resolve => {
+    const root = document.documentElement || document;
+    let quietTimer = null;
+    let capTimer = null;
+    let observer = null;
+    const done = (settled) => {
+        if (observer) observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(capTimer);
+        resolve(settled);
+    };
+    const cosmetic = (record) => record.type === 'attributes'
+        && (record.attributeName === 'class' || record.attributeName === 'style');
+    observer = new MutationObserver((records) => {
+        if (records.every(cosmetic)) return;
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => done(true), quietMs);
+    });
+    observer.observe(root, {subtree: true, childList: true, attributes: true, characterData: true});
+    quietTimer = setTimeout(() => done(true), quietMs);
+    capTimer = setTimeout(() => done(false), timeoutMs);
+})
+"""
+
+def _ms_until(deadline: float) -> int:
+    """Milliseconds left before a time.monotonic() deadline (at least 1)."""
+    return max(1, int((deadline - time.monotonic()) * 1000))
+
+
+# Long-lived connections never "finish" and would keep the network busy forever
+IGNORED_RESOURCE_TYPES = {"websocket", "eventsource", "manifest"}
+
+
+class NetworkTracker:
+    """
+    Requests in flight on a page, followed from the moment tracking starts.
+
+    A request still open after Config.SETTLE_TIMEOUT is treated as long-lived (polling,
+    streaming) and no longer keeps the network busy.
+    """
+
+    def __init__(self, page):
+        self.inflight: dict = {}  # request -> monotonic start time
+        self.last_activity = time.monotonic()
+        page.on("request", self._on_request)
+        page.on("requestfinished", self._on_done)
+        page.on("requestfailed", self._on_done)
+
+    def _on_request(self, request):
+        if request.resource_type not in IGNORED_RESOURCE_TYPES:
+            self.inflight[request] = self.last_activity = time.monotonic()
+
+    def _on_done(self, request):
+        if self.inflight.pop(request, None) is not None:
+            self.last_activity = time.monotonic()
+
+    def busy(self) -> bool:
+        cutoff = time.monotonic() - Config.SETTLE_TIMEOUT / 1000
+        return any(started > cutoff for started in self.inflight.values())
+
+    def quiet_for(self) -> float:
+        """Milliseconds since a tracked request last started or finished."""
+        return (time.monotonic() - self.last_activity) * 1000
+
+
+_trackers: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def track_network(page) -> NetworkTracker:
+    """
+    Start following a page's requests (idempotent).
+
+    Call it when the page is created: wait_for_network_quiet only knows about requests
+    that started after tracking began.
+    """
+    tracker = _trackers.get(page)
+    if tracker is None:
+        tracker = _trackers[page] = NetworkTracker(page)
+    return tracker
+
+
+async def wait_for_navigation_committed(page, timeout: Optional[int] = None) -> bool:
+    """Wait until the current navigation has produced a parsed document."""
+    try:
+        await page.wait_for_load_state("domcontentloaded", timeout=clamp_ms(timeout or Config.SETTLE_TIMEOUT))
+        return True
+    except Exception:
+        return False
+
+
+async def wait_for_dom_settled(page, quiet_ms: Optional[int] = None, timeout: Optional[int] = None) -> bool:
+    """Wait until the DOM has stopped mutating for quiet_ms."""
+    quiet_ms = quiet_ms if quiet_ms is not None else Config.DOM_SETTLE_MS
+    timeout = clamp_ms(timeout or Config.SETTLE_TIMEOUT)
+    deadline = time.monotonic() + timeout / 1000
+    try:
+        return bool(await page.evaluate(DOM_SETTLE_JS, [quiet_ms, timeout]))
+    except Exception:
+        # The execution context is destroyed when the action caused a navigation
+        return await wait_for_navigation_committed(page, _ms_until(deadline))
+
+
+async def wait_for_network_quiet(page, quiet_ms: Optional[int] = None, timeout: Optional[int] = None) -> bool:
+    """
+    Wait until no tracked request has been in flight for quiet_ms.
+
+    Requests started before the page was passed to track_network are invisible, so on a
+    page that was not tracked from creation a request already in flight when this is
+    called (e.g. one fired by the click being waited on) does not hold the wait.
+    """
+    quiet_ms = quiet_ms if quiet_ms is not None else Config.NETWORK_QUIET_MS
+    timeout = clamp_ms(timeout or Config.SETTLE_TIMEOUT)
+    tracker = track_network(page)
+    deadline = time.monotonic() + timeout / 1000
+    while time.monotonic() < deadline:
+        if not tracker.busy() and tracker.quiet_for() >= quiet_ms:
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def wait_for_actionable(element, timeout: Optional[int] = None) -> bool:
+    """Wait until an element is visible, stable and enabled, within one timeout for all three."""
+    deadline = time.monotonic() + clamp_ms(timeout or Config.SETTLE_TIMEOUT) / 1000
+    try:
+        for state in ("visible", "stable", "enabled"):
+            await element.wait_for_element_state(state, timeout=_ms_until(deadline))
+        return True
+    except Exception:
+        return False
+
+
+async def wait_for_page_loaded(page, timeout: Optional[int] = None) -> bool:
+    """
+    Wait for the network to go quiet, the navigation to commit and the DOM to settle.
+
+    The network wait comes first: right after a click the old document still reports
+    "domcontentloaded", so checking it first would return before a navigation the click
+    triggered has started. Waiting for quiet_ms without requests gives that navigation
+    time to start, and the tracker keeps it in flight until its document arrives.
+
+    The three waits share one timeout: each gets only what the previous ones left.
+    """
+    deadline = time.monotonic() + clamp_ms(timeout or Config.SETTLE_TIMEOUT) / 1000
+    network_quiet = await wait_for_network_quiet(page, timeout=_ms_until(deadline))
+    committed = await wait_for_navigation_committed(page, _ms_until(deadline))
+    dom_settled = await wait_for_dom_settled(page, timeout=_ms_until(deadline))
+    return committed and network_quiet and dom_settled
+
+
+async def wait_for_condition(page, condition: str, element: Any = None, timeout: Optional[int] = None) -> bool:
+    """
+    Wait on a named page condition.
+
+    Args:
+        page: Playwright page
+        condition: "none", "dom", "navigation", "network", "load" or "actionable"
+        element: Element handle, required for "actionable"
+        timeout: Upper bound in milliseconds
+    """
+    if condition == "none":
+        return True
+    if condition == "dom":
+        return await wait_for_dom_settled(page, timeout=timeout)
+    if condition == "navigation":
+        return await wait_for_navigation_committed(page, timeout)
+    if condition == "network":
+        return await wait_for_network_quiet(page, timeout=timeout)
+    if condition == "load":
+        return await wait_for_page_loaded(page, timeout)
+    if condition == "actionable" and element is not None:
+        return await wait_for_actionable(element, timeout)
+    raise ValueError(f"Unknown wait condition: {condition}")